@@ -1,12 +1,20 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import joblib
 import os
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src')
+sys.path.append(SRC_DIR)
+from bootstrap_metrics import format_interval, first_metrics_file, read_metrics
 
 # Configuração da página
 st.set_page_config(page_title="Passos Mágicos - Previsão de Risco", layout="wide")
 
+# Início do rerun (tempo de execução exibido no rodapé)
+rerun_start = time.perf_counter()
+
 # Título e descrição
 st.title("🎓 Passos Mágicos - Modelo de Previsão de Risco de Defasagem")
 st.markdown("""
@@ -14,9 +22,30 @@ Este aplicativo utiliza um modelo de Machine Learning para prever o risco de def
 dos alunos da Associação Passos Mágicos. O modelo foi treinado com dados educacionais de 2022 a 2024.
 """)
 
+# Métricas do modelo no conjunto de teste, com intervalos de confiança bootstrap: as do
+# modelo servido (predictive_model.py) ou, na falta delas, as da Regressão Logística na
+# comparação de modelos (model_training.py)
+MODEL_METRICS_FILES = [
+    (os.path.join(os.path.dirname(SRC_DIR), 'notebooks', 'logistic_model_metrics.csv'), "modelo servido"),
+    (os.path.join(os.path.dirname(SRC_DIR), 'notebooks', 'model_comparison_results.csv'),
+     "Regressão Logística da comparação de modelos, features do modelo otimizado")
+]
+
+@st.cache_data(max_entries=2)
+def load_model_metrics(path, mtime_ns):
+    return read_metrics(path, 'Logistic Regression')
+
 # Carregar o modelo e o scaler
 @st.cache_resource
 def load_model_and_scaler():
+    # Pacote único com memory-map (gerado por src/model_bundle.py), compartilhado entre workers
+    try:
+        from model_bundle import load_bundle, LOGISTIC_BUNDLE
+        model, scaler, _ = load_bundle(os.path.join(SRC_DIR, LOGISTIC_BUNDLE))
+        return model, scaler
+    except (ImportError, OSError, ValueError):
+        pass
+    
     model_path = os.path.join(os.path.dirname(__file__), '..', 'src', 'logistic_model.pkl')
     scaler_path = os.path.join(os.path.dirname(__file__), '..', 'src', 'scaler.pkl')
     
@@ -25,7 +54,23 @@ def load_model_and_scaler():
     
     return model, scaler
 
-model, scaler = load_model_and_scaler()
+# Features do modelo de regressão logística (ordem do scaler.pkl)
+LOGISTIC_FEATURES = ['ida', 'ieg', 'ips', 'ipp', 'iaa', 'ano']
+
+# Features do treino (src/feature_transformer.pkl), compartilhadas com o app_streamlit e a pontuação em lote
+@st.cache_resource
+def load_feature_transformer():
+    from feature_transformer import load_transformer
+    return load_transformer(os.path.join(os.path.dirname(__file__), '..'))
+
+# Predições memoizadas por vetor de entrada, compartilhadas entre as sessões
+@st.cache_resource
+def load_predictor():
+    from prediction_cache import PredictionCache
+    model, scaler = load_model_and_scaler()
+    return PredictionCache(model, scaler)
+
+predictor = load_predictor()
 
 # Sidebar para entrada de dados
 st.sidebar.header("📊 Dados do Aluno")
@@ -39,13 +84,11 @@ ipp = st.sidebar.slider("IPP (Aspectos Psicopedagógicos)", min_value=0.0, max_v
 iaa = st.sidebar.slider("IAA (Autoavaliação)", min_value=0.0, max_value=10.0, value=5.0, step=0.1)
 ano = st.sidebar.selectbox("Ano", options=[2022, 2023, 2024], index=2)
 
-# Preparar os dados para previsão
-input_data = np.array([[ida, ieg, ips, ipp, iaa, ano]])
-input_data_scaled = scaler.transform(input_data)
-
-# Fazer a previsão
-prediction = model.predict(input_data_scaled)[0]
-prediction_proba = model.predict_proba(input_data_scaled)[0]
+# Fazer a previsão (normalização e modelo apenas para entradas ainda não vistas)
+input_data = load_feature_transformer().transform(
+    {'ida': ida, 'ieg': ieg, 'ips': ips, 'ipp': ipp, 'iaa': iaa, 'ano': ano}, columns=LOGISTIC_FEATURES
+)[0]
+prediction, prediction_proba = predictor.predict(input_data)
 
 # Exibir os resultados
 st.markdown("---")
@@ -100,12 +143,20 @@ st.table(input_df)
 st.markdown("---")
 st.header("ℹ️ Informações Adicionais")
 
-st.markdown("""
+metrics_path, metrics_source = first_metrics_file(MODEL_METRICS_FILES)
+metrics = load_model_metrics(metrics_path, os.stat(metrics_path).st_mtime_ns) if metrics_path else None
+if metrics is None:
+    performance = "- **Desempenho**: métricas indisponíveis (execute src/predictive_model.py)."
+else:
+    performance = (f"- **Acurácia**: {format_interval(metrics, 'Accuracy')}\n"
+                   f"- **AUC Score**: {format_interval(metrics, 'ROC-AUC')}\n"
+                   f"- IC 95% por bootstrap no conjunto de teste ({metrics_source})")
+
+st.markdown(f"""
 ### Sobre o Modelo
 - **Tipo**: Regressão Logística
 - **Variável Alvo**: Risco de Defasagem (1 se IAN < 7.0, 0 caso contrário)
-- **Acurácia**: ~57%
-- **AUC Score**: 0.6074
+{performance}
 
 ### Sobre os Indicadores
 - **IAN (Indicador de Adequação do Nível)**: Mede a defasagem educacional do aluno.
@@ -128,3 +179,5 @@ st.markdown("---")
 st.markdown("""
 **Desenvolvido por**: Manus AI | **Projeto**: Datathon - Passos Mágicos | **Fase**: 5
 """)
+st.caption(f"Rerun em {(time.perf_counter() - rerun_start) * 1000:.1f} ms "
+           f"(cache de predições: {predictor.hits} acertos, {predictor.misses} cálculos).")
@@ -1,10 +1,24 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src')
+sys.path.append(SRC_DIR)
+
+from risk_features import build_feature_vector
+from feature_transformer import FEATURE_TRANSFORMER
+from risk_pipeline import load_pipeline, RISK_PIPELINE
+from attribution import FEATURE_LABELS
+from prediction_cache import PredictionCache
+from roster import score_roster, filter_roster, filter_options, paginate, file_fingerprint, data_version
+from batch_scoring import load_feature_context, read_upload, score_frame
+from bootstrap_metrics import format_interval, first_metrics_file, read_metrics
+
+# Linhas pontuadas entre as atualizações da barra de progresso da planilha enviada
+UPLOAD_CHUNK_ROWS = 1000
 
 # Configuração da página
 st.set_page_config(
@@ -14,39 +28,207 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Carregar modelo e scaler
-@st.cache_resource
-def load_model_and_scaler():
+# Carregar o pipeline do modelo (features do treino, scaler e estimador em um único artefato),
+# um por versão dos artefatos (`model_version`): um modelo retreinado é recarregado
+@st.cache_resource(max_entries=2)
+def load_risk_pipeline(model_hash):
+    return load_pipeline(os.path.dirname(os.path.dirname(__file__)))
+
+# Predições memoizadas por vetor de entrada, compartilhadas entre as sessões (por versão do modelo)
+@st.cache_resource(max_entries=2)
+def load_predictor(_pipeline, model_hash):
+    # Árvores compiladas (features originais), quando disponíveis: caminho rápido de uma linha
+    if _pipeline.compiled is not None:
+        return PredictionCache(_pipeline.compiled)
+    return PredictionCache(_pipeline.model, _pipeline.scaler)
+
+def model_version():
+    """Hash dos artefatos do modelo (pipeline, pacote e pickles presentes), usado como chave do cache do roster."""
+    src_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src')
+    names = [RISK_PIPELINE, 'optimized_model.bundle', 'optimized_model.pkl', 'scaler_v2.pkl', 'feature_cols.pkl', FEATURE_TRANSFORMER]
+    paths = [os.path.join(src_dir, name) for name in names if os.path.exists(os.path.join(src_dir, name))]
+    return '|'.join(file_fingerprint(path) for path in paths)
+
+# Base limpa inteira pontuada uma vez por versão do modelo e dos dados
+@st.cache_data(max_entries=4, show_spinner="Pontuando todos os alunos...")
+def load_roster(model_hash, data_hash):
+    return score_roster(os.path.dirname(os.path.dirname(__file__)), load_risk_pipeline(model_hash))
+
+# Pipeline do modelo e histórico dos alunos (features de lag) para planilhas enviadas
+@st.cache_resource(max_entries=2)
+def load_upload_context(model_hash, data_hash):
     base_dir = os.path.dirname(os.path.dirname(__file__))
-    model_path = os.path.join(base_dir, 'src', 'optimized_model.pkl')
-    scaler_path = os.path.join(base_dir, 'src', 'scaler_v2.pkl')
-    feature_cols_path = os.path.join(base_dir, 'src', 'feature_cols.pkl')
+    return {'pipeline': load_risk_pipeline(model_hash), **load_feature_context(base_dir)}
+
+# Métricas do modelo no conjunto de teste, com intervalos de confiança bootstrap: as do
+# modelo otimizado (model_interpretation.py) ou, na falta delas, as do Gradient Boosting
+# na comparação de modelos (model_training.py)
+MODEL_METRICS_FILES = [
+    (os.path.join(os.path.dirname(SRC_DIR), 'notebooks', 'optimized_model_metrics.csv'), "modelo otimizado"),
+    (os.path.join(os.path.dirname(SRC_DIR), 'notebooks', 'model_comparison_results.csv'),
+     "Gradient Boosting da comparação de modelos, hiperparâmetros padrão")
+]
+
+@st.cache_data(max_entries=2)
+def load_model_metrics(path, fingerprint):
+    """Linha do Gradient Boosting no arquivo de métricas, como dicionário (com os IC)."""
+    return read_metrics(path, 'Gradient Boosting')
+
+# Carregar índice de histórico dos alunos (gerado por data_cleaning.py), um por
+# impressão digital da tabela indexada: um índice reconstruído invalida o cache
+@st.cache_resource(max_entries=2)
+def load_student_index(fingerprint):
+    try:
+        from student_index import load_index
+        return load_index()
+    except (ImportError, OSError, ValueError):
+        return None
+
+def current_index_fingerprint():
+    """Impressão digital gravada no índice de histórico atual (None se não houver índice)."""
+    try:
+        from student_index import index_fingerprint
+        return index_fingerprint()
+    except (ImportError, OSError, ValueError):
+        return None
+
+def lookup_previous_year(student_index, ra, ano):
+    """Valores de IDA/IEG/IPS do aluno no ano anterior, ou None se não houver registro."""
+    if student_index is None or not ra:
+        return None
+    from student_index import previous_year_values
+    table_path = os.path.join(os.path.dirname(SRC_DIR), 'data', 'processed', 'pedagogy_data_final.arrow')
+    try:
+        return previous_year_values(student_index, table_path, ra, ano, ['ida', 'ieg', 'ips'])
+    except (ImportError, OSError):
+        return None
+
+# Função para fazer predição
+def predict_risk(predictor, input_data):
+    """Faz a predição de risco com base nos dados de entrada (uma chamada ao modelo por entrada nova)."""
+    return predictor.predict(input_data)
+
+def explain_risk(pipeline, input_data):
+    """Contribuição de cada feature para o risco do aluno (log-odds), pelo caminho nas árvores."""
+    _, contributions = pipeline.contributions(np.asarray(input_data, dtype=np.float64).reshape(1, -1))
+    return pd.Series(contributions[0], index=[FEATURE_LABELS.get(col, col) for col in pipeline.feature_cols])
+
+def roster_page():
+    """Painel com todos os alunos ordenados por risco: filtros e paginação no servidor."""
+    st.header("📋 Painel de Alunos por Risco")
+    start = time.perf_counter()
+    
+    try:
+        roster = load_roster(model_version(), data_version(os.path.dirname(os.path.dirname(__file__))))
+    except (OSError, ValueError) as e:
+        st.warning(f"Base de alunos indisponível ({e}). Execute o pipeline de dados (src/data_cleaning.py).")
+        return
     
-    model = joblib.load(model_path)
-    scaler = joblib.load(scaler_path)
-    feature_cols = joblib.load(feature_cols_path)
+    # Filtros
+    options = filter_options(roster)
+    col_fase, col_escola, col_ano = st.columns(3)
+    fase = col_fase.selectbox("Fase", ["Todas"] + options['fase'])
+    escola = col_escola.selectbox("Escola", ["Todas"] + options['escola'])
+    ano = col_ano.selectbox("Ano", ["Todos"] + options['ano'])
+    filtered = filter_roster(
+        roster,
+        fase=None if fase == "Todas" else fase,
+        escola=None if escola == "Todas" else escola,
+        ano=None if ano == "Todos" else ano
+    )
     
-    return model, scaler, feature_cols
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Alunos", f"{len(filtered)}")
+    col2.metric("Em Alto Risco", f"{int(filtered['risco_previsto'].sum())}")
+    col3.metric("Probabilidade Média", f"{filtered['prob_risco'].mean() * 100:.1f}%" if len(filtered) else "-")
+    
+    # Paginação: apenas a página atual é enviada ao navegador
+    col_size, col_page = st.columns(2)
+    page_size = col_size.selectbox("Alunos por página", [25, 50, 100], index=1)
+    n_pages = max(1, -(-len(filtered) // page_size))
+    page = col_page.number_input(f"Página (de {n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
+    page_df, _ = paginate(filtered, int(page), page_size)
+    
+    st.dataframe(
+        page_df.rename(columns={'aluno_id': 'Aluno', 'ano': 'Ano', 'fase': 'Fase', 'escola': 'Escola', 'risco_previsto': 'Alto Risco'}),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'prob_risco': st.column_config.ProgressColumn("Probabilidade de Risco", min_value=0.0, max_value=1.0, format="%.2f")
+        }
+    )
+    st.caption(f"Página gerada em {(time.perf_counter() - start) * 1000:.0f} ms "
+               f"({len(roster)} registros pontuados, em cache por versão do modelo e dos dados).")
 
-# Função para fazer predição
-def predict_risk(model, scaler, feature_cols, input_data):
-    """Faz a predição de risco com base nos dados de entrada."""
-    # Criar DataFrame com as features
-    df_input = pd.DataFrame([input_data], columns=feature_cols)
+def upload_page():
+    """Pontuação de uma planilha de alunos (CSV ou XLSX no layout do PEDE), com download do resultado."""
+    st.header("📤 Pontuação de Planilha")
+    st.markdown("""
+    Envie um arquivo **CSV** ou **XLSX** no layout do PEDE: colunas RA, Fase e Gênero e os indicadores
+    IDA, IEG, IPS, IPP, IAA, IPV (indicadores ausentes são imputados pela mediana do treino) e,
+    opcionalmente, Ano. As features (interações, razão, lags, variações e códigos) são calculadas
+    para o arquivo inteiro de uma vez.
+    """)
+    uploaded = st.file_uploader("Planilha de alunos", type=['csv', 'xlsx'])
+    default_year = st.selectbox("Ano (para planilhas sem a coluna Ano)", [2022, 2023, 2024], index=2)
+    if uploaded is None:
+        return
+    
+    # Resultado guardado na sessão: reruns (ex: clique no download) não pontuam de novo
+    key = ('upload', uploaded.file_id, default_year)
+    if st.session_state.get('upload_key') != key:
+        try:
+            context = load_upload_context(model_version(), data_version(os.path.dirname(os.path.dirname(__file__))))
+        except (OSError, ValueError) as e:
+            st.warning(f"Dados de features indisponíveis ({e}). Execute o pipeline de dados (src/data_cleaning.py).")
+            return
+        
+        start = time.perf_counter()
+        try:
+            df = read_upload(uploaded, uploaded.name, default_year)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        parse_time = time.perf_counter() - start
+        
+        progress = st.progress(0.0, text="Pontuando alunos...")
+        start = time.perf_counter()
+        scored = score_frame(df, context, chunk_rows=UPLOAD_CHUNK_ROWS,
+                             progress=lambda done, total: progress.progress(done / total, text=f"{done} de {total} alunos pontuados"))
+        score_time = time.perf_counter() - start
+        progress.empty()
+        
+        results = df.reset_index(drop=True)
+        results['prob_risco'] = scored['prob_risco'].round(4).to_numpy()
+        results['risco_previsto'] = scored['risco_previsto'].to_numpy()
+        st.session_state['upload_key'] = key
+        st.session_state['upload_results'] = results.sort_values('prob_risco', ascending=False, kind='stable')
+        st.session_state['upload_times'] = (parse_time, score_time)
     
-    # Normalizar
-    df_input_scaled = scaler.transform(df_input)
+    results = st.session_state['upload_results']
+    parse_time, score_time = st.session_state['upload_times']
     
-    # Predição
-    prediction = model.predict(df_input_scaled)[0]
-    prediction_proba = model.predict_proba(df_input_scaled)[0]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Alunos", f"{len(results)}")
+    col2.metric("Em Alto Risco", f"{int(results['risco_previsto'].sum())}")
+    col3.metric("Probabilidade Média", f"{results['prob_risco'].mean() * 100:.1f}%" if len(results) else "-")
     
-    return prediction, prediction_proba
+    st.dataframe(results.head(100), use_container_width=True, hide_index=True)
+    st.caption(f"Primeiros 100 alunos por probabilidade de risco. Leitura: {parse_time * 1000:.0f} ms | "
+               f"Pontuação: {score_time * 1000:.0f} ms")
+    st.download_button(
+        "⬇️ Baixar resultados (CSV)",
+        results.to_csv(index=False).encode('utf-8'),
+        file_name=f"{os.path.splitext(uploaded.name)[0]}_risco.csv",
+        mime='text/csv'
+    )
 
 # Interface principal
 def main():
+    rerun_start = time.perf_counter()
     # Carregar modelo
-    model, scaler, feature_cols = load_model_and_scaler()
+    model_hash = model_version()
+    pipeline = load_risk_pipeline(model_hash)
     
     # Título e descrição
     st.title("📚 Passos Mágicos - Sistema de Predição de Risco Educacional")
@@ -55,6 +237,14 @@ def main():
     permitindo intervenções proativas e personalizadas.
     """)
     
+    mode = st.sidebar.radio("Modo", ["Aluno individual", "Painel de alunos", "Pontuação de planilha"])
+    if mode == "Painel de alunos":
+        roster_page()
+        return
+    if mode == "Pontuação de planilha":
+        upload_page()
+        return
+    
     # Sidebar para entrada de dados
     st.sidebar.header("📝 Dados do Aluno")
     
@@ -70,39 +260,35 @@ def main():
     # Inputs adicionais
     st.sidebar.subheader("Informações Adicionais")
     ano = st.sidebar.selectbox("Ano", [2022, 2023, 2024], index=2)
-    genero = st.sidebar.selectbox("Gênero", ["Feminino", "Masculino", "NAO_INFORMADO"])
-    fase = st.sidebar.selectbox("Fase", ["ALFA", "FASE 1", "FASE 2", "FASE 3", "FASE 4", "FASE 5", "FASE 6", "FASE 7", "FASE 8", "NAO_INFORMADO"])
-    
-    # Encoding de variáveis categóricas (simplificado)
-    genero_encoded = {"Feminino": 0, "Masculino": 1, "NAO_INFORMADO": 2}[genero]
-    fase_encoded = {"ALFA": 0, "FASE 1": 1, "FASE 2": 2, "FASE 3": 3, "FASE 4": 4, "FASE 5": 5, "FASE 6": 6, "FASE 7": 7, "FASE 8": 8, "NAO_INFORMADO": 9}[fase]
-    
-    # Calcular features derivadas
-    ida_ieg_interaction = ida * ieg
-    ipp_ips_interaction = ipp * ips
-    ida_ieg_ratio = ida / (ieg + 0.001)
-    mean_indicators = np.mean([ida, ieg, ips, ipp, iaa, ipv])
-    
-    # Features temporais (valores padrão para novos alunos)
-    ida_lag1 = st.sidebar.number_input("IDA (Ano Anterior)", 0.0, 10.0, ida, 0.1)
-    ieg_lag1 = st.sidebar.number_input("IEG (Ano Anterior)", 0.0, 10.0, ieg, 0.1)
-    ips_lag1 = st.sidebar.number_input("IPS (Ano Anterior)", 0.0, 10.0, ips, 0.1)
-    
-    ida_delta = ida - ida_lag1
-    ieg_delta = ieg - ieg_lag1
-    
-    # Montar vetor de features
-    input_data = [
-        ida, ieg, ips, ipp, iaa, ipv,
-        ida_ieg_interaction, ipp_ips_interaction, ida_ieg_ratio,
-        mean_indicators, ida_lag1, ieg_lag1, ips_lag1,
-        ida_delta, ieg_delta, genero_encoded, fase_encoded, ano
-    ]
+    # Categorias conhecidas pelo modelo (as mesmas codificadas no treino)
+    transformer = pipeline.transformer
+    genero = st.sidebar.selectbox("Gênero", transformer.categories['gnero_encoded'])
+    fases = transformer.categories['fase_encoded']
+    fase = st.sidebar.selectbox("Fase", fases, index=fases.index('ALFA') if 'ALFA' in fases else 0)
+    
+    # Features temporais: preenchidas pelo histórico do aluno quando o RA é informado
+    # (valores padrão para novos alunos)
+    st.sidebar.subheader("Histórico do Aluno")
+    ra = st.sidebar.text_input("RA do Aluno (opcional)", "").strip().upper()
+    previous = lookup_previous_year(load_student_index(current_index_fingerprint()), ra, ano)
+    if ra and previous is None:
+        st.sidebar.caption("Sem registro do aluno no ano anterior: informe os valores manualmente.")
+    
+    def previous_value(col, default):
+        value = previous.get(col) if previous else None
+        return default if value is None or np.isnan(value) else float(round(value, 2))
+    
+    ida_lag1 = st.sidebar.number_input("IDA (Ano Anterior)", 0.0, 10.0, previous_value('ida', ida), 0.1)
+    ieg_lag1 = st.sidebar.number_input("IEG (Ano Anterior)", 0.0, 10.0, previous_value('ieg', ieg), 0.1)
+    ips_lag1 = st.sidebar.number_input("IPS (Ano Anterior)", 0.0, 10.0, previous_value('ips', ips), 0.1)
+    
+    # Montar vetor de features (encoding, features derivadas e deltas)
+    input_data = build_feature_vector(transformer, ida, ieg, ips, ipp, iaa, ipv, ano, genero, fase, ida_lag1, ieg_lag1, ips_lag1)
     
     # Botão de predição
     if st.sidebar.button("🔮 Prever Risco", type="primary"):
         # Fazer predição
-        prediction, prediction_proba = predict_risk(model, scaler, feature_cols, input_data)
+        prediction, prediction_proba = predict_risk(load_predictor(pipeline, model_hash), input_data)
         
         # Exibir resultados
         st.header("📊 Resultado da Predição")
@@ -121,16 +307,26 @@ def main():
         
         # Gráfico de probabilidades
         st.subheader("📈 Distribuição de Probabilidades")
-        fig, ax = plt.subplots(figsize=(8, 4))
-        labels = ['Baixo Risco', 'Alto Risco']
-        colors = ['#28a745', '#dc3545']
-        ax.bar(labels, prediction_proba, color=colors, alpha=0.7)
-        ax.set_ylabel('Probabilidade')
-        ax.set_ylim(0, 1)
-        ax.set_title('Probabilidade de Risco de Defasagem')
-        for i, v in enumerate(prediction_proba):
-            ax.text(i, v + 0.02, f'{v*100:.1f}%', ha='center', fontweight='bold')
-        st.pyplot(fig)
+        # Gráfico renderizado no navegador (sem figura matplotlib no servidor)
+        proba_df = pd.DataFrame({'Probabilidade': prediction_proba}, index=['Baixo Risco', 'Alto Risco'])
+        st.bar_chart(proba_df, y='Probabilidade')
+        st.caption(" | ".join(f"{label}: {value * 100:.1f}%" for label, value in proba_df['Probabilidade'].items()))
+        
+        # Interpretação calculada para este aluno
+        st.subheader("🔍 Interpretação da Predição")
+        contributions = explain_risk(pipeline, input_data)
+        drivers = contributions[contributions > 0].nlargest(3)
+        protective = contributions[contributions < 0].nsmallest(3)
+        col_drivers, col_protective = st.columns(2)
+        with col_drivers:
+            st.markdown("**Fatores que aumentam o risco:**")
+            st.markdown("\n".join(f"- {label} (+{value:.2f})" for label, value in drivers.items()) or "- Nenhum")
+        with col_protective:
+            st.markdown("**Fatores que reduzem o risco:**")
+            st.markdown("\n".join(f"- {label} ({value:.2f})" for label, value in protective.items()) or "- Nenhum")
+        st.bar_chart(contributions.sort_values(ascending=False).rename('Contribuição (log-odds)'))
+        st.caption("Contribuição de cada feature para o risco deste aluno, em log-odds, somando os "
+                   "caminhos percorridos nas árvores do modelo. Valores positivos aumentam o risco.")
         
         # Recomendações
         st.subheader("💡 Recomendações")
@@ -175,15 +371,23 @@ def main():
         st.dataframe(indicators_df, use_container_width=True)
     
     # Informações sobre o modelo
+    metrics_path, metrics_source = first_metrics_file(MODEL_METRICS_FILES)
+    metrics = load_model_metrics(metrics_path, file_fingerprint(metrics_path)) if metrics_path else None
+    if metrics is None:
+        performance = "- Métricas indisponíveis (execute src/model_interpretation.py)."
+    else:
+        # Mesma indentação do texto abaixo (o st.markdown remove a indentação comum)
+        performance = (f"- ROC-AUC Score: {format_interval(metrics, 'ROC-AUC')}\n"
+                       f"        - Acurácia: {format_interval(metrics, 'Accuracy')}\n"
+                       f"        - IC 95% por bootstrap no conjunto de teste ({metrics_source})")
     with st.expander("ℹ️ Sobre o Modelo"):
-        st.markdown("""
+        st.markdown(f"""
         ### Modelo Preditivo de Risco Educacional
         
         **Algoritmo**: Gradient Boosting Classifier (Otimizado)
         
         **Performance**:
-        - ROC-AUC Score: 0.7020
-        - Acurácia: 70%
+        {performance}
         
         **Features Mais Importantes**:
         1. Razão IDA/IEG (Desempenho vs Engajamento)
@@ -196,6 +400,10 @@ def main():
         O modelo utiliza uma combinação de indicadores acadêmicos, psicossociais e psicopedagógicos 
         para identificar padrões que antecedem quedas de desempenho ou aumento da defasagem.
         """)
+    
+    predictor = load_predictor(pipeline, model_hash)
+    st.caption(f"Rerun em {(time.perf_counter() - rerun_start) * 1000:.1f} ms "
+               f"(cache de predições: {predictor.hits} acertos, {predictor.misses} cálculos).")
 
 if __name__ == "__main__":
     main()
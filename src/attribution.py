@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from evaluation import ConfusionCurve
+from tree_compiler import CompiledGradientBoosting, compile_gradient_boosting
+
+# Atribuição das predições às features.
+#
+# - Global: importância por permutação (queda do ROC-AUC ao embaralhar uma feature).
+#   As `n_repeats` permutações de uma feature são empilhadas numa única matriz e
+#   pontuadas com uma chamada de predict_proba; as features rodam em paralelo (joblib).
+# - Local: contribuições de cada feature para a predição de um aluno, em log-odds
+#   (caminho nas árvores para o Gradient Boosting, coeficiente x valor para a regressão
+#   logística). São exatas (bias + soma das contribuições = decision_function) e baratas
+#   o bastante para o app e para a pontuação em lote.
+
+# Nomes exibidos no app para as features de feature_cols.pkl
+FEATURE_LABELS = {
+    'ida': 'IDA (Desempenho Acadêmico)',
+    'ieg': 'IEG (Engajamento)',
+    'ips': 'IPS (Aspectos Psicossociais)',
+    'ipp': 'IPP (Aspectos Psicopedagógicos)',
+    'iaa': 'IAA (Autoavaliação)',
+    'ipv': 'IPV (Ponto de Virada)',
+    'ida_ieg_interaction': 'IDA x IEG',
+    'ipp_ips_interaction': 'IPP x IPS',
+    'ida_ieg_ratio': 'Razão IDA/IEG',
+    'mean_indicators': 'Média dos Indicadores',
+    'ida_lag1': 'IDA (Ano Anterior)',
+    'ieg_lag1': 'IEG (Ano Anterior)',
+    'ips_lag1': 'IPS (Ano Anterior)',
+    'ida_delta': 'Variação do IDA',
+    'ieg_delta': 'Variação do IEG',
+    'gnero_encoded': 'Gênero',
+    'fase_encoded': 'Fase',
+    'ano': 'Ano'
+}
+
+def _feature_drops(model, X, y, feature, n_repeats, seed, baseline):
+    """Queda do ROC-AUC em cada repetição, com as permutações da feature em um único lote."""
+    rng = np.random.default_rng(seed)
+    n = len(X)
+    stacked = np.tile(X, (n_repeats, 1))
+    for repeat in range(n_repeats):
+        stacked[repeat * n:(repeat + 1) * n, feature] = X[rng.permutation(n), feature]
+    proba = model.predict_proba(stacked)[:, 1]
+    return np.array([baseline - ConfusionCurve(y, proba[repeat * n:(repeat + 1) * n]).roc_auc() for repeat in range(n_repeats)])
+
+def permutation_importance(model, X, y, feature_names, n_repeats=10, n_jobs=-1, random_state=42):
+    """
+    Importância por permutação (queda média do ROC-AUC em (X, y)). Retorna um DataFrame
+    com Feature, Importance e Std, em ordem decrescente.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    baseline = ConfusionCurve(y, model.predict_proba(X)[:, 1]).roc_auc()
+    seeds = np.random.SeedSequence(random_state).spawn(X.shape[1])
+    drops = Parallel(n_jobs=n_jobs)(
+        delayed(_feature_drops)(model, X, y, feature, n_repeats, seeds[feature], baseline)
+        for feature in range(X.shape[1])
+    )
+    return pd.DataFrame({
+        'Feature': list(feature_names),
+        'Importance': [d.mean() for d in drops],
+        'Std': [d.std() for d in drops]
+    }).sort_values('Importance', ascending=False).reset_index(drop=True)
+
+class LinearContributions:
+    """Contribuições de uma regressão logística binária: coeficiente x feature (normalizada)."""
+    
+    def __init__(self, coef, intercept, mean=None, scale=None):
+        self.coef = np.asarray(coef, dtype=np.float64).ravel()
+        self.intercept = float(np.ravel(intercept)[0])
+        self.mean = 0.0 if mean is None else mean
+        self.scale = 1.0 if scale is None else scale
+        
+    def contributions(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return np.full(len(X), self.intercept), (X - self.mean) / self.scale * self.coef
+
+class GradientBoostingContributions:
+    """
+    Contribuições de um GradientBoostingClassifier do scikit-learn: as folhas vêm de
+    `apply` (mesma travessia do predict) e os caminhos, das árvores compiladas.
+    """
+    
+    def __init__(self, model, scaler=None):
+        self.model = model
+        self.compiled = compile_gradient_boosting(model)
+        self.mean = scaler.mean_ if scaler is not None and scaler.with_mean else 0.0
+        self.scale = scaler.scale_ if scaler is not None and scaler.with_std else 1.0
+        
+    def contributions(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        # Mesma normalização do StandardScaler, sobre o array
+        leaves = self.model.apply((X - self.mean) / self.scale)[:, :, 0].astype(np.intp) + self.compiled.roots
+        leaves = self.compiled.sklearn_index[leaves]
+        return np.full(len(X), self.compiled.bias()), self.compiled.leaf_contributions(leaves)
+
+def make_explainer(model, scaler=None):
+    """
+    Objeto com `contributions(X)` para o modelo. Com `scaler` (StandardScaler do treino), X
+    são as features originais; sem ele, as mesmas features recebidas pelo modelo.
+    """
+    if isinstance(model, CompiledGradientBoosting):
+        if scaler is not None:
+            raise ValueError("O modelo compilado já recebe as features do próprio compilador; não informe o scaler.")
+        return model
+    if hasattr(model, 'estimators_'):
+        return GradientBoostingContributions(model, scaler)
+    if hasattr(model, 'coef_'):
+        if np.ndim(model.coef_) == 2 and model.coef_.shape[0] != 1:
+            raise ValueError("Apenas classificação binária é suportada.")
+        mean = scaler.mean_ if scaler is not None and scaler.with_mean else None
+        scale = scaler.scale_ if scaler is not None and scaler.with_std else None
+        return LinearContributions(model.coef_, model.intercept_, mean, scale)
+    raise ValueError(f"Modelo não suportado: {type(model).__name__}")
+
+def top_drivers(contributions, feature_names, k=3):
+    """
+    As `k` features que mais aumentam o risco de cada linha (maiores contribuições
+    positivas). Retorna (nomes, contribuições), ambos n_linhas x k; posições sem
+    contribuição positiva ficam com nome vazio e valor 0.
+    """
+    contributions = np.asarray(contributions)
+    k = min(k, contributions.shape[1])
+    top = np.argpartition(-contributions, k - 1, axis=1)[:, :k]
+    values = np.take_along_axis(contributions, top, axis=1)
+    order = np.argsort(-values, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    values = np.take_along_axis(values, order, axis=1)
+    names = np.asarray(feature_names, dtype=object)[top]
+    positive = values > 0
+    return np.where(positive, names, ''), np.where(positive, values, 0.0)
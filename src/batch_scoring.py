@@ -0,0 +1,240 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+import argparse
+from storage import load_table
+from model_preparation import TEMPORAL_COLS
+from risk_pipeline import load_pipeline
+from feature_transformer import INDICATOR_COLS
+from data_preparation import normalize_column_name
+from temporal_features import lag_name
+from attribution import top_drivers
+
+# Pontuação em lote do modelo Gradient Boosting otimizado (ex: todos os alunos, toda noite).
+# O pipeline do modelo (features do treino, scaler e estimador, src/risk_pipeline.pkl) é
+# carregado uma única vez; o arquivo de entrada (CSV ou Parquet) é lido em blocos, cada
+# bloco passa pelas mesmas transformações do feature engineering e é pontuado com uma
+# única chamada de `predict_proba`, e o resultado é gravado bloco a bloco.
+
+# Colunas lidas da entrada ('ra' é aceito no lugar de 'aluno_id')
+INPUT_COLS = ['aluno_id', 'ra', 'ano', 'gnero', 'fase', 'ida', 'ieg', 'ips', 'ipp', 'iaa', 'ipv']
+
+# Colunas obrigatórias de uma planilha enviada pelo app (após a padronização dos nomes):
+# identificação (uma das UPLOAD_ID_COLS) e categorias. Indicadores ausentes são imputados
+# pelo pipeline com as medianas do treino, como os valores em branco
+UPLOAD_ID_COLS = ['aluno_id', 'ra']
+UPLOAD_REQUIRED_COLS = ['gnero', 'fase']
+
+# Colunas de identificação copiadas para a saída
+OUTPUT_ID_COLS = ['aluno_id', 'ano']
+
+DEFAULT_CHUNK_ROWS = 10000
+
+# Fatores de risco por aluno na saída (--explain)
+N_DRIVERS = 3
+
+def load_feature_context(base_dir):
+    """
+    Dados, além do pipeline do modelo, usados para montar as features: o histórico de
+    indicadores dos alunos (tabela final) para as features de lag.
+    """
+    history = load_table(os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_final.arrow'), columns=['aluno_id', 'ano'] + TEMPORAL_COLS)
+    return {'history': _history_records(history)}
+
+def load_scoring_context(base_dir, explain=False):
+    """
+    Carrega, uma única vez, tudo o que a pontuação precisa: o pipeline do modelo
+    (`risk_pipeline.load_pipeline`) e os dados de `load_feature_context`.
+    Com `explain`, a saída inclui os fatores de risco por aluno.
+    """
+    return {'pipeline': load_pipeline(base_dir), 'explain': explain, **load_feature_context(base_dir)}
+
+def _history_records(df):
+    """Registros (aluno_id, ano, indicadores) com aluno e ano informados, em tipos uniformes."""
+    records = df[['aluno_id', 'ano'] + TEMPORAL_COLS].dropna(subset=['aluno_id', 'ano'])
+    return pd.DataFrame({
+        'aluno_id': records['aluno_id'].astype(str).to_numpy(),
+        'ano': records['ano'].to_numpy(dtype='int64'),
+        **{col: records[col].to_numpy(dtype='float64', na_value=np.nan) for col in TEMPORAL_COLS}
+    })
+
+def iter_input(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Lê o arquivo de entrada (CSV ou Parquet) em blocos de até `chunk_rows` linhas."""
+    if os.path.splitext(path)[1].lower() == '.parquet':
+        import pyarrow.parquet as pq
+        
+        parquet_file = pq.ParquetFile(path)
+        columns = [col for col in parquet_file.schema_arrow.names if col in INPUT_COLS]
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=lambda col: col in INPUT_COLS, chunksize=chunk_rows)
+
+def read_upload(file, file_name, default_year=None):
+    """
+    Lê uma planilha no layout do PEDE (CSV ou XLSX, primeira aba), mantendo apenas
+    INPUT_COLS. CSVs separados por ';' são lidos com vírgula decimal. Sem coluna de
+    ano, todas as linhas recebem `default_year`. ValueError se faltar a identificação do
+    aluno ou alguma das UPLOAD_REQUIRED_COLS.
+    """
+    usecols = lambda col: normalize_column_name(col) in INPUT_COLS
+    if os.path.splitext(file_name)[1].lower() in ('.xlsx', '.xls'):
+        df = pd.read_excel(file, sheet_name=0, usecols=usecols)
+    else:
+        header = file.readline()
+        file.seek(0)
+        if isinstance(header, bytes):
+            header = header.decode('utf-8', errors='ignore')
+        sep = ';' if header.count(';') > header.count(',') else ','
+        df = pd.read_csv(file, sep=sep, decimal=',' if sep == ';' else '.', usecols=usecols)
+    df.columns = [normalize_column_name(col) for col in df.columns]
+    df = df.loc[:, ~df.columns.duplicated()]
+    
+    if 'ano' not in df.columns:
+        if default_year is None:
+            raise ValueError("A planilha não tem a coluna 'Ano' e nenhum ano padrão foi informado.")
+        df['ano'] = default_year
+    missing = [col for col in UPLOAD_REQUIRED_COLS if col not in df.columns]
+    if not df.columns.isin(UPLOAD_ID_COLS).any():
+        missing = ['ra'] + missing
+    if missing:
+        raise ValueError(f"Colunas obrigatórias ausentes: {missing}")
+    return df
+
+def _add_lag_features(chunk, history):
+    """
+    Lags = indicadores do registro mais recente do aluno em um ano anterior
+    (mesma definição do feature engineering, sobre o histórico acumulado).
+    """
+    keys = pd.DataFrame({'aluno_id': chunk['aluno_id'], 'ano': pd.to_numeric(chunk['ano'], errors='coerce'), '_row': np.arange(len(chunk))})
+    keys = keys.dropna(subset=['aluno_id', 'ano'])
+    keys = keys.astype({'aluno_id': str, 'ano': 'int64'}).sort_values('ano', kind='stable')
+    
+    previous = history.astype({'aluno_id': str}).rename(columns={col: lag_name(col, 1) for col in TEMPORAL_COLS}).sort_values('ano', kind='stable')
+    merged = pd.merge_asof(keys, previous, on='ano', by='aluno_id', allow_exact_matches=False)
+    
+    for col in TEMPORAL_COLS:
+        lagged = np.full(len(chunk), np.nan)
+        lagged[merged['_row'].to_numpy()] = merged[lag_name(col, 1)].to_numpy(dtype='float64', na_value=np.nan)
+        chunk[lag_name(col, 1)] = lagged
+    return chunk
+
+def score_chunk(chunk, context, history):
+    """
+    Pontua um bloco da entrada. Retorna (DataFrame de saída, histórico atualizado com o bloco).
+    """
+    chunk = chunk.reset_index(drop=True)
+    if 'aluno_id' not in chunk.columns:
+        chunk['aluno_id'] = chunk['ra'] if 'ra' in chunk.columns else np.nan
+        
+    # Indicadores em float64, como nas tabelas carregadas pelo treino (colunas ausentes
+    # ficam em branco e são imputadas pelo pipeline)
+    chunk['ano'] = pd.to_numeric(chunk['ano'], errors='coerce')
+    for col in INDICATOR_COLS:
+        chunk[col] = pd.to_numeric(chunk[col], errors='coerce').astype('float64') if col in chunk.columns else np.nan
+        
+    # O bloco entra no histórico antes do lag, para que alunos com vários anos na
+    # própria entrada usem o seu registro anterior
+    history = pd.concat([history, _history_records(chunk)], ignore_index=True)
+    history = history.drop_duplicates(['aluno_id', 'ano'], keep='last')
+    chunk = _add_lag_features(chunk, history)
+    
+    # Features derivadas, códigos e imputação do treino; scaler e modelo sobre o array
+    pipeline = context['pipeline']
+    features = pipeline.transform(chunk)
+    risk = pipeline.predict_proba_features(features)[:, pipeline.risk_col]
+    
+    output = chunk[OUTPUT_ID_COLS].copy()
+    output['prob_risco'] = risk
+    output['risco_previsto'] = (risk > 0.5).astype('int8')
+    
+    if context.get('explain'):
+        # Uma travessia extra das árvores por bloco: as features que mais aumentam o risco
+        _, contributions = pipeline.contributions(features)
+        names, values = top_drivers(contributions, pipeline.feature_cols, N_DRIVERS)
+        for i in range(names.shape[1]):
+            output[f'fator_risco_{i + 1}'] = names[:, i]
+            output[f'impacto_{i + 1}'] = values[:, i].round(4)
+    return output, history
+
+def _open_writer(output_path):
+    """Retorna uma função que grava um bloco de saída (CSV ou Parquet) e outra que fecha o arquivo."""
+    if os.path.splitext(output_path)[1].lower() == '.parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        state = {'writer': None}
+        def write(df):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if state['writer'] is None:
+                state['writer'] = pq.ParquetWriter(output_path, table.schema)
+            state['writer'].write_table(table)
+        def close():
+            if state['writer'] is not None:
+                state['writer'].close()
+        return write, close
+        
+    state = {'header': True}
+    def write(df):
+        df.to_csv(output_path, mode='w' if state['header'] else 'a', header=state['header'], index=False)
+        state['header'] = False
+    return write, lambda: None
+
+def score_frame(df, context, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    """
+    Pontua um DataFrame em memória (ex: planilha enviada pelo app) bloco a bloco, na
+    ordem das linhas. `progress(linhas pontuadas, total)` é chamado após cada bloco.
+    """
+    history = context['history']
+    outputs = []
+    for start in range(0, len(df), chunk_rows):
+        output, history = score_chunk(df.iloc[start:start + chunk_rows], context, history)
+        outputs.append(output)
+        if progress is not None:
+            progress(start + len(output), len(df))
+    if not outputs:
+        return pd.DataFrame(columns=OUTPUT_ID_COLS + ['prob_risco', 'risco_previsto'])
+    return pd.concat(outputs, ignore_index=True)
+
+def score_file(input_path, output_path, context, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Pontua o arquivo de entrada bloco a bloco e grava a saída incrementalmente."""
+    write, close = _open_writer(output_path)
+    history = context['history']
+    total_rows = 0
+    start = time.perf_counter()
+    try:
+        for chunk in iter_input(input_path, chunk_rows):
+            output, history = score_chunk(chunk, context, history)
+            write(output)
+            total_rows += len(output)
+            elapsed = time.perf_counter() - start
+            print(f"  {total_rows} linhas pontuadas ({total_rows / elapsed:,.0f} linhas/s)")
+    finally:
+        close()
+        
+    elapsed = time.perf_counter() - start
+    rows_per_second = total_rows / elapsed if elapsed > 0 else float('inf')
+    print(f"\nPontuação concluída: {total_rows} linhas em {elapsed:.2f}s ({rows_per_second:,.0f} linhas/s)")
+    print(f"Resultado salvo em: {output_path}")
+    return total_rows, rows_per_second
+
+def main():
+    parser = argparse.ArgumentParser(description="Pontuação em lote do risco de defasagem.")
+    parser.add_argument('input', help="Arquivo de entrada (CSV ou Parquet) com os indicadores dos alunos.")
+    parser.add_argument('output', help="Arquivo de saída (CSV ou Parquet).")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="Linhas por bloco.")
+    parser.add_argument('--explain', action='store_true',
+                        help=f"Inclui os {N_DRIVERS} fatores que mais aumentam o risco de cada aluno (contribuições em log-odds).")
+    args = parser.parse_args()
+    
+    base_dir = os.path.join(os.path.dirname(__file__), '..')
+    
+    start = time.perf_counter()
+    context = load_scoring_context(base_dir, explain=args.explain)
+    print(f"Modelo e artefatos carregados em {time.perf_counter() - start:.2f}s")
+    
+    score_file(args.input, args.output, context, chunk_rows=args.chunk_rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,695 @@
+import pandas as pd
+import os
+import json
+import time
+import tempfile
+import argparse
+from storage import load_table, save_table, memory_usage_mb
+from temporal_features import add_temporal_features
+
+def _best_time(fn, repeat=3):
+    """Executa `fn` algumas vezes e retorna (melhor tempo em segundos, último resultado)."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def _write_report(path, title, notes, results_df):
+    """Grava o relatório de um benchmark: título, linhas de notas e a tabela de resultados em markdown."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"--- {title} ---\n\n")
+        f.write("\n".join(notes) + "\n\n")
+        f.write(results_df.to_markdown(index=False))
+        f.write("\n")
+    print(f"\nRelatório salvo em: {path}")
+    
+def synthetic_replica(df, factor):
+    """Replica o DataFrame `factor` vezes, com identificadores de aluno distintos por cópia."""
+    copies = []
+    for i in range(factor):
+        copy = df.copy()
+        for col in ('aluno_id', 'ra'):
+            if col in copy.columns:
+                copy[col] = copy[col].astype(object).map(lambda v, i=i: v if pd.isna(v) else f'{v}-{i}')
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+def benchmark_storage(base_dir, factor=100):
+    """
+    Compara a leitura das tabelas intermediárias em CSV (pd.read_csv) com o formato
+    tipado em Arrow (storage.load_table): tempo de carga, memória e tamanho em disco,
+    no dataset atual e numa réplica sintética `factor` vezes maior.
+    """
+    rows = []
+    tables = ['pedagogy_data_clean', 'pedagogy_data_final', 'pedagogy_data_fe']
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for table in tables:
+            base_df = pd.read_csv(os.path.join(base_dir, 'data', 'processed', f'{table}.csv'), low_memory=False)
+            for label, df in [('atual', base_df), (f'{factor}x', synthetic_replica(base_df, factor))]:
+                csv_path = os.path.join(tmp_dir, f'{table}_{label}.csv')
+                df.to_csv(csv_path, index=False)
+                arrow_path = save_table(df, csv_path)
+                
+                csv_time, csv_df = _best_time(lambda: pd.read_csv(csv_path, low_memory=False))
+                arrow_time, arrow_df = _best_time(lambda: load_table(arrow_path))
+                
+                rows.append({
+                    'Tabela': table,
+                    'Dataset': label,
+                    'Linhas': len(df),
+                    'CSV (s)': round(csv_time, 4),
+                    'Arrow (s)': round(arrow_time, 4),
+                    'CSV (MB mem)': round(memory_usage_mb(csv_df), 2),
+                    'Arrow (MB mem)': round(memory_usage_mb(arrow_df), 2),
+                    'CSV (MB disco)': round(os.path.getsize(csv_path) / 1e6, 2),
+                    'Arrow (MB disco)': round(os.path.getsize(arrow_path) / 1e6, 2)
+                })
+                print(rows[-1])
+                
+    results_df = pd.DataFrame(rows)
+    notes = [
+        "Tempo de carga: melhor de 3 execuções. Memória: DataFrame carregado (deep=True).",
+        f"Réplica sintética: {factor} cópias do dataset atual com IDs de aluno distintos."
+    ]
+    _write_report(os.path.join(base_dir, 'notebooks', 'storage_benchmark.txt'),
+                  "Benchmark da Camada de Armazenamento (CSV vs Arrow tipado)", notes, results_df)
+    
+    return results_df
+
+def _groupby_lags(df, columns):
+    """Implementação anterior das features de lag/delta (um groupby por indicador)."""
+    df = df.sort_values(['aluno_id', 'ano'])
+    for col in columns:
+        df[f'{col}_lag1'] = df.groupby('aluno_id')[col].shift(1)
+    for col in columns:
+        df[f'{col}_delta'] = df[col] - df[f'{col}_lag1']
+    return df
+
+def benchmark_temporal(base_dir, factors=(1, 10, 100)):
+    """
+    Compara o cálculo de lags/deltas com um groupby por indicador e com o motor de
+    passagem única (temporal_features), em réplicas crescentes da tabela final.
+    """
+    columns = ['ida', 'ieg', 'ips', 'ipp', 'iaa', 'ipv']
+    base_df = load_table(os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_final.arrow'))
+    rows = []
+    for factor in factors:
+        df = synthetic_replica(base_df, factor)
+        groupby_time, _ = _best_time(lambda: _groupby_lags(df, columns))
+        engine_time, _ = _best_time(lambda: add_temporal_features(df, columns, lags=(1,), deltas=(1,)))
+        rows.append({
+            'Linhas': len(df),
+            'groupby (s)': round(groupby_time, 4),
+            'passagem única (s)': round(engine_time, 4),
+            'passagem única (µs/linha)': round(engine_time / len(df) * 1e6, 3)
+        })
+        print(rows[-1])
+    return pd.DataFrame(rows)
+
+def benchmark_inference(base_dir, single_calls=1000, batch_sizes=(32, 256, 1000, 100000)):
+    """
+    Compara o modelo otimizado em pickle (scaler + predict_proba do scikit-learn) com a
+    versão compilada (tree_compiler): latência de uma linha e vazão em lotes.
+    """
+    import joblib
+    import numpy as np
+    from tree_compiler import compile_gradient_boosting
+    
+    model = joblib.load(os.path.join(base_dir, 'src', 'optimized_model.pkl'))
+    scaler = joblib.load(os.path.join(base_dir, 'src', 'scaler_v2.pkl'))
+    feature_cols = joblib.load(os.path.join(base_dir, 'src', 'feature_cols.pkl'))
+    compiled = compile_gradient_boosting(model, scaler)
+    
+    # Features originais (antes da normalização) do conjunto de teste
+    X_test = np.load(os.path.join(base_dir, 'data', 'processed', 'X_test.npy'))
+    X = scaler.inverse_transform(pd.DataFrame(X_test, columns=feature_cols))
+    
+    def sklearn_proba(rows):
+        return model.predict_proba(scaler.transform(pd.DataFrame(rows, columns=feature_cols)))[:, 1]
+        
+    max_diff = float(np.abs(sklearn_proba(X) - compiled.predict_proba(X)[:, 1]).max())
+    print(f"Diferença máxima de probabilidade (conjunto de teste): {max_diff}")
+    
+    rows = []
+    single = X[:1]
+    for label, fn in [('scikit-learn', lambda: sklearn_proba(single)), ('compilado', lambda: compiled.predict_proba(single))]:
+        latencies = []
+        for _ in range(single_calls):
+            start = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - start)
+        rows.append({'Modelo': label, 'Cenário': '1 linha', 'p50 (ms)': round(np.percentile(latencies, 50) * 1000, 4),
+                     'p99 (ms)': round(np.percentile(latencies, 99) * 1000, 4), 'Linhas/s': round(1 / np.median(latencies))})
+        print(rows[-1])
+        
+    for batch_size in batch_sizes:
+        batch = np.resize(X, (batch_size, X.shape[1]))
+        for label, fn in [('scikit-learn', lambda: sklearn_proba(batch)), ('compilado', lambda: compiled.predict_proba(batch))]:
+            best, _ = _best_time(fn)
+            rows.append({'Modelo': label, 'Cenário': f'lote de {batch_size}', 'p50 (ms)': '-', 'p99 (ms)': '-',
+                         'Linhas/s': round(batch_size / best)})
+            print(rows[-1])
+            
+    results_df = pd.DataFrame(rows)
+    notes = [
+        "scikit-learn: scaler_v2.transform + optimized_model.predict_proba (como no app).",
+        "Compilado: tree_compiler, com o scaler incorporado aos limiares.",
+        "O compilado é para uma linha e lotes pequenos; em lotes grandes o scikit-learn é mais rápido",
+        "(o risk_pipeline usa o compilado até FAST_PATH_ROWS linhas).",
+        f"Diferença máxima de probabilidade no conjunto de teste: {max_diff}"
+    ]
+    _write_report(os.path.join(base_dir, 'notebooks', 'inference_benchmark.txt'),
+                  "Benchmark de Inferência (pickle scikit-learn vs árvores compiladas)", notes, results_df)
+    
+    return results_df
+
+def benchmark_engines(base_dir, factor=50, single_calls=200):
+    """
+    Compara os motores de treino: GradientBoosting sobre os dados de `prepare_model_data`
+    (mediana + LabelEncoder + StandardScaler) vs HistGradientBoosting do motor HGB (NaNs e
+    categóricas nativas). Preparação, treino, latência de predição e ROC-AUC de teste no
+    dataset atual e numa réplica sintética `factor` vezes maior.
+    """
+    import numpy as np
+    from contextlib import redirect_stdout
+    from sklearn.metrics import roc_auc_score
+    from model_preparation import prepare_model_data
+    from model_training import MODEL_REGISTRY, build_models
+    from hgb_engine import prepare_native_data, make_hgb_model
+    
+    df_fe = load_table(os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_fe.arrow'))
+    
+    def prepare_gb(df):
+        with redirect_stdout(None):
+            X_train, X_test, y_train, y_test, _, _ = prepare_model_data(df)
+        return X_train, X_test, y_train, y_test
+        
+    def prepare_hgb(df):
+        X_train, X_test, y_train, y_test, _ = prepare_native_data(df)
+        return X_train, X_test, y_train, y_test
+        
+    engines = [
+        ('GradientBoosting', prepare_gb, lambda: build_models(['Gradient Boosting'])['Gradient Boosting']),
+        ('HistGradientBoosting nativo', prepare_hgb, make_hgb_model)
+    ]
+    
+    rows = []
+    for label, df in [('atual', df_fe), (f'{factor}x', synthetic_replica(df_fe, factor))]:
+        for engine, prepare, make_model in engines:
+            prepare_time, (X_train, X_test, y_train, y_test) = _best_time(lambda: prepare(df), repeat=1)
+            model = make_model()
+            fit_time, _ = _best_time(lambda: model.fit(X_train, y_train), repeat=1)
+            
+            single = X_test[:1]
+            latencies = []
+            for _ in range(single_calls):
+                start = time.perf_counter()
+                model.predict_proba(single)
+                latencies.append(time.perf_counter() - start)
+            batch_time, proba = _best_time(lambda: model.predict_proba(X_test)[:, 1])
+            
+            rows.append({
+                'Dataset': label, 'Motor': engine, 'Linhas de treino': len(X_train),
+                'Preparação (s)': round(prepare_time, 3), 'Treino (s)': round(fit_time, 3),
+                'Predição 1 linha p50 (ms)': round(float(np.percentile(latencies, 50)) * 1000, 3),
+                'Predição em lote (linhas/s)': round(len(X_test) / batch_time),
+                'ROC-AUC teste': round(roc_auc_score(y_test, proba), 4)
+            })
+            print(rows[-1])
+            
+    results_df = pd.DataFrame(rows)
+    gb_params = MODEL_REGISTRY['Gradient Boosting'][1]
+    notes = [
+        f"GradientBoosting: parâmetros de model_training ({gb_params}), dados de prepare_model_data.",
+        "HistGradientBoosting: hgb_engine.make_hgb_model(), dados de prepare_native_data.",
+        f"Réplica {factor}x: cópias do dataset com aluno_id distintos; como as cópias caem em treino e",
+        "teste, o ROC-AUC da réplica é otimista e serve apenas de referência (tempos são o foco)."
+    ]
+    _write_report(os.path.join(base_dir, 'notebooks', 'engine_benchmark.txt'),
+                  "Benchmark dos Motores de Treino (GradientBoosting vs HistGradientBoosting)", notes, results_df)
+    
+    return results_df
+
+# Worker usado por `benchmark_model_loading`: carrega os artefatos como o app, faz uma
+# predição e informa a memória quando solicitado (permanece vivo até o fim da medição)
+_LOADING_WORKER = """
+import sys, json
+sys.path.insert(0, sys.argv[1])
+app, source = sys.argv[2], sys.argv[3]
+import os
+import numpy as np
+import pandas as pd
+src_dir = sys.argv[1]
+if source == 'bundle':
+    from model_bundle import load_bundle, LOGISTIC_BUNDLE, OPTIMIZED_BUNDLE
+    bundle = LOGISTIC_BUNDLE if app == 'app.py' else OPTIMIZED_BUNDLE
+    model, scaler, feature_cols = load_bundle(os.path.join(src_dir, bundle))
+else:
+    import joblib
+    if app == 'app.py':
+        model = joblib.load(os.path.join(src_dir, 'logistic_model.pkl'))
+        scaler = joblib.load(os.path.join(src_dir, 'scaler.pkl'))
+        feature_cols = list(scaler.feature_names_in_)
+    else:
+        model = joblib.load(os.path.join(src_dir, 'optimized_model.pkl'))
+        scaler = joblib.load(os.path.join(src_dir, 'scaler_v2.pkl'))
+        feature_cols = joblib.load(os.path.join(src_dir, 'feature_cols.pkl'))
+X = pd.DataFrame(np.ones((1, len(feature_cols))), columns=feature_cols)
+model.predict_proba(scaler.transform(X if app == 'app_streamlit.py' else X.to_numpy()))
+print('ok', flush=True)
+sys.stdin.readline()
+memory = {}
+with open('/proc/self/smaps_rollup') as f:
+    for line in f:
+        name, _, value = line.partition(':')
+        if value.strip().endswith('kB'):
+            memory[name] = int(value.split()[0])
+print(json.dumps(memory), flush=True)
+sys.stdin.readline()
+"""
+
+def benchmark_model_loading(base_dir, workers=4):
+    """
+    Partida a frio e memória residente por worker dos apps: pickles (joblib.load) vs pacote
+    com memory-map (model_bundle). Cada cenário sobe `workers` processos, um de cada vez
+    (tempo até a primeira predição), e mede a memória com todos ativos, como os workers do
+    Streamlit. PSS divide as páginas compartilhadas entre os processos que as mapeiam.
+    """
+    import subprocess
+    import sys
+    import numpy as np
+    
+    src_dir = os.path.abspath(os.path.join(base_dir, 'src'))
+    rows = []
+    for app in ['app.py', 'app_streamlit.py']:
+        for source in ['pickle', 'bundle']:
+            processes, start_times = [], []
+            try:
+                for _ in range(workers):
+                    start = time.perf_counter()
+                    process = subprocess.Popen([sys.executable, '-W', 'ignore', '-c', _LOADING_WORKER, src_dir, app, source],
+                                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+                    processes.append(process)
+                    if process.stdout.readline().strip() != 'ok':
+                        raise RuntimeError(f"Falha ao carregar o modelo ({app}, {source}).")
+                    start_times.append(time.perf_counter() - start)
+                memories = []
+                for process in processes:
+                    process.stdin.write('\n')
+                    process.stdin.flush()
+                    memories.append(json.loads(process.stdout.readline()))
+            finally:
+                for process in processes:
+                    process.stdin.close()
+                    process.wait()
+                    
+            rows.append({
+                'App': app, 'Artefatos': source,
+                'Partida a frio (s)': round(float(np.median(start_times)), 3),
+                'RSS (MB)': round(float(np.median([m['Rss'] for m in memories])) / 1024, 1),
+                'PSS (MB)': round(float(np.median([m['Pss'] for m in memories])) / 1024, 1),
+                'Privada (MB)': round(float(np.median([m['Private_Clean'] + m['Private_Dirty'] for m in memories])) / 1024, 1)
+            })
+            print(rows[-1])
+            
+    results_df = pd.DataFrame(rows)
+    notes = [
+        f"Mediana de {workers} workers por cenário; partida a frio = início do processo até a primeira predição.",
+        "Privada = memória exclusiva do worker; PSS = com as páginas compartilhadas divididas entre os workers."
+    ]
+    _write_report(os.path.join(base_dir, 'notebooks', 'model_loading_benchmark.txt'),
+                  "Benchmark de Carga do Modelo (pickles vs pacote com memory-map)", notes, results_df)
+    
+    return results_df
+
+def benchmark_metrics(base_dir, sizes=(10_000, 1_000_000, 10_000_000)):
+    """
+    Compara o cálculo das métricas de avaliação: uma chamada do scikit-learn por métrica
+    (acurácia, precisão, recall, F1, ROC-AUC, average precision) vs `ConfusionCurve`
+    (uma ordenação para todas as métricas e para a tabela de limiares), em probabilidades
+    sintéticas com `sizes` linhas.
+    """
+    import numpy as np
+    from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, average_precision_score
+    from evaluation import ConfusionCurve, METRIC_NAMES
+    
+    def sklearn_metrics(y, proba):
+        y_pred = (proba > 0.5).astype(int)
+        return [accuracy_score(y, y_pred), precision_score(y, y_pred), recall_score(y, y_pred), f1_score(y, y_pred),
+                roc_auc_score(y, proba), average_precision_score(y, proba)]
+                
+    def curve_metrics(y, proba):
+        curve = ConfusionCurve(y, proba)
+        metrics = curve.metrics()
+        curve.threshold_table()
+        return [metrics[name] for name in METRIC_NAMES]
+        
+    rng = np.random.default_rng(42)
+    rows = []
+    for n_rows in sizes:
+        y = (rng.random(n_rows) < 0.4).astype(np.int64)
+        # Probabilidades arredondadas (como as de modelos de árvores, com muitos empates)
+        proba = np.round(np.clip(rng.normal(0.35 + 0.25 * y, 0.2), 0, 1), 4)
+        repeat = 3 if n_rows <= 1_000_000 else 1
+        sklearn_time, expected = _best_time(lambda: sklearn_metrics(y, proba), repeat=repeat)
+        curve_time, result = _best_time(lambda: curve_metrics(y, proba), repeat=repeat)
+        rows.append({
+            'Linhas': n_rows,
+            'scikit-learn (s)': round(sklearn_time, 3),
+            'ConfusionCurve + tabela de limiares (s)': round(curve_time, 3),
+            'Ganho': f'{sklearn_time / curve_time:.1f}x',
+            'Maior diferença': f'{np.max(np.abs(np.array(expected) - np.array(result))):.1e}'
+        })
+        print(rows[-1])
+        
+    results_df = pd.DataFrame(rows)
+    notes = [
+        "scikit-learn: accuracy/precision/recall/f1 sobre proba > 0.5, roc_auc_score e average_precision_score.",
+        "ConfusionCurve (src/evaluation.py): uma ordenação -> as mesmas seis métricas + tabela com 17 limiares.",
+        "Dados sintéticos (40% positivos, probabilidades com 4 casas decimais)."
+    ]
+    _write_report(os.path.join(base_dir, 'notebooks', 'metrics_benchmark.txt'),
+                  "Benchmark das Métricas de Avaliação", notes, results_df)
+    
+    return results_df
+
+def benchmark_attribution(base_dir, single_calls=1000, batch_rows=100000):
+    """
+    Atribuição do modelo otimizado: importância por permutação (sklearn.inspection vs
+    attribution, uma predição empilhada por feature) e contribuições por aluno (uma linha,
+    como no app, e em lote, como em batch_scoring --explain) comparadas ao predict_proba.
+    """
+    import joblib
+    import numpy as np
+    from sklearn.inspection import permutation_importance as sklearn_permutation_importance
+    from attribution import permutation_importance, make_explainer
+    from model_bundle import load_bundle, OPTIMIZED_BUNDLE
+    
+    model = joblib.load(os.path.join(base_dir, 'src', 'optimized_model.pkl'))
+    scaler = joblib.load(os.path.join(base_dir, 'src', 'scaler_v2.pkl'))
+    feature_cols = joblib.load(os.path.join(base_dir, 'src', 'feature_cols.pkl'))
+    X_test = np.load(os.path.join(base_dir, 'data', 'processed', 'X_test.npy'))
+    y_test = np.load(os.path.join(base_dir, 'data', 'processed', 'y_test.npy'))
+    
+    rows = []
+    sklearn_time, _ = _best_time(lambda: sklearn_permutation_importance(model, X_test, y_test, scoring='roc_auc', n_repeats=10, random_state=42))
+    fast_time, _ = _best_time(lambda: permutation_importance(model, X_test, y_test, feature_cols, n_repeats=10))
+    rows.append({'Cenário': f'Permutação ({len(feature_cols)} features x 10 repetições, {len(X_test)} linhas)',
+                 'Referência': f'{sklearn_time * 1000:.0f} ms (sklearn.inspection)', 'Atribuição': f'{fast_time * 1000:.0f} ms'})
+    print(rows[-1])
+    
+    # Uma linha: modelo do pacote (árvores compiladas), como no app Streamlit
+    bundled_model, _, _ = load_bundle(os.path.join(base_dir, 'src', OPTIMIZED_BUNDLE))
+    explainer = make_explainer(bundled_model)
+    single = X_test[:1]
+    latencies = {}
+    for label, fn in [('predict_proba', lambda: bundled_model.predict_proba(single)), ('contribuições', lambda: explainer.contributions(single))]:
+        times = []
+        for _ in range(single_calls):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        latencies[label] = np.percentile(times, 50) * 1000
+    rows.append({'Cenário': '1 aluno, p50 (pacote do app)', 'Referência': f"{latencies['predict_proba']:.3f} ms (predict_proba)",
+                 'Atribuição': f"{latencies['contribuições']:.3f} ms (contribuições)"})
+    print(rows[-1])
+    
+    # Lote: features originais, scaler incorporado (batch_scoring --explain)
+    X = np.resize(scaler.inverse_transform(pd.DataFrame(X_test, columns=feature_cols)), (batch_rows, len(feature_cols)))
+    batch_explainer = make_explainer(model, scaler)
+    predict_time, _ = _best_time(lambda: model.predict_proba((X - scaler.mean_) / scaler.scale_))
+    explain_time, _ = _best_time(lambda: batch_explainer.contributions(X))
+    rows.append({'Cenário': f'Lote de {batch_rows} alunos', 'Referência': f'{batch_rows / predict_time:,.0f} linhas/s (predict_proba)',
+                 'Atribuição': f'{batch_rows / explain_time:,.0f} linhas/s (contribuições)'})
+    print(rows[-1])
+    
+    results_df = pd.DataFrame(rows)
+    notes = [
+        "Permutação: queda do ROC-AUC no conjunto de teste; attribution empilha as 10 permutações de cada feature",
+        "em uma chamada de predict_proba. Contribuições: caminho nas árvores (bias + soma = decision_function)."
+    ]
+    _write_report(os.path.join(base_dir, 'notebooks', 'attribution_benchmark.txt'),
+                  "Benchmark de Atribuição (importância por permutação e contribuições por aluno)", notes, results_df)
+    
+    return results_df
+
+def benchmark_roster(base_dir, factor=17, page_size=50, page_calls=200):
+    """
+    Painel de alunos do app: pontuação da base inteira (primeiro acesso) e carga de uma
+    página nos acessos seguintes (cópia do roster em cache, como no st.cache_data, mais
+    filtro e paginação), sobre a base real e uma réplica sintética de ~50 mil registros.
+    """
+    import pickle
+    import numpy as np
+    from risk_pipeline import load_pipeline
+    from roster import score_roster, filter_roster, filter_options, paginate, ROSTER_TABLE
+    
+    pipeline = load_pipeline(base_dir)
+    df = load_table(os.path.join(base_dir, ROSTER_TABLE))
+    
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        replica_path = os.path.join(tmp_dir, 'roster_replica.arrow')
+        save_table(synthetic_replica(df, factor), replica_path)
+        for label, table_path in [('Base real', None), (f'Réplica x{factor}', replica_path)]:
+            score_time, roster = _best_time(lambda: score_roster(base_dir, pipeline, table_path=table_path))
+            cached = pickle.dumps(roster, protocol=pickle.HIGHEST_PROTOCOL)
+            options = filter_options(roster)
+            fase = roster['fase'].iloc[0]
+            
+            def load_page(page):
+                page_roster = pickle.loads(cached)
+                filtered = filter_roster(page_roster, fase=fase)
+                return paginate(filtered, page, page_size)
+            
+            times = []
+            for call in range(page_calls):
+                start = time.perf_counter()
+                load_page(call % 5 + 1)
+                times.append(time.perf_counter() - start)
+            rows.append({
+                'Base': f'{label} ({len(roster)} registros, {len(options["escola"])} escolas)',
+                'Primeiro acesso (pontuação)': f'{score_time * 1000:.0f} ms',
+                'Página seguinte, p50': f'{np.percentile(times, 50) * 1000:.2f} ms',
+                'Página seguinte, p99': f'{np.percentile(times, 99) * 1000:.2f} ms'
+            })
+            print(rows[-1])
+    
+    results_df = pd.DataFrame(rows)
+    notes = [
+        "Primeiro acesso: pontuação da base inteira (roster.score_roster). Páginas seguintes: cópia do roster em",
+        f"cache (pickle, como no st.cache_data), filtro por fase e paginação ({page_size} alunos por página)."
+    ]
+    _write_report(os.path.join(base_dir, 'notebooks', 'roster_benchmark.txt'),
+                  "Benchmark do Painel de Alunos (app Streamlit)", notes, results_df)
+    
+    return results_df
+
+def benchmark_app_rerun(base_dir, interactions=300):
+    """
+    Trabalho de predição por rerun dos apps Streamlit (modelos dos pacotes, como nos apps):
+    caminho anterior (DataFrame + scaler.transform + predict + predict_proba e, no
+    app_streamlit, figura matplotlib renderizada como no st.pyplot) vs PredictionCache
+    (entrada nova e entrada repetida, como ao mover um slider e voltar).
+    """
+    import io
+    import numpy as np
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from model_bundle import load_bundle, LOGISTIC_BUNDLE, OPTIMIZED_BUNDLE
+    from prediction_cache import PredictionCache
+    from risk_features import build_feature_vector
+    from feature_transformer import load_transformer
+    
+    def previous_path(model, scaler, columns, input_data, render):
+        df_input = pd.DataFrame([input_data], columns=columns)
+        df_input_scaled = scaler.transform(df_input)
+        model.predict(df_input_scaled)[0]
+        proba = model.predict_proba(df_input_scaled)[0]
+        if render:
+            fig, ax = plt.subplots(figsize=(8, 4))
+            ax.bar(['Baixo Risco', 'Alto Risco'], proba, color=['#28a745', '#dc3545'], alpha=0.7)
+            ax.set_ylim(0, 1)
+            for i, v in enumerate(proba):
+                ax.text(i, v + 0.02, f'{v*100:.1f}%', ha='center', fontweight='bold')
+            fig.savefig(io.BytesIO(), format='png')
+            plt.close(fig)
+    
+    def p50_ms(fn, inputs):
+        times = []
+        for input_data in inputs:
+            start = time.perf_counter()
+            fn(input_data)
+            times.append(time.perf_counter() - start)
+        return np.percentile(times, 50) * 1000
+    
+    transformer = load_transformer(base_dir)
+    rng = np.random.default_rng(42)
+    sliders = np.round(rng.uniform(0, 10, size=(interactions, 6)), 1)
+    apps = [
+        ('app.py (regressão logística)', LOGISTIC_BUNDLE, False,
+         [list(row[:5]) + [2024] for row in sliders]),
+        ('app_streamlit.py (Gradient Boosting)', OPTIMIZED_BUNDLE, True,
+         [build_feature_vector(transformer, *row, 2024, 'Feminino', 'FASE 2', *row[:3]) for row in sliders])
+    ]
+    
+    rows = []
+    for label, bundle_name, render, inputs in apps:
+        model, scaler, feature_cols = load_bundle(os.path.join(base_dir, 'src', bundle_name))
+        columns = feature_cols or ['ida', 'ieg', 'ips', 'ipp', 'iaa', 'ano']
+        predictor = PredictionCache(model, scaler)
+        rows.append({
+            'App': label,
+            'Anterior': f'{p50_ms(lambda x: previous_path(model, scaler, columns, x, render), inputs):.3f} ms',
+            'Cache, entrada nova': f'{p50_ms(predictor.predict, inputs):.3f} ms',
+            'Cache, entrada repetida': f'{p50_ms(predictor.predict, inputs):.3f} ms'
+        })
+        print(rows[-1])
+    
+    results_df = pd.DataFrame(rows)
+    notes = [
+        f"{interactions} interações com valores aleatórios dos sliders. Anterior: DataFrame, scaler.transform, predict e",
+        "predict_proba separados e, no app_streamlit, figura matplotlib renderizada em PNG (st.pyplot). Cache:",
+        "PredictionCache (uma chamada de predict_proba por entrada nova; gráfico desenhado no navegador).",
+        "O tempo total de cada rerun é exibido no rodapé dos apps."
+    ]
+    _write_report(os.path.join(base_dir, 'notebooks', 'app_rerun_benchmark.txt'),
+                  "Benchmark de Rerun dos Apps Streamlit (predição por interação, p50)", notes, results_df)
+    
+    return results_df
+
+def benchmark_pipeline(base_dir, single_calls=1000, batch_sizes=(1000, 100000)):
+    """
+    Pipeline único (risk_pipeline.pkl) vs trio de pickles: tempo de carga e latência de
+    `predict_proba` sobre dados brutos dos alunos. Anterior: FeatureTransformer + DataFrame
+    com os nomes das colunas + scaler_v2.transform + predict + predict_proba do scikit-learn
+    (como no app). Pipeline: bloco NumPy bruto, sem DataFrame nem validação de colunas.
+    """
+    import joblib
+    import numpy as np
+    from feature_transformer import load_transformer
+    from risk_pipeline import RiskPipeline, RAW_COLS, RISK_PIPELINE, FAST_PATH_ROWS
+    
+    src_dir = os.path.join(base_dir, 'src')
+    
+    def load_triple():
+        return (joblib.load(os.path.join(src_dir, 'optimized_model.pkl')), joblib.load(os.path.join(src_dir, 'scaler_v2.pkl')),
+                joblib.load(os.path.join(src_dir, 'feature_cols.pkl')), load_transformer(base_dir))
+        
+    triple_load_time, (model, scaler, feature_cols, transformer) = _best_time(load_triple)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pipeline_path = os.path.join(tmp_dir, RISK_PIPELINE)
+        joblib.dump(RiskPipeline(transformer, model, scaler, feature_cols), pipeline_path)
+        pipeline_load_time, pipeline = _best_time(lambda: joblib.load(pipeline_path))
+        
+    # Bloco bruto: indicadores, ano, gênero, fase e lags de cada registro da tabela de features
+    raw = load_table(os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_fe.arrow'), columns=RAW_COLS)[RAW_COLS].to_numpy(dtype=object)
+    
+    def previous_proba(rows):
+        features = transformer.transform(dict(zip(RAW_COLS, rows.T)), feature_cols)
+        df_scaled = scaler.transform(pd.DataFrame(features, columns=feature_cols))
+        model.predict(df_scaled)
+        return model.predict_proba(df_scaled)
+        
+    max_diff = float(np.abs(previous_proba(raw) - pipeline.predict_proba(raw)).max())
+    print(f"Diferença máxima de probabilidade (tabela de features): {max_diff}")
+    
+    rows = [
+        {'Caminho': 'Anterior (3 pickles + FeatureTransformer)', 'Cenário': 'carga', 'p50 (ms)': round(triple_load_time * 1000, 1),
+         'p99 (ms)': '-', 'Linhas/s': '-'},
+        {'Caminho': 'Pipeline único', 'Cenário': 'carga', 'p50 (ms)': round(pipeline_load_time * 1000, 1),
+         'p99 (ms)': '-', 'Linhas/s': '-'}
+    ]
+    paths = [('Anterior (3 pickles + FeatureTransformer)', previous_proba), ('Pipeline único', pipeline.predict_proba)]
+    for label, fn in paths:
+        latencies = []
+        for call in range(single_calls):
+            row = raw[call % len(raw)]
+            start = time.perf_counter()
+            fn(row.reshape(1, -1))
+            latencies.append(time.perf_counter() - start)
+        rows.append({'Caminho': label, 'Cenário': '1 linha', 'p50 (ms)': round(np.percentile(latencies, 50) * 1000, 4),
+                     'p99 (ms)': round(np.percentile(latencies, 99) * 1000, 4), 'Linhas/s': round(1 / np.median(latencies))})
+        print(rows[-1])
+        
+    for batch_size in batch_sizes:
+        batch = np.resize(raw, (batch_size, raw.shape[1]))
+        for label, fn in paths:
+            best, _ = _best_time(lambda: fn(batch))
+            rows.append({'Caminho': label, 'Cenário': f'lote de {batch_size}', 'p50 (ms)': '-', 'p99 (ms)': '-',
+                         'Linhas/s': round(batch_size / best)})
+            print(rows[-1])
+            
+    results_df = pd.DataFrame(rows)
+    notes = [
+        "Anterior: optimized_model.pkl + scaler_v2.pkl + feature_cols.pkl + feature_transformer.pkl; features do",
+        "FeatureTransformer, DataFrame com os nomes das colunas, scaler_v2.transform, predict e predict_proba.",
+        "Pipeline único: RiskPipeline.predict_proba sobre o bloco NumPy bruto (RAW_COLS), normalização sobre o",
+        f"array; até {FAST_PATH_ROWS} linhas, árvores compiladas com o scaler incorporado aos limiares.",
+        "Carga: melhor de 3 execuções de joblib.load.",
+        f"Diferença máxima de probabilidade na tabela de features: {max_diff}"
+    ]
+    _write_report(os.path.join(base_dir, 'notebooks', 'pipeline_benchmark.txt'),
+                  "Benchmark do Pipeline Único (risk_pipeline.pkl vs trio de pickles)", notes, results_df)
+    
+    return results_df
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline Passos Mágicos.")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    
+    storage_parser = subparsers.add_parser('storage', help="CSV vs formato tipado em Arrow.")
+    storage_parser.add_argument('--factor', type=int, default=100, help="Tamanho da réplica sintética.")
+    
+    subparsers.add_parser('temporal', help="Lags/deltas: groupby por indicador vs passagem única.")
+    
+    subparsers.add_parser('inference', help="Modelo em pickle vs árvores compiladas.")
+    
+    engines_parser = subparsers.add_parser('engines', help="GradientBoosting vs HistGradientBoosting nativo.")
+    engines_parser.add_argument('--factor', type=int, default=50, help="Tamanho da réplica sintética.")
+    
+    loading_parser = subparsers.add_parser('loading', help="Carga do modelo: pickles vs pacote com memory-map.")
+    loading_parser.add_argument('--workers', type=int, default=4, help="Processos simultâneos por cenário.")
+    
+    subparsers.add_parser('attribution', help="Importância por permutação e contribuições por aluno.")
+    
+    subparsers.add_parser('app', help="Predição por rerun dos apps: caminho anterior vs cache de predições.")
+    
+    roster_parser = subparsers.add_parser('roster', help="Painel de alunos: pontuação inicial e carga de páginas.")
+    roster_parser.add_argument('--factor', type=int, default=17, help="Tamanho da réplica sintética.")
+    
+    subparsers.add_parser('pipeline', help="Pipeline único vs trio de pickles: carga e latência de predict_proba.")
+    
+    metrics_parser = subparsers.add_parser('metrics', help="Métricas do scikit-learn vs curva de confusão em uma passagem.")
+    metrics_parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000],
+                                help="Números de linhas avaliadas.")
+    
+    args = parser.parse_args()
+    base_dir = os.path.join(os.path.dirname(__file__), '..')
+    
+    if args.benchmark == 'storage':
+        benchmark_storage(base_dir, factor=args.factor)
+    elif args.benchmark == 'temporal':
+        print(benchmark_temporal(base_dir).to_markdown(index=False))
+    elif args.benchmark == 'inference':
+        benchmark_inference(base_dir)
+    elif args.benchmark == 'engines':
+        benchmark_engines(base_dir, factor=args.factor)
+    elif args.benchmark == 'loading':
+        benchmark_model_loading(base_dir, workers=args.workers)
+    elif args.benchmark == 'attribution':
+        benchmark_attribution(base_dir)
+    elif args.benchmark == 'app':
+        benchmark_app_rerun(base_dir)
+    elif args.benchmark == 'roster':
+        benchmark_roster(base_dir, factor=args.factor)
+    elif args.benchmark == 'pipeline':
+        benchmark_pipeline(base_dir)
+    elif args.benchmark == 'metrics':
+        benchmark_metrics(base_dir, sizes=args.sizes)
+
+if __name__ == "__main__":
+    main()
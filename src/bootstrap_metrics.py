@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import os
+from joblib import Parallel, delayed
+from evaluation import METRIC_NAMES, safe_ratio
+
+# Intervalos de confiança bootstrap para as métricas de avaliação.
+#
+# Cada reamostragem (com reposição) do conjunto de teste é uma linha de uma matriz de
+# índices; as linhas viram contagens (quantas vezes cada amostra foi sorteada) e as
+# métricas de todas as reamostragens de um bloco saem de somas acumuladas sobre uma
+# única ordenação das probabilidades, como em evaluation.ConfusionCurve. Os blocos
+# rodam em paralelo (joblib) e cada um tem sua semente derivada de `random_state`, então
+# o resultado não depende de `n_jobs`.
+
+N_RESAMPLES = 2000
+
+CONFIDENCE = 0.95
+
+# Células (reamostragens x linhas) por bloco, para limitar a memória das somas acumuladas
+BLOCK_CELLS = 2_000_000
+
+CI_COLUMNS = [f'{name} {bound}' for name in METRIC_NAMES for bound in ('CI Low', 'CI High')]
+
+def _block_metrics(positive, last, n_above, n_resamples, seed):
+    """Métricas (n_resamples x METRIC_NAMES) de reamostragens sobre os dados já ordenados."""
+    n = len(positive)
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, n, size=(n_resamples, n))
+    # Contagens por linha: bincount com deslocamento de n por reamostragem
+    counts = np.bincount((indices + n * np.arange(n_resamples)[:, None]).ravel(), minlength=n_resamples * n)
+    counts = counts.reshape(n_resamples, n)
+    
+    tp_rows = np.cumsum(counts * positive, axis=1)
+    fp_rows = np.cumsum(counts * ~positive, axis=1)
+    tp, fp = tp_rows[:, last], fp_rows[:, last]
+    n_pos, n_neg = tp[:, -1].astype(np.float64), fp[:, -1].astype(np.float64)
+    
+    # Limiar de decisão: as n_above primeiras linhas (score > limiar) são positivas
+    tp_t = tp_rows[:, n_above - 1] if n_above else np.zeros(n_resamples)
+    fp_t = fp_rows[:, n_above - 1] if n_above else np.zeros(n_resamples)
+    fn_t = n_pos - tp_t
+    
+    # ROC-AUC (trapézios a partir de (0, 0)) e average precision
+    tpr = np.hstack([np.zeros((n_resamples, 1)), safe_ratio(tp, n_pos[:, None])])
+    fpr = np.hstack([np.zeros((n_resamples, 1)), safe_ratio(fp, n_neg[:, None])])
+    roc_auc = np.sum(np.diff(fpr, axis=1) * (tpr[:, 1:] + tpr[:, :-1]) / 2, axis=1)
+    pr_auc = np.sum(np.diff(tpr, axis=1) * safe_ratio(tp, tp + fp), axis=1)
+    
+    # Reamostragens com uma única classe não têm ROC-AUC/PR-AUC
+    degenerate = (n_pos == 0) | (n_neg == 0)
+    roc_auc[degenerate] = np.nan
+    pr_auc[degenerate] = np.nan
+    
+    return np.column_stack([
+        (tp_t + (n_neg - fp_t)) / n,
+        safe_ratio(tp_t, tp_t + fp_t),
+        safe_ratio(tp_t, n_pos),
+        safe_ratio(2 * tp_t, 2 * tp_t + fp_t + fn_t),
+        roc_auc,
+        pr_auc
+    ])
+
+def bootstrap_metrics(y_true, y_score, n_resamples=N_RESAMPLES, threshold=0.5, n_jobs=-1, random_state=42):
+    """Métricas de cada reamostragem bootstrap (DataFrame com uma coluna por métrica)."""
+    y_true = np.asarray(y_true).ravel()
+    y_score = np.asarray(y_score, dtype=np.float64).ravel()
+    order = np.argsort(y_score, kind='stable')[::-1]
+    score = y_score[order]
+    positive = y_true[order] == 1
+    last = np.r_[np.flatnonzero(np.diff(score)), len(score) - 1]
+    n_above = int(np.count_nonzero(score > threshold))
+    
+    block = max(1, min(n_resamples, BLOCK_CELLS // max(len(score), 1)))
+    sizes = [min(block, n_resamples - start) for start in range(0, n_resamples, block)]
+    seeds = np.random.SeedSequence(random_state).spawn(len(sizes))
+    blocks = Parallel(n_jobs=n_jobs)(
+        delayed(_block_metrics)(positive, last, n_above, size, seed) for size, seed in zip(sizes, seeds)
+    )
+    return pd.DataFrame(np.vstack(blocks), columns=METRIC_NAMES)
+
+def confidence_intervals(y_true, y_score, n_resamples=N_RESAMPLES, confidence=CONFIDENCE, threshold=0.5,
+                         n_jobs=-1, random_state=42):
+    """
+    Intervalos percentis bootstrap de cada métrica. Retorna {'<métrica> CI Low': ...,
+    '<métrica> CI High': ...} (CI_COLUMNS).
+    """
+    resamples = bootstrap_metrics(y_true, y_score, n_resamples, threshold, n_jobs, random_state)
+    alpha = (1 - confidence) / 2
+    low = resamples.quantile(alpha)
+    high = resamples.quantile(1 - alpha)
+    intervals = {}
+    for name in METRIC_NAMES:
+        intervals[f'{name} CI Low'] = float(low[name])
+        intervals[f'{name} CI High'] = float(high[name])
+    return intervals
+
+def format_interval(metrics, name, digits=4, confidence=CONFIDENCE):
+    """'0.7206 (IC 95%: 0.6781–0.7621)' para a métrica `name` de um dicionário com CI_COLUMNS."""
+    value = f"{metrics[name]:.{digits}f}"
+    if f'{name} CI Low' not in metrics:
+        return value
+    return f"{value} (IC {confidence:.0%}: {metrics[f'{name} CI Low']:.{digits}f}–{metrics[f'{name} CI High']:.{digits}f})"
+
+def save_metrics(path, model_name, metrics):
+    """Grava as métricas e os IC de um modelo em uma linha, no formato de model_comparison_results.csv."""
+    pd.DataFrame([{'Model': model_name, **{col: metrics[col] for col in METRIC_NAMES + CI_COLUMNS}}]).to_csv(path, index=False)
+    return path
+
+def first_metrics_file(candidates):
+    """(caminho, origem) do primeiro arquivo de `candidates` [(caminho, origem)] que existir, ou (None, None)."""
+    for path, source in candidates:
+        if os.path.exists(path):
+            return path, source
+    return None, None
+
+def read_metrics(path, model_prefix):
+    """Linha do modelo cujo nome começa com `model_prefix` num CSV de métricas, como dicionário (None se não houver)."""
+    results = pd.read_csv(path)
+    rows = results[results['Model'].str.startswith(model_prefix)]
+    return rows.iloc[0].to_dict() if len(rows) else None
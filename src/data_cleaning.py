@@ -1,11 +1,29 @@
-import pandas as pd
 import numpy as np
 import os
+from storage import load_table, save_table
+from student_index import build_index
 
-def load_data(file_path):
-    """Carrega o DataFrame processado."""
+# Colunas a serem mantidas para o modelo e EDA
+CORE_COLS = [
+    'aluno_id', 'ano', 'gnero', 'fase', 'anoingresso',
+    'ida', 'ieg', 'ips', 'ipp', 'iaa', 'ipv', 'ian', 'inde22', 'inde23',
+    'mat', 'por', 'ing', 'matem', 'portug', 'ingls', # Notas detalhadas
+    'defasagem', 'defas', # Indicadores de defasagem
+    'instituiodeensino', 'escola', # Contexto
+    'ativoinativo', 'ativoinativo1' # Status do aluno
+]
+
+# Colunas usadas pelas análises de eda_analysis
+EDA_COLS = ['aluno_id', 'ano', 'fase', 'ida', 'ieg', 'ips', 'ipp', 'iaa', 'ipv', 'ian', 'inde22']
+
+# Colunas que as etapas seguintes precisam das abas do PEDE ('ra' dá origem ao 'aluno_id').
+# No modo com projeção, apenas elas são lidas do Excel e das tabelas intermediárias.
+PIPELINE_COLS = list(dict.fromkeys(CORE_COLS + EDA_COLS + ['ra']))
+
+def load_data(file_path, columns=None):
+    """Carrega o DataFrame processado (apenas `columns`, se informado)."""
     try:
-        df = pd.read_csv(file_path)
+        df = load_table(file_path, columns=columns)
         return df
     except FileNotFoundError:
         print(f"Erro: Arquivo não encontrado em {file_path}")
@@ -17,8 +35,8 @@ def clean_data(df):
     """
     print("Iniciando limpeza de dados...")
     
-    # 1. Padronização da coluna 'gnero'
-    df['gnero'] = df['gnero'].replace({'Menina': 'Feminino', 'Menino': 'Masculino'})
+    # 1. Padronização da coluna 'gnero' (como texto, pois a tabela pode vir com categorias)
+    df['gnero'] = df['gnero'].astype(object).replace({'Menina': 'Feminino', 'Menino': 'Masculino'})
     
     # 2. Tratamento de valores nulos nas colunas de indicadores
     # Indicadores principais (IDA, IEG, IPS, IPP, IAA, IPV, IAN)
@@ -33,18 +51,8 @@ def clean_data(df):
     # Colunas com mais de 90% de nulos (ex: idade, destaqueipv1, avaliador6, inde2024)
     # Vamos manter apenas as colunas que são relevantes para a análise multidimensional e o modelo preditivo.
     
-    # Colunas a serem mantidas para o modelo e EDA
-    core_cols = [
-        'aluno_id', 'ano', 'gnero', 'fase', 'anoingresso',
-        'ida', 'ieg', 'ips', 'ipp', 'iaa', 'ipv', 'ian', 'inde22', 'inde23',
-        'mat', 'por', 'ing', 'matem', 'portug', 'ingls', # Notas detalhadas
-        'defasagem', 'defas', # Indicadores de defasagem
-        'instituiodeensino', 'escola', # Contexto
-        'ativoinativo', 'ativoinativo1' # Status do aluno
-    ]
-    
-    # Filtrar apenas as colunas principais
-    df_clean = df[df.columns.intersection(core_cols)].copy()
+    # Filtrar apenas as colunas principais (CORE_COLS)
+    df_clean = df[df.columns.intersection(CORE_COLS)].copy()
     
     # 4. Criação da variável alvo para o modelo preditivo (Risco de Defasagem)
     # Risco = 1 se IAN < 7.0 (Moderadamente ou Severamente Defasado), 0 caso contrário.
@@ -55,8 +63,8 @@ def clean_data(df):
     # 5. Renomear colunas para padronização (se necessário, mas já estão em minúsculas)
     
     # 6. Preenchimento de NaNs em colunas categóricas importantes
-    df_clean['fase'] = df_clean['fase'].fillna('NAO_INFORMADO')
-    df_clean['gnero'] = df_clean['gnero'].fillna('NAO_INFORMADO')
+    df_clean['fase'] = df_clean['fase'].astype(object).fillna('NAO_INFORMADO')
+    df_clean['gnero'] = df_clean['gnero'].astype(object).fillna('NAO_INFORMADO')
     
     print(f"Limpeza concluída. DataFrame final com {len(df_clean.columns)} colunas e {len(df_clean)} linhas.")
     
@@ -64,17 +72,20 @@ def clean_data(df):
 
 def main():
     base_dir = os.path.join(os.path.dirname(__file__), '..')
-    raw_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_clean.csv')
-    processed_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_final.csv')
+    raw_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_clean.arrow')
+    processed_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_final.arrow')
     
-    df = load_data(raw_data_path)
+    df = load_data(raw_data_path, columns=PIPELINE_COLS)
     
     if df is not None:
         df_clean = clean_data(df)
         
         # Salva o DataFrame limpo
-        df_clean.to_csv(processed_data_path, index=False)
+        save_table(df_clean, processed_data_path)
         print(f"\nDados limpos e pré-processados salvos em: {processed_data_path}")
+        
+        # Índice do histórico de cada aluno (linhas da tabela final por ano)
+        build_index(df_clean)
         print(f"Contagem de nulos no DataFrame final (Top 10):\n{df_clean.isnull().sum().sort_values(ascending=False).head(10)}")
 
 if __name__ == "__main__":
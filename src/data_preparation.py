@@ -1,43 +1,459 @@
 import pandas as pd
+import numpy as np
 import os
+import hashlib
+import json
+import zipfile
+import datetime
+import re
+import xml.etree.ElementTree as ET
+from storage import save_table
+from data_cleaning import PIPELINE_COLS
+from concurrent.futures import ProcessPoolExecutor
 
-def load_and_clean_data(file_path):
+# Diretório padrão do cache colunar das abas do Excel (um Parquet por aba)
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'cache')
+
+# Mapeamento das abas e seus respectivos anos
+SHEET_TO_YEAR = {
+    'PEDE2022': 2022,
+    'PEDE2023': 2023,
+    'PEDE2024': 2024
+}
+
+# Colunas de texto normalizadas na carga: as que as etapas seguintes usam
+# (as demais são descartadas pelo filtro de `clean_data`)
+TEXT_COLS = PIPELINE_COLS
+
+# Prefixo das colunas auxiliares que guardam o tipo original de colunas mistas
+_TYPE_PREFIX = '__tipo__'
+
+# Códigos de erro do Excel, lidos como NaN (mesmo comportamento do pandas)
+_ERROR_CODES = ('#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A')
+
+# Textos lidos como ausentes pelo pd.read_excel (na_values padrão do pandas)
+_NA_STRINGS = frozenset(['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                         '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'])
+
+_NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+def _file_sha256(file_path):
+    """Calcula o hash SHA-256 do arquivo em blocos."""
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _sheet_digests(file_path):
     """
-    Carrega as abas do arquivo Excel, unifica os dados e realiza a limpeza inicial.
+    Calcula uma assinatura por aba a partir do diretório do .xlsx (sem descomprimir).
+    
+    A assinatura de cada aba combina o CRC da planilha com o das partes compartilhadas
+    (sharedStrings e styles), que também influenciam os valores lidos. Para arquivos
+    que não são .xlsx, todas as abas usam o hash do arquivo inteiro.
     """
-    print(f"Carregando dados de: {file_path}")
+    try:
+        with zipfile.ZipFile(file_path) as zf:
+            workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+            rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+            targets = {rel.get('Id'): rel.get('Target').lstrip('/') for rel in rels.iter(f'{_NS_PKG_REL}Relationship')}
+            crcs = {info.filename: info.CRC for info in zf.infolist()}
+            
+            shared = [str(crcs.get(part)) for part in ('xl/sharedStrings.xml', 'xl/styles.xml')]
+            digests = {}
+            for sheet in workbook.iter(f'{_NS_MAIN}sheet'):
+                target = targets.get(sheet.get(f'{_NS_REL}id'), '')
+                part = target if target.startswith('xl/') else f'xl/{target}'
+                key = '|'.join([part, str(crcs.get(part))] + shared)
+                digests[sheet.get('name')] = hashlib.sha256(key.encode()).hexdigest()
+            return digests
+    except (zipfile.BadZipFile, KeyError):
+        return {}
+
+def _load_manifest(cache_dir):
+    """Carrega o manifesto do cache (ou um manifesto vazio)."""
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def _save_manifest(cache_dir, manifest):
+    """Salva o manifesto do cache de forma atômica."""
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def _workbook_state(file_path, previous):
+    """
+    Retorna o estado (tamanho, mtime, hash e assinaturas das abas) do workbook.
     
-    # Mapeamento das abas e seus respectivos anos
-    sheet_to_year = {
-        'PEDE2022': 2022,
-        'PEDE2023': 2023,
-        'PEDE2024': 2024
+    Se tamanho e mtime não mudaram desde a última execução, reaproveita o estado
+    anterior sem reler o arquivo.
+    """
+    stat = os.stat(file_path)
+    if previous and previous.get('size') == stat.st_size and previous.get('mtime_ns') == stat.st_mtime_ns:
+        return previous
+        
+    workbook_sha = _file_sha256(file_path)
+    state = {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': workbook_sha,
+        'digests': _sheet_digests(file_path),
+        'cached': (previous or {}).get('cached', {})
     }
+    return state
+
+def _sheet_digest(state, sheet_name):
+    """Assinatura de uma aba (cai para o hash do arquivo quando não há assinatura própria)."""
+    return state['digests'].get(sheet_name, state['sha256'])
+
+def _cache_file(cache_dir, file_path, sheet_name):
+    """Caminho do Parquet de uma aba, prefixado por um hash do caminho do workbook."""
+    prefix = hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()[:12]
+    return os.path.join(cache_dir, f'{prefix}_{sheet_name}.parquet')
+
+def _value_kind(value):
+    """Nome do tipo Python de um valor de célula (None para nulos)."""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, datetime.datetime):
+        return 'datetime'
+    if isinstance(value, datetime.date):
+        return 'date'
+    if isinstance(value, datetime.time):
+        return 'time'
+    return 'str'
+
+_KIND_PARSERS = {
+    'bool': lambda s: s == 'True',
+    'int': int,
+    'float': float,
+    'datetime': datetime.datetime.fromisoformat,
+    'date': datetime.date.fromisoformat,
+    'time': datetime.time.fromisoformat,
+    'str': str
+}
+
+def _to_cache_frame(df):
+    """
+    Converte a aba para um formato aceito pelo Parquet.
     
-    all_data = []
+    Colunas de objeto com tipos mistos (ex: 'fase' com textos e inteiros) são gravadas
+    como texto, acompanhadas de uma coluna auxiliar com o tipo original de cada valor,
+    para que a leitura do cache devolva exatamente os mesmos valores do Excel.
+    """
+    out = {}
+    for col in df.columns:
+        series = df[col]
+        if series.dtype == object:
+            kinds = series.map(_value_kind)
+            if set(kinds.dropna().unique()) - {'str'}:
+                out[col] = series.map(lambda v: None if _value_kind(v) is None else (v.isoformat() if hasattr(v, 'isoformat') else str(v)))
+                out[_TYPE_PREFIX + col] = kinds
+                continue
+        out[col] = series
+    return pd.DataFrame(out)
+
+def _from_cache_frame(df):
+    """Reconstrói as colunas mistas a partir das colunas auxiliares de tipo."""
+    type_cols = [col for col in df.columns if col.startswith(_TYPE_PREFIX)]
+    for type_col in type_cols:
+        col = type_col[len(_TYPE_PREFIX):]
+        df[col] = pd.Series(
+            [None if kind is None or pd.isna(kind) else _KIND_PARSERS[kind](value)
+             for value, kind in zip(df[col].tolist(), df[type_col].tolist())],
+            index=df.index, dtype=object
+        )
+    return df.drop(columns=type_cols)
+
+def _dedupe_header(header):
+    """Nomeia colunas vazias e duplicadas como o `pd.read_excel` ('Unnamed: i', 'X.1')."""
+    names, seen = [], {}
+    for i, name in enumerate(header):
+        name = f'Unnamed: {i}' if name is None else name
+        base = name
+        while name in seen:
+            seen[base] += 1
+            name = f'{base}.{seen[base]}'
+        seen[name] = 0
+        names.append(name)
+    return names
+
+def _convert_stream_value(value):
+    """Converte um valor de célula com as mesmas regras do leitor openpyxl do pandas."""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value in _ERROR_CODES:
+        return np.nan
+    return value
+
+def normalize_column_name(name):
+    """Padroniza um nome de coluna como em `_read_sheet` (minúsculas, só [a-z0-9_])."""
+    return re.sub('[^a-zA-Z0-9_]', '', str(name).lower())
+
+def _projection(columns, year):
+    """
+    Função `usecols` que mantém apenas as colunas da aba cujo nome padronizado está em
+    `columns` (None = todas). Inclui a 'pedra{ano}' quando 'fase_pedra_ano' é pedida.
+    """
+    if columns is None:
+        return None
+    wanted = set(columns)
+    if 'fase_pedra_ano' in wanted:
+        wanted.add(f'pedra{year}')
+    return lambda name: normalize_column_name(name) in wanted
+
+def _convert_stream_columns(df):
+    """
+    Conversões do pd.read_excel sobre as células lidas (colunas object): textos de ausência
+    viram NaN, colunas só com números (ou textos numéricos) viram int64/float64 e as demais
+    recebem o tipo inferido (texto, datas).
+    """
+    for col in df.columns:
+        series = df[col].map(lambda v: np.nan if isinstance(v, str) and v in _NA_STRINGS else v)
+        if pd.api.types.infer_dtype(series, skipna=True) in ('integer', 'floating', 'mixed-integer-float', 'string', 'empty'):
+            try:
+                series = pd.to_numeric(series)
+            except (ValueError, TypeError):
+                pass
+        df[col] = series.infer_objects()
+    return df
+
+def read_sheet_streaming(file_path, sheet_name, chunk_rows=5000, usecols=None):
+    """
+    Lê uma aba com o openpyxl em modo somente leitura, em blocos de `chunk_rows` linhas.
     
-    for sheet_name, year in sheet_to_year.items():
-        try:
-            # Leitura da aba
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
-            
-            # Adiciona a coluna 'Ano'
-            df['Ano'] = year
+    Cada bloco vira um DataFrame de células (object) assim que é lido, então a memória de
+    trabalho não cresce com listas de células da aba inteira (útil para abas com dezenas
+    de milhares de alunos). As conversões do `pd.read_excel` (ausentes, tipos numéricos)
+    são aplicadas no fim, sobre a aba inteira, e o resultado equivale ao de `pd.read_excel`.
+    
+    `usecols` (função sobre o nome da coluna) descarta as demais colunas antes da
+    conversão das células.
+    """
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        if sheet_name not in workbook.sheetnames:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        sheet = workbook[sheet_name]
+        sheet.reset_dimensions()
+        
+        rows = sheet.iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        while header and header[-1] is None:
+            header.pop()
+        columns = _dedupe_header(header)
+        keep = [i for i, name in enumerate(columns) if usecols is None or usecols(name)]
+        columns = [columns[i] for i in keep]
+        
+        chunks, chunk, pending_empty = [], [], []
+        for row in rows:
+            values = [_convert_stream_value(row[i]) if i < len(row) else '' for i in keep]
+            if all(v is None for v in row):
+                # Linhas vazias só são mantidas se houver dados depois delas
+                pending_empty.append(values)
+                continue
+            chunk.extend(pending_empty)
+            pending_empty = []
+            chunk.append(values)
+            if len(chunk) >= chunk_rows:
+                chunks.append(pd.DataFrame(chunk, columns=columns, dtype=object))
+                chunk = []
+        if chunk or not chunks:
+            chunks.append(pd.DataFrame(chunk, columns=columns, dtype=object))
+    finally:
+        workbook.close()
+        
+    # Conversões do pd.read_excel sobre a aba inteira, para que o tipo de cada coluna não
+    # dependa de `chunk_rows`
+    return _convert_stream_columns(pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0])
+
+def _read_sheet(file_path, sheet_name, year, reader='pandas', columns=None):
+    """Lê uma aba do Excel (apenas `columns`, se informado) e padroniza as colunas."""
+    # Leitura da aba
+    usecols = _projection(columns, year)
+    if reader == 'stream':
+        df = read_sheet_streaming(file_path, sheet_name, usecols=usecols)
+    else:
+        df = pd.read_excel(file_path, sheet_name=sheet_name, usecols=usecols)
+        
+    # Adiciona a coluna 'Ano'
+    df['Ano'] = year
+    
+    # Padroniza nomes de colunas para minúsculas e substitui caracteres especiais
+    df.columns = df.columns.str.lower().str.replace('[^a-zA-Z0-9_]', '', regex=True)
+    
+    # Renomeia colunas com nomes muito parecidos (ex: Pedra 20, Pedra 21, Pedra 22)
+    # A coluna 'Pedra' deve ser a fase do aluno no ano em questão.
+    if f'pedra{year}' in df.columns:
+        df = df.rename(columns={f'pedra{year}': 'fase_pedra_ano'})
+        
+    return df
+
+def _cache_entry(state, sheet_name):
+    """Entrada do manifesto de uma aba: {'digest', 'columns'} ('columns' None = aba completa)."""
+    entry = state['cached'].get(sheet_name)
+    if isinstance(entry, str):
+        # Formato antigo do manifesto (apenas a assinatura)
+        entry = {'digest': entry, 'columns': None}
+    return entry
+
+def _read_cached_sheet(cache_dir, file_path, sheet_name, state, columns=None):
+    """
+    Lê uma aba do cache, se o Parquet existir, corresponder à versão atual da aba e
+    contiver as colunas pedidas. Apenas as colunas em `columns` são lidas do Parquet.
+    """
+    cache_path = _cache_file(cache_dir, file_path, sheet_name)
+    entry = _cache_entry(state, sheet_name)
+    if not entry or entry['digest'] != _sheet_digest(state, sheet_name) or not os.path.exists(cache_path):
+        return None
+    if columns is None:
+        if entry['columns'] is not None:
+            return None
+        return _from_cache_frame(pd.read_parquet(cache_path))
+    if entry['columns'] is not None and not set(columns) <= set(entry['columns']):
+        return None
+        
+    import pyarrow.parquet as pq
+    
+    wanted = set(columns)
+    names = [name for name in pq.read_schema(cache_path).names
+             if name in wanted or (name.startswith(_TYPE_PREFIX) and name[len(_TYPE_PREFIX):] in wanted)]
+    return _from_cache_frame(pd.read_parquet(cache_path, columns=names))
+
+def _write_cached_sheet(cache_dir, file_path, sheet_name, df, state, columns=None):
+    """Grava uma aba já padronizada (com as colunas lidas) no cache colunar."""
+    cache_path = _cache_file(cache_dir, file_path, sheet_name)
+    if df.columns.duplicated().any():
+        print(f"Aba '{sheet_name}' possui colunas duplicadas após a padronização; cache ignorado.")
+        return
+    _to_cache_frame(df).to_parquet(cache_path, index=False)
+    state['cached'][sheet_name] = {
+        'digest': _sheet_digest(state, sheet_name),
+        'columns': sorted(columns) if columns is not None else None
+    }
+
+def normalize_text_columns(df, columns=TEXT_COLS):
+    """
+    Remove espaços das colunas de texto e as converte em categorias, in-place.
+    
+    O strip é aplicado apenas aos valores distintos de cada coluna, e as linhas passam
+    a guardar só o código da categoria, sem criar uma nova string por linha. Valores que
+    não são texto viram NaN, como no `.str.strip()`. Colunas fora de `columns` são
+    ignoradas (`None` = todas). Nenhuma coluna é convertida para minúsculas: gênero,
+    fase e escola mantêm a grafia que define as categorias do treino.
+    """
+    for col in df.columns:
+        if columns is not None and col not in columns:
+            continue
+        dtype = df[col].dtype
+        if not (dtype == object or isinstance(dtype, pd.StringDtype)):
+            continue
             
-            # Padroniza nomes de colunas para minúsculas e substitui caracteres especiais
-            df.columns = df.columns.str.lower().str.replace('[^a-zA-Z0-9_]', '', regex=True)
+        codes, uniques = pd.factorize(df[col])
+        values = pd.Series(uniques, dtype=dtype).str.strip()
             
-            # Renomeia colunas com nomes muito parecidos (ex: Pedra 20, Pedra 21, Pedra 22)
-            # A coluna 'Pedra' deve ser a fase do aluno no ano em questão.
-            if f'pedra{year}' in df.columns:
-                df = df.rename(columns={f'pedra{year}': 'fase_pedra_ano'})
+        # Valores que ficam iguais após o strip passam a compartilhar o mesmo código
+        value_codes, categories = pd.factorize(values)
+        codes = np.where(codes >= 0, value_codes[codes], -1)
+        df[col] = pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype=object))
+    return df
+
+def _parse_sheets(file_path, pending, reader, n_jobs, columns=None):
+    """
+    Lê as abas pendentes, em paralelo quando `n_jobs` > 1 (um processo por aba).
+    
+    Retorna {nome_da_aba: DataFrame ou ValueError}, para que o chamador trate abas
+    ausentes da mesma forma nos modos sequencial e paralelo.
+    """
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    workers = min(n_jobs or 1, len(pending))
+    
+    results = {}
+    if workers <= 1:
+        for sheet_name, year in pending:
+            try:
+                results[sheet_name] = _read_sheet(file_path, sheet_name, year, reader, columns)
+            except ValueError as e:
+                results[sheet_name] = e
+        return results
+        
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {sheet_name: executor.submit(_read_sheet, file_path, sheet_name, year, reader, columns)
+                   for sheet_name, year in pending}
+        for sheet_name, future in futures.items():
+            try:
+                results[sheet_name] = future.result()
+            except ValueError as e:
+                results[sheet_name] = e
+    return results
+
+def load_sheets(file_path, sheet_to_year=None, cache_dir=CACHE_DIR, n_jobs=1, reader='pandas', columns=None):
+    """
+    Lê as abas de `sheet_to_year` (padrão: SHEET_TO_YEAR) já com colunas padronizadas.
+    
+    Retorna a lista de DataFrames na ordem das abas; abas ausentes são ignoradas.
+    """
+    sheet_to_year = SHEET_TO_YEAR if sheet_to_year is None else sheet_to_year
+    
+    # Estado do cache para este workbook
+    manifest, state = None, None
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        manifest = _load_manifest(cache_dir)
+        state = _workbook_state(file_path, manifest.get(os.path.abspath(file_path)))
+        
+    # Abas já presentes no cache
+    sheets = {}
+    for sheet_name, year in sheet_to_year.items():
+        df = _read_cached_sheet(cache_dir, file_path, sheet_name, state, columns) if state else None
+        if df is not None:
+            sheets[sheet_name] = df
+            print(f"Aba '{sheet_name}' ({year}) carregada do cache com {len(df)} linhas.")
             
-            all_data.append(df)
-            print(f"Aba '{sheet_name}' ({year}) carregada com {len(df)} linhas.")
+    # Abas que precisam ser lidas do Excel
+    pending = [(sheet_name, year) for sheet_name, year in sheet_to_year.items() if sheet_name not in sheets]
+    parsed = _parse_sheets(file_path, pending, reader, n_jobs, columns) if pending else {}
+    
+    for sheet_name, year in pending:
+        df = parsed[sheet_name]
+        if isinstance(df, ValueError):
+            print(f"Aba '{sheet_name}' não encontrada ou erro de leitura: {df}")
+            continue
             
-        except ValueError as e:
-            print(f"Aba '{sheet_name}' não encontrada ou erro de leitura: {e}")
+        if state:
+            _write_cached_sheet(cache_dir, file_path, sheet_name, df, state, columns)
             
+        sheets[sheet_name] = df
+        print(f"Aba '{sheet_name}' ({year}) carregada com {len(df)} linhas.")
+        
+    if state:
+        manifest[os.path.abspath(file_path)] = state
+        _save_manifest(cache_dir, manifest)
+        
+    # Mantém a ordem original das abas
+    return [sheets[sheet_name] for sheet_name in sheet_to_year if sheet_name in sheets]
+
+def combine_sheets(all_data, text_cols=TEXT_COLS):
+    """Unifica as abas lidas e realiza a limpeza inicial."""
     if not all_data:
         print("Nenhuma aba de dados foi carregada com sucesso.")
         return None
@@ -47,10 +463,9 @@ def load_and_clean_data(file_path):
     print(f"Total de linhas após concatenação: {len(combined_df)}")
     
     # Limpeza adicional:
-    # 1. Colunas de texto com espaços em branco (strip)
-    for col in combined_df.select_dtypes(include=['object']).columns:
-        combined_df[col] = combined_df[col].str.strip()
-        
+    # 1. Colunas de texto com espaços em branco (strip), convertidas em categorias
+    normalize_text_columns(combined_df, columns=text_cols)
+    
     # 2. Preenchimento de valores nulos em colunas numéricas (por enquanto, com 0 ou média, dependendo do contexto)
     # Para colunas de indicadores (IDA, IAN, IEG, IPS, IPP, IPV, INDE), vamos preencher com a média ou um valor que indique ausência de dado (NaN).
     # Por enquanto, vamos manter NaN para análise posterior.
@@ -64,21 +479,58 @@ def load_and_clean_data(file_path):
     
     return combined_df
 
+def load_and_clean_data(file_path, cache_dir=CACHE_DIR, n_jobs=1, reader='pandas', text_cols=TEXT_COLS, columns=None, sheet_to_year=None):
+    """
+    Carrega as abas do arquivo Excel, unifica os dados e realiza a limpeza inicial.
+    
+    Cada aba é convertida uma única vez para Parquet em `cache_dir`, já com os nomes
+    de colunas padronizados. Nas execuções seguintes apenas as abas cuja origem mudou
+    são relidas do Excel. Use `cache_dir=None` para desativar o cache.
+    
+    `n_jobs` > 1 (ou -1 para todos os núcleos) lê as abas em processos paralelos;
+    `reader='stream'` usa o leitor openpyxl somente leitura em blocos. O DataFrame
+    final é o mesmo em todos os modos (mesma ordem de abas e de colunas).
+    
+    Apenas as colunas de texto em `text_cols` são normalizadas (`None` = todas).
+    Com `columns` (ex: PIPELINE_COLS), apenas essas colunas são lidas do Excel ou do
+    cache; as demais nunca chegam a ser materializadas.
+    """
+    print(f"Carregando dados de: {file_path}")
+    
+    all_data = load_sheets(file_path, sheet_to_year, cache_dir=cache_dir, n_jobs=n_jobs, reader=reader, columns=columns)
+    
+    return combine_sheets(all_data, text_cols=text_cols)
+
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Carrega e unifica as abas do PEDE.")
+    parser.add_argument('--n-jobs', type=int, default=1, help="Processos para ler as abas (-1 = todos os núcleos).")
+    parser.add_argument('--reader', choices=['pandas', 'stream'], default='pandas', help="Leitor do Excel.")
+    parser.add_argument('--no-cache', action='store_true', help="Ignora o cache colunar das abas.")
+    parser.add_argument('--project', action='store_true', help="Lê apenas as colunas usadas pelo pipeline (PIPELINE_COLS).")
+    args = parser.parse_args()
+    
     # Define o caminho para o arquivo de dados
     base_dir = os.path.join(os.path.dirname(__file__), '..')
     raw_data_path = os.path.join(base_dir, 'data', 'raw', 'BASE DE DADOS PEDE 2024 - DATATHON.xlsx')
-    processed_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_clean.csv')
+    processed_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_clean.arrow')
     
     # Garante que o diretório de saída existe
     os.makedirs(os.path.join(base_dir, 'data', 'processed'), exist_ok=True)
     
     # Carrega e limpa os dados
-    clean_df = load_and_clean_data(raw_data_path)
+    clean_df = load_and_clean_data(
+        raw_data_path,
+        cache_dir=None if args.no_cache else CACHE_DIR,
+        n_jobs=args.n_jobs,
+        reader=args.reader,
+        columns=PIPELINE_COLS if args.project else None
+    )
     
     if clean_df is not None:
         # Salva o DataFrame limpo
-        clean_df.to_csv(processed_data_path, index=False)
+        save_table(clean_df, processed_data_path)
         print(f"\nDados limpos salvos em: {processed_data_path}")
         print(f"Colunas do DataFrame final: {clean_df.columns.tolist()}")
         print(f"Primeiras 5 linhas do DataFrame final:\n{clean_df.head()}")
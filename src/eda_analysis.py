@@ -2,15 +2,19 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+from storage import load_table
+from data_cleaning import EDA_COLS
+from temporal_features import add_temporal_features
+from student_index import load_index
 
 # Configuração para evitar problemas com caracteres especiais no Matplotlib
 plt.rcParams['font.family'] = 'sans-serif'
 plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
 
-def load_processed_data(file_path):
-    """Carrega o DataFrame processado."""
+def load_processed_data(file_path, columns=None):
+    """Carrega o DataFrame processado (apenas `columns`, se informado)."""
     try:
-        df = pd.read_csv(file_path)
+        df = load_table(file_path, columns=columns)
         print(f"Dados carregados com sucesso. Total de linhas: {len(df)}")
         return df
     except FileNotFoundError:
@@ -141,7 +145,7 @@ def analyze_iaa_ida_ieg(df):
     
     return correlation_matrix
 
-def analyze_ips_performance(df):
+def analyze_ips_performance(df, index=None):
     """
     5. Aspectos psicossociais (IPS): Há padrões psicossociais (IPS) que
     antecedem quedas de desempenho acadêmico ou de engajamento?
@@ -149,20 +153,11 @@ def analyze_ips_performance(df):
     print("\n--- Análise de IPS e Quedas de Desempenho/Engajamento ---")
     
     # Para esta análise, precisamos de dados de IPS de um ano e IDA/IEG do ano seguinte.
-    # Como o dataset está unificado, vamos criar um DataFrame com os dados do ano anterior.
-    
-    # Renomear colunas para o ano atual
-    current_cols = ['aluno_id', 'ano', 'ida', 'ieg']
-    df_current = df[current_cols].copy()
-    
-    # Renomear colunas para o ano anterior (IPS)
-    prev_cols = ['aluno_id', 'ano', 'ips']
-    df_prev = df[prev_cols].copy()
-    df_prev['ano'] = df_prev['ano'] + 1
-    df_prev = df_prev.rename(columns={'ips': 'ips_prev'})
-    
-    # Merge dos dados
-    merged_df = pd.merge(df_current, df_prev, on=['aluno_id', 'ano'], how='inner').dropna()
+    # O IPS do ano anterior vem do mesmo motor de lags do feature engineering, exigindo
+    # que o registro anterior do aluno seja exatamente do ano `ano - 1` (com o índice de
+    # histórico, a ordenação por aluno e ano não é refeita).
+    df_lag = add_temporal_features(df[['aluno_id', 'ano', 'ida', 'ieg', 'ips']], ['ips'], lags=(1,), deltas=(), consecutive=True, index=index)
+    merged_df = df_lag.rename(columns={'ips_lag1': 'ips_prev'})[['aluno_id', 'ano', 'ida', 'ieg', 'ips_prev']].dropna()
     
     # Correlação entre IPS do ano anterior e IDA/IEG do ano atual
     correlation_matrix = merged_df[['ips_prev', 'ida', 'ieg']].corr()
@@ -274,9 +269,9 @@ def analyze_multidimensionality(df):
 
 def main():
     base_dir = os.path.join(os.path.dirname(__file__), '..')
-    processed_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_clean.csv')
+    processed_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_clean.arrow')
     
-    df = load_processed_data(processed_data_path)
+    df = load_processed_data(processed_data_path, columns=EDA_COLS)
     
     if df is not None:
         # 1. Análise do IAN
@@ -292,7 +287,9 @@ def main():
         corr_iaa_ida_ieg = analyze_iaa_ida_ieg(df)
         
         # 5. Análise de IPS e Quedas de Desempenho/Engajamento
-        corr_ips_lag = analyze_ips_performance(df)
+        # O índice é da tabela final: só é usado se a tabela limpa tiver as mesmas
+        # linhas de aluno e ano (impressão digital); senão, a tabela é ordenada
+        corr_ips_lag = analyze_ips_performance(df, index=load_index())
         
         # 6. Análise da Coerência IPP e IAN
         corr_ipp_ian = analyze_ipp_ian(df)
@@ -1,10 +1,10 @@
-import pandas as pd
 import os
+from storage import load_table
 
 def load_data(file_path):
     """Carrega o DataFrame processado."""
     try:
-        df = pd.read_csv(file_path)
+        df = load_table(file_path)
         return df
     except FileNotFoundError:
         print(f"Erro: Arquivo não encontrado em {file_path}")
@@ -66,7 +66,7 @@ def initial_eda(df):
 
 def main():
     base_dir = os.path.join(os.path.dirname(__file__), '..')
-    processed_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_clean.csv')
+    processed_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_clean.arrow')
     
     df = load_data(processed_data_path)
     
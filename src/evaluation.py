@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+# Métricas de classificação binária a partir de uma única ordenação das probabilidades.
+#
+# As probabilidades são ordenadas uma vez (decrescente) e as somas acumuladas dos
+# rótulos dão, para cada valor distinto de probabilidade, quantos positivos e negativos
+# ficam acima dele: a matriz de confusão em todos os limiares. Acurácia, precisão,
+# recall e F1 em qualquer limiar, ROC-AUC e PR-AUC (average precision) saem desses
+# vetores sem novas passagens pelos dados, e a tabela de limiares custa apenas uma
+# busca binária por limiar.
+#
+# Uma amostra é positiva quando a probabilidade é maior que o limiar, como no predict
+# dos classificadores do scikit-learn (limiar 0.5).
+
+METRIC_NAMES = ['Accuracy', 'Precision', 'Recall', 'F1-Score', 'ROC-AUC', 'PR-AUC']
+
+# Limiares da tabela de ajuste (0.10, 0.15, ..., 0.90)
+DEFAULT_THRESHOLDS = np.round(np.arange(0.10, 0.901, 0.05), 2)
+
+def safe_ratio(numerator, denominator):
+    """numerator / denominator, com 0 onde o denominador é 0 (como zero_division=0 no scikit-learn)."""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros(np.broadcast(numerator, denominator).shape), where=denominator > 0)
+
+class ConfusionCurve:
+    """Matriz de confusão em todos os limiares, calculada com uma ordenação das probabilidades."""
+    
+    def __init__(self, y_true, y_score):
+        y_true = np.asarray(y_true).ravel()
+        y_score = np.asarray(y_score, dtype=np.float64).ravel()
+        if len(y_true) != len(y_score):
+            raise ValueError(f"y_true e y_score têm tamanhos diferentes: {len(y_true)} e {len(y_score)}.")
+            
+        order = np.argsort(y_score, kind='stable')[::-1]
+        score = y_score[order]
+        positive = y_true[order] == 1
+        # Última posição de cada valor distinto (empates entram juntos no mesmo limiar)
+        last = np.r_[np.flatnonzero(np.diff(score)), len(score) - 1] if len(score) else np.array([], dtype=np.int64)
+        
+        # thresholds (decrescente); tp[i]/fp[i]: positivos/negativos com score >= thresholds[i]
+        self.thresholds = score[last]
+        self.tp = np.cumsum(positive, dtype=np.int64)[last]
+        self.fp = (last + 1) - self.tp
+        self.n_pos = int(np.count_nonzero(positive))
+        self.n_neg = len(score) - self.n_pos
+        
+    def __len__(self):
+        return self.n_pos + self.n_neg
+        
+    def counts(self, thresholds):
+        """(TP, FP, FN, TN) para cada limiar, com positivo = score > limiar."""
+        thresholds = np.atleast_1d(np.asarray(thresholds, dtype=np.float64))
+        # Quantos valores distintos são maiores que cada limiar (thresholds é decrescente)
+        above = np.searchsorted(-self.thresholds, -thresholds, side='left')
+        tp = np.r_[0, self.tp][above]
+        fp = np.r_[0, self.fp][above]
+        return tp, fp, self.n_pos - tp, self.n_neg - fp
+        
+    def _check_both_classes(self):
+        if self.n_pos == 0 or self.n_neg == 0:
+            raise ValueError("ROC-AUC e PR-AUC exigem as duas classes em y_true.")
+            
+    def roc_points(self):
+        """(FPR, TPR, limiares) da curva ROC, começando em (0, 0)."""
+        self._check_both_classes()
+        fpr = np.r_[0.0, self.fp / self.n_neg]
+        tpr = np.r_[0.0, self.tp / self.n_pos]
+        return fpr, tpr, np.r_[np.inf, self.thresholds]
+        
+    def roc_auc(self):
+        """Área sob a curva ROC (trapézios; empates contam meio ponto, como no scikit-learn)."""
+        fpr, tpr, _ = self.roc_points()
+        return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+        
+    def pr_auc(self):
+        """Área sob a curva precisão-recall como average precision (mesma definição do scikit-learn)."""
+        self._check_both_classes()
+        precision = self.tp / (self.tp + self.fp)
+        recall = self.tp / self.n_pos
+        return float(np.sum(np.diff(np.r_[0.0, recall]) * precision))
+        
+    def threshold_table(self, thresholds=DEFAULT_THRESHOLDS):
+        """Matriz de confusão e métricas em cada limiar (tabela para escolher o ponto de corte)."""
+        thresholds = np.atleast_1d(np.asarray(thresholds, dtype=np.float64))
+        tp, fp, fn, tn = self.counts(thresholds)
+        precision = safe_ratio(tp, tp + fp)
+        recall = safe_ratio(tp, self.n_pos)
+        return pd.DataFrame({
+            'Threshold': thresholds,
+            'TP': tp, 'FP': fp, 'FN': fn, 'TN': tn,
+            'Accuracy': safe_ratio(tp + tn, len(self)),
+            'Precision': precision,
+            'Recall': recall,
+            'F1-Score': safe_ratio(2 * tp, 2 * tp + fp + fn),
+            'Flagged (%)': 100 * safe_ratio(tp + fp, len(self))
+        })
+        
+    def metrics(self, threshold=0.5):
+        """Acurácia, precisão, recall e F1 no limiar, mais ROC-AUC e PR-AUC."""
+        row = self.threshold_table([threshold]).iloc[0]
+        metrics = {name: float(row[name]) for name in ['Accuracy', 'Precision', 'Recall', 'F1-Score']}
+        metrics['ROC-AUC'] = self.roc_auc()
+        metrics['PR-AUC'] = self.pr_auc()
+        return metrics
+
+def evaluate_scores(y_true, y_score, threshold=0.5):
+    """Métricas (METRIC_NAMES) a partir das probabilidades da classe 1."""
+    return ConfusionCurve(y_true, y_score).metrics(threshold)
+
+def predict_from_scores(y_score, threshold=0.5):
+    """Classes previstas a partir das probabilidades (mesma regra das métricas)."""
+    return (np.asarray(y_score) > threshold).astype(np.int64)
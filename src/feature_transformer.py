@@ -0,0 +1,120 @@
+import pandas as pd
+import numpy as np
+import os
+import joblib
+from model_preparation import select_model_rows, FEATURE_COLS, TEMPORAL_COLS, DELTA_COLS, ENCODED_COLS
+from temporal_features import lag_name, delta_name
+
+# Derivação das features do modelo, ajustada no treino e compartilhada por todos os
+# consumidores (treino, pontuação em lote, apps e serviço HTTP).
+#
+# O FeatureTransformer é ajustado primeiro, sobre a tabela final do treino: guarda os
+# códigos das categorias (na ordem do LabelEncoder), usados por `feature_engineering`,
+# as medianas de imputação da tabela de features, usadas por `prepare_model_data`, e a
+# ordem de feature_cols.pkl, e é gravado ao lado dele em
+# src/feature_transformer.pkl. O `transform` calcula interações, razão, média, deltas e
+# códigos com operações vetorizadas sobre colunas inteiras, em float64 como no treino, e
+# serve tanto para um aluno (valores escalares) quanto para lotes grandes.
+
+FEATURE_TRANSFORMER = 'feature_transformer.pkl'
+
+INDICATOR_COLS = ['ida', 'ieg', 'ips', 'ipp', 'iaa', 'ipv']
+
+MISSING_CATEGORY = 'NAO_INFORMADO'
+
+# Mesma padronização de `clean_data`
+CATEGORY_ALIASES = {'gnero': {'Menina': 'Feminino', 'Menino': 'Masculino'}}
+
+class FeatureTransformer:
+    """Features do modelo a partir dos indicadores, ano, gênero, fase e lags de cada aluno."""
+    
+    def __init__(self, feature_cols, categories, medians=None):
+        self.feature_cols = list(feature_cols)
+        # Coluna codificada -> classes na ordem dos códigos
+        self.categories = {col: list(classes) for col, classes in categories.items()}
+        # Coluna -> mediana de imputação
+        self.medians = {col: float(value) for col, value in (medians or {}).items()}
+        
+    @classmethod
+    def fit(cls, df, feature_cols=FEATURE_COLS):
+        """
+        Ajusta os códigos das categorias sobre a tabela final do treino: classes ordenadas,
+        como no LabelEncoder, com os ausentes em MISSING_CATEGORY. As medianas são ajustadas
+        depois, sobre a tabela de features (`fit_medians`).
+        """
+        categories = {}
+        for encoded_col, source_col in ENCODED_COLS.items():
+            values = df[source_col].astype(object).fillna(MISSING_CATEGORY).map(lambda value: str(value).strip())
+            categories[encoded_col] = sorted(values.unique())
+        return cls(feature_cols, categories)
+        
+    def fit_medians(self, df_fe):
+        """Medianas de imputação de feature_cols nas linhas de modelagem da tabela de features."""
+        medians = select_model_rows(df_fe)[self.feature_cols].median()
+        self.medians = {col: float(value) for col, value in medians.items()}
+        return self
+        
+    def encode(self, encoded_col, values):
+        """
+        Códigos de uma coluna categórica. Valores ausentes ou desconhecidos recebem o código
+        de MISSING_CATEGORY (NaN, imputado pela mediana, se ela não existir no treino).
+        """
+        source_col = ENCODED_COLS[encoded_col]
+        lookup = {value: code for code, value in enumerate(self.categories[encoded_col])}
+        aliases = CATEGORY_ALIASES.get(source_col, {})
+        fallback = lookup.get(MISSING_CATEGORY, np.nan)
+        
+        def code(value):
+            value = str(value).strip()
+            return lookup.get(aliases.get(value, value), fallback)
+            
+        # Um código por valor distinto; ausentes (-1 no factorize) vão para a última posição
+        inverse, uniques = pd.factorize(np.atleast_1d(np.asarray(values, dtype=object)))
+        return np.array([code(value) for value in uniques] + [fallback], dtype=np.float64)[inverse]
+        
+    def transform(self, data, columns=None):
+        """
+        Matriz de features (float64, n x len(columns)) na ordem de `columns` (padrão:
+        feature_cols). `data` é um DataFrame ou um dicionário coluna -> valores (listas,
+        arrays ou escalares) com os indicadores, 'ano', 'gnero' e 'fase' e, opcionalmente,
+        os lags do ano anterior; ausentes são imputados pela mediana.
+        """
+        columns = self.feature_cols if columns is None else list(columns)
+        n = len(data) if isinstance(data, pd.DataFrame) else max(np.size(values) for values in data.values())
+        
+        def numeric(col):
+            if col not in data:
+                return np.full(n, np.nan)
+            values = data[col]
+            if isinstance(values, pd.Series):
+                return pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+            values = np.asarray(values, dtype=np.float64)
+            return values.reshape(n) if values.size == n else np.full(n, values, dtype=np.float64)
+            
+        features = {col: numeric(col) for col in INDICATOR_COLS + ['ano']}
+        ida, ieg, ips, ipp = features['ida'], features['ieg'], features['ips'], features['ipp']
+        
+        # Mesmas operações de `add_row_features`
+        features['ida_ieg_interaction'] = ida * ieg
+        features['ipp_ips_interaction'] = ipp * ips
+        features['ida_ieg_ratio'] = ida / (ieg + 0.001)
+        indicators = np.column_stack([features[col] for col in INDICATOR_COLS])
+        counts = np.count_nonzero(~np.isnan(indicators), axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            features['mean_indicators'] = np.nansum(indicators, axis=1) / counts
+            
+        for col in TEMPORAL_COLS:
+            features[lag_name(col, 1)] = numeric(lag_name(col, 1))
+        for col in DELTA_COLS:
+            features[delta_name(col, 1)] = features[col] - features[lag_name(col, 1)]
+        for encoded_col, source_col in ENCODED_COLS.items():
+            if encoded_col in columns:
+                features[encoded_col] = self.encode(encoded_col, data[source_col] if source_col in data else [None] * n)
+                
+        X = np.column_stack([features[col] for col in columns])
+        medians = np.array([self.medians.get(col, np.nan) for col in columns])
+        return np.where(np.isnan(X), medians, X)
+
+def load_transformer(base_dir):
+    """Carrega src/feature_transformer.pkl (gerado por model_preparation.py)."""
+    return joblib.load(os.path.join(base_dir, 'src', FEATURE_TRANSFORMER))
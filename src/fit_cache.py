@@ -0,0 +1,127 @@
+import numpy as np
+import os
+import json
+import time
+import hashlib
+import joblib
+import sklearn
+
+# Cache persistente de modelos treinados, endereçado por conteúdo.
+#
+# A chave é o hash dos arrays de treino, da classe do estimador e dos seus parâmetros
+# (e da versão do scikit-learn, já que pickles não são portáveis entre versões). Cada
+# entrada guarda o modelo treinado (joblib) e as métricas calculadas com ele; o índice
+# registra o último uso e o tamanho dos arquivos, e as entradas menos usadas
+# recentemente são removidas quando o cache passa de `max_bytes`.
+
+FIT_CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'cache', 'fit_cache')
+
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+
+def _params_repr(estimator):
+    """Parâmetros do estimador em forma canônica (valores não-JSON via repr)."""
+    params = estimator.get_params(deep=True)
+    return json.dumps({name: params[name] for name in sorted(params)}, sort_keys=True, default=repr)
+
+def array_digest(*arrays):
+    """Hash do conteúdo, tipo e formato dos arrays."""
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f'{array.dtype.str}|{array.shape}'.encode('utf-8'))
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def fit_key(estimator, X, y):
+    """Chave do cache para `estimator.fit(X, y)`."""
+    estimator_class = f'{type(estimator).__module__}.{type(estimator).__qualname__}'
+    payload = '|'.join([array_digest(X, y), estimator_class, _params_repr(estimator), sklearn.__version__])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class FitCache:
+    """Modelos treinados em disco, com remoção LRU limitada por tamanho."""
+    
+    def __init__(self, cache_dir=FIT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.index = self._load_index()
+        if self._evict():
+            self._save_index()
+        
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+            
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+        
+    def _model_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.joblib')
+        
+    def get(self, key):
+        """Retorna (modelo, entrada do índice) ou None. Marca a entrada como usada."""
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        try:
+            model = joblib.load(self._model_path(key))
+        except Exception:
+            # Arquivo ausente ou ilegível: a entrada é descartada e o modelo será retreinado
+            self._remove(key)
+            self._save_index()
+            return None
+        entry['last_used'] = time.time()
+        self._save_index()
+        return model, entry
+        
+    def put(self, key, model, estimator_name, metrics=None, metrics_key=None):
+        """Grava o modelo treinado (e as métricas calculadas com ele) e aplica o limite de tamanho."""
+        model_path = self._model_path(key)
+        tmp_path = model_path + '.tmp'
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, model_path)
+        self.index[key] = {
+            'estimator': estimator_name,
+            'size': os.path.getsize(model_path),
+            'last_used': time.time(),
+            'metrics': metrics,
+            'metrics_key': metrics_key
+        }
+        self._evict(keep=key)
+        self._save_index()
+        
+    def update_metrics(self, key, metrics, metrics_key):
+        """Substitui as métricas de uma entrada (ex: novo conjunto de teste)."""
+        self.index[key].update({'metrics': metrics, 'metrics_key': metrics_key})
+        self._save_index()
+        
+    def total_bytes(self):
+        return sum(entry['size'] for entry in self.index.values())
+        
+    def _remove(self, key):
+        self.index.pop(key, None)
+        if os.path.exists(self._model_path(key)):
+            os.remove(self._model_path(key))
+            
+    def _evict(self, keep=None):
+        """Remove as entradas menos usadas recentemente até caber em `max_bytes`. Retorna se removeu algo."""
+        removed = False
+        by_last_use = sorted(self.index, key=lambda key: self.index[key]['last_used'])
+        total = self.total_bytes()
+        for key in by_last_use:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self.index[key]['size']
+            print(f"Cache de modelos: removendo {self.index[key]['estimator']} ({key[:12]}) por falta de espaço")
+            self._remove(key)
+            removed = True
+        return removed
@@ -0,0 +1,68 @@
+import pandas as pd
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.model_selection import train_test_split
+from model_preparation import FEATURE_COLS, TARGET_COL, ENCODED_COLS, select_model_rows
+
+# Motor alternativo de treino: HistGradientBoostingClassifier sobre as features sem
+# imputação e sem normalização. Os NaNs (inclusive os lags de alunos sem ano anterior)
+# são tratados nativamente pelas árvores, e gênero/fase entram como categóricas nativas
+# (códigos inteiros com categorical_features) em vez dos códigos do LabelEncoder.
+# 'NAO_INFORMADO' é tratado como valor ausente.
+
+CATEGORICAL_COLS = list(ENCODED_COLS.values())
+
+# Mesma ordem de FEATURE_COLS, com as colunas categóricas no lugar das codificadas
+HGB_FEATURE_COLS = [ENCODED_COLS.get(col, col) for col in FEATURE_COLS]
+CATEGORICAL_INDICES = [HGB_FEATURE_COLS.index(col) for col in CATEGORICAL_COLS]
+
+# Parâmetros padrão do motor (sem early stopping, para que o número de iterações seja fixo)
+HGB_PARAMS = {'max_iter': 100, 'learning_rate': 0.1, 'random_state': 42, 'early_stopping': False}
+
+# Grid da busca de hiperparâmetros (max_iter é o recurso do successive halving)
+HGB_PARAM_GRID = {
+    'max_iter': [100, 200],
+    'learning_rate': [0.05, 0.1, 0.2],
+    'max_leaf_nodes': [15, 31, 63],
+    'min_samples_leaf': [10, 20],
+    'l2_regularization': [0.0, 1.0]
+}
+
+MISSING_CATEGORY = 'NAO_INFORMADO'
+
+def make_hgb_model(**params):
+    """HistGradientBoostingClassifier com as categóricas nativas de HGB_FEATURE_COLS."""
+    return HistGradientBoostingClassifier(categorical_features=CATEGORICAL_INDICES, **{**HGB_PARAMS, **params})
+
+def category_maps(df):
+    """Categorias de cada coluna categórica (ordenadas), sem o valor de ausência."""
+    return {
+        col: sorted(str(value) for value in df[col].dropna().unique() if value != MISSING_CATEGORY)
+        for col in CATEGORICAL_COLS
+    }
+
+def native_features(df, categories):
+    """Matriz de features do motor HGB (float64, NaN = ausente; categorias como códigos)."""
+    X = pd.DataFrame(index=df.index)
+    for col in HGB_FEATURE_COLS:
+        if col in categories:
+            codes = pd.Categorical(df[col].astype(object), categories=categories[col]).codes
+            X[col] = np.where(codes >= 0, codes, np.nan)
+        else:
+            X[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    return X.to_numpy(dtype='float64')
+
+def prepare_native_data(df, categories=None):
+    """
+    Versão de `prepare_model_data` para o motor HGB: mesmas linhas e mesmo split
+    treino/teste, sem imputação pela mediana, sem normalização e com categóricas nativas.
+    """
+    df_model = select_model_rows(df)
+    categories = categories or category_maps(df_model)
+    X = native_features(df_model, categories)
+    y = df_model[TARGET_COL]
+    
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+    return X_train, X_test, y_train, y_test, categories
@@ -0,0 +1,134 @@
+import numpy as np
+import os
+import json
+import math
+import hashlib
+import itertools
+import time
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+from sklearn.metrics import roc_auc_score
+
+# Busca de hiperparâmetros por successive halving para modelos de boosting.
+#
+# O recurso é o número de estágios de boosting (n_estimators no Gradient Boosting,
+# max_iter no HistGradientBoosting): todas as configurações começam com poucas árvores
+# e, a cada rodada, só a fração 1/eta com melhor ROC-AUC (CV) continua. Os modelos usam
+# warm_start, então passar de 100 para 200 árvores reaproveita as 100 já treinadas. As
+# rodadas incluem os valores do recurso no grid, que são os pontos candidatos ao melhor
+# modelo; os demais servem apenas para a poda.
+#
+# Cada (configuração, número de estágios) avaliado fica num cache JSON com as notas por fold;
+# rodar de novo, por exemplo com o grid ampliado, só treina os pontos ainda ausentes.
+
+CACHE_VERSION = 1
+
+def _point_key(data_key, params, resource, n_stages):
+    payload = json.dumps({'data': data_key, 'params': params, resource: n_stages}, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def data_fingerprint(X, y, cv, random_state, base_model=None):
+    """
+    Identifica dados + validação cruzada (+ estimador base): notas de outro conjunto ou
+    de outro modelo não são reaproveitadas.
+    """
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(X).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    digest.update(f'{X.shape}|{cv}|{random_state}'.encode('utf-8'))
+    if base_model is not None:
+        params = json.dumps(base_model.get_params(), sort_keys=True, default=repr)
+        digest.update(f'{type(base_model).__name__}|{params}'.encode('utf-8'))
+    return digest.hexdigest()
+
+def load_cache(path):
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        cache = json.load(f)
+    return cache.get('entries', {}) if cache.get('version') == CACHE_VERSION else {}
+
+def save_cache(path, entries):
+    if path is None:
+        return
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_VERSION, 'entries': entries}, f)
+    os.replace(tmp_path, path)
+
+def halving_rungs(stages_grid, min_resources=10, eta=3):
+    """Números de estágios avaliados: min_resources * eta^k abaixo do máximo + os valores do grid."""
+    max_resources = max(stages_grid)
+    rungs = set(stages_grid)
+    resources = min_resources
+    while resources < max_resources:
+        rungs.add(resources)
+        resources *= eta
+    return sorted(rungs)
+
+def _advance(model, base_model, params, resource, n_stages, X, y, train_idx, val_idx):
+    """Treina (ou continua, via warm_start) até `n_stages` estágios e avalia no fold."""
+    if model is None:
+        model = clone(base_model).set_params(warm_start=True, **params)
+    model.set_params(**{resource: n_stages})
+    model.fit(X[train_idx], y[train_idx])
+    score = roc_auc_score(y[val_idx], model.predict_proba(X[val_idx])[:, 1])
+    return model, float(score)
+
+def successive_halving_search(base_model, param_grid, X, y, cv=5, eta=3, min_resources=10,
+                              n_jobs=-1, cache_path=None, random_state=42, resource='n_estimators'):
+    """
+    Successive halving sobre os estágios de boosting. `param_grid` segue o formato do
+    GridSearchCV e deve conter `resource` (parâmetro com o número de estágios). Retorna
+    (melhores parâmetros, melhor ROC-AUC médio, tabela com todos os pontos avaliados).
+    """
+    stages_grid = sorted(param_grid[resource])
+    names = sorted(name for name in param_grid if name != resource)
+    candidates = [dict(zip(names, values)) for values in itertools.product(*(param_grid[name] for name in names))]
+    rungs = halving_rungs(stages_grid, min_resources, eta)
+    
+    folds = list(StratifiedKFold(n_splits=cv).split(X, y))
+    base_model = clone(base_model).set_params(random_state=random_state)
+    data_key = data_fingerprint(X, y, cv, random_state, base_model)
+    cache = load_cache(cache_path)
+    
+    models = {}
+    results = []
+    alive = list(range(len(candidates)))
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for rung_number, n_stages in enumerate(rungs):
+            start = time.perf_counter()
+            keys = {c: _point_key(data_key, candidates[c], resource, n_stages) for c in alive}
+            pending = [c for c in alive if keys[c] not in cache]
+            # Sem o modelo da rodada anterior (ponto anterior veio do cache), treina do zero
+            outputs = parallel(
+                delayed(_advance)(models.get((c, fold)), base_model, candidates[c], resource, n_stages, X, y, train_idx, val_idx)
+                for c in pending for fold, (train_idx, val_idx) in enumerate(folds)
+            )
+            for i, c in enumerate(pending):
+                fold_outputs = outputs[i * cv:(i + 1) * cv]
+                for fold, (model, _) in enumerate(fold_outputs):
+                    models[(c, fold)] = model
+                cache[keys[c]] = {'params': candidates[c], resource: n_stages,
+                                  'scores': [score for _, score in fold_outputs]}
+            save_cache(cache_path, cache)
+            
+            scores = {c: float(np.mean(cache[keys[c]]['scores'])) for c in alive}
+            for c in alive:
+                results.append({**candidates[c], resource: n_stages, 'rodada': rung_number,
+                                'roc_auc_cv': scores[c], 'em_cache': c not in pending})
+            print(f"Rodada {rung_number}: {n_stages} árvores, {len(alive)} configurações "
+                  f"({len(pending)} treinadas, {len(alive) - len(pending)} do cache) em {time.perf_counter() - start:.1f}s")
+                  
+            if rung_number < len(rungs) - 1:
+                keep = max(1, math.ceil(len(alive) / eta))
+                alive = sorted(alive, key=lambda c: scores[c], reverse=True)[:keep]
+                models = {key: model for key, model in models.items() if key[0] in alive}
+                
+    # Melhor ponto entre os valores do recurso no grid
+    grid_points = [row for row in results if row[resource] in stages_grid]
+    best = max(grid_points, key=lambda row: row['roc_auc_cv'])
+    best_params = {name: best[name] for name in names}
+    best_params[resource] = best[resource]
+    return best_params, best['roc_auc_cv'], results
@@ -0,0 +1,236 @@
+import pandas as pd
+import os
+import json
+import hashlib
+import tempfile
+import argparse
+from storage import load_table, save_table, apply_schema, table_path, widen_numeric
+from data_preparation import load_sheets, combine_sheets, SHEET_TO_YEAR, CACHE_DIR
+from data_cleaning import clean_data, CORE_COLS, PIPELINE_COLS
+from model_preparation import feature_engineering, add_encoded_features
+from feature_transformer import FeatureTransformer
+from student_index import build_index, load_index
+
+# Modo incremental do pré-processamento: quando chega um novo ano do PEDE, apenas as
+# linhas da nova aba passam por data_preparation -> data_cleaning -> feature_engineering
+# e são anexadas às tabelas persistidas. O resultado é idêntico (byte a byte) ao de
+# uma reconstrução completa, o que pode ser conferido com `python incremental.py verify`.
+
+TABLES = ['pedagogy_data_clean', 'pedagogy_data_final', 'pedagogy_data_fe']
+
+MANIFEST_NAME = 'incremental_manifest.json'
+
+def _index_dir(processed_dir):
+    """Diretório do índice de histórico dos alunos em `processed_dir`."""
+    return os.path.join(processed_dir, 'student_index')
+
+def _paths(processed_dir):
+    """Caminhos das tabelas intermediárias em `processed_dir`."""
+    return {table: table_path(os.path.join(processed_dir, f'{table}.arrow')) for table in TABLES}
+
+def _default_manifest(base_dir):
+    """Manifesto equivalente ao pipeline padrão (abas de SHEET_TO_YEAR do workbook do PEDE)."""
+    workbook = os.path.join(base_dir, 'data', 'raw', 'BASE DE DADOS PEDE 2024 - DATATHON.xlsx')
+    return {
+        'sources': [[os.path.abspath(workbook), sheet_name, year] for sheet_name, year in SHEET_TO_YEAR.items()],
+        'project': False
+    }
+
+def load_manifest(processed_dir, base_dir):
+    """Carrega a lista de abas que compõem as tabelas persistidas."""
+    manifest_path = os.path.join(processed_dir, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return _default_manifest(base_dir)
+
+def save_manifest(processed_dir, manifest):
+    """Salva a lista de abas que compõem as tabelas persistidas."""
+    with open(os.path.join(processed_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+def _read_sources(sources, columns):
+    """Lê as abas listadas em `sources` ([workbook, aba, ano]), na ordem do manifesto."""
+    all_data = []
+    for workbook, sheet_name, year in sources:
+        all_data.extend(load_sheets(workbook, {sheet_name: year}, cache_dir=CACHE_DIR, columns=columns))
+    return all_data
+
+def rebuild(manifest, processed_dir):
+    """
+    Reconstrói as três tabelas do zero, exatamente como os scripts de cada etapa
+    (data_preparation -> data_cleaning -> model_preparation).
+    """
+    paths = _paths(processed_dir)
+    columns = PIPELINE_COLS if manifest['project'] else None
+    
+    clean_df = combine_sheets(_read_sources(manifest['sources'], columns))
+    save_table(clean_df, paths['pedagogy_data_clean'])
+    
+    df_final = clean_data(load_table(paths['pedagogy_data_clean'], columns=PIPELINE_COLS))
+    save_table(df_final, paths['pedagogy_data_final'])
+    build_index(df_final, _index_dir(processed_dir))
+    
+    df_fe = feature_engineering(load_table(paths['pedagogy_data_final']), index=load_index(_index_dir(processed_dir)))
+    save_table(df_fe, paths['pedagogy_data_fe'])
+
+def _is_text(series):
+    """Indica se a coluna é de texto (objeto, string ou categoria)."""
+    dtype = series.dtype
+    return dtype == object or isinstance(dtype, (pd.StringDtype, pd.CategoricalDtype))
+
+def _schema_conflicts(existing_df, new_df):
+    """
+    Colunas que são texto de um lado e não-texto do outro (com valores nos dois lados).
+    
+    Na reconstrução completa essas colunas seriam unificadas como texto antes da
+    normalização, o que alteraria linhas antigas; nesses casos o modo incremental
+    não é equivalente e a reconstrução completa é usada.
+    """
+    conflicts = []
+    for col in existing_df.columns.intersection(new_df.columns):
+        old, new = existing_df[col], new_df[col]
+        if _is_text(old) != _is_text(new) and old.notna().any() and new.notna().any():
+            conflicts.append(col)
+    return conflicts
+
+def _as_text(series):
+    """Valores como texto, como `apply_schema` grava as colunas mistas (nulos mantidos)."""
+    return series.astype(object).map(lambda v: v if pd.isna(v) else str(v))
+
+def _coerce_to_text(existing_df, new_df, conflicts):
+    """
+    Converte para texto, na nova aba, as colunas em conflito que estão fora de
+    PIPELINE_COLS e já são texto na tabela gravada. Na reconstrução completa a coluna
+    unificada também seria gravada como texto (str de cada valor) sem alterar as linhas
+    antigas, e ela não chega às tabelas final e de features. Retorna os conflitos restantes.
+    """
+    remaining = []
+    for col in conflicts:
+        if col not in PIPELINE_COLS and _is_text(existing_df[col]):
+            new_df[col] = _as_text(new_df[col])
+        else:
+            remaining.append(col)
+    return remaining
+
+def append_year(manifest, processed_dir, workbook, sheet_name, year):
+    """
+    Anexa a aba de um novo ano às tabelas persistidas, processando apenas as suas linhas.
+    
+    - pedagogy_data_clean: a nova aba é normalizada e concatenada ao final;
+    - pedagogy_data_final: `clean_data` roda só sobre as novas linhas;
+    - pedagogy_data_fe: as features de lag/delta são calculadas apenas para os alunos
+      do novo ano (usando o histórico deles); os anos anteriores são reaproveitados.
+      
+    Retorna 'incremental' ou 'rebuild' (quando a nova aba muda o tipo de uma coluna do
+    pipeline ou de uma coluna que não é texto na tabela gravada).
+    """
+    paths = _paths(processed_dir)
+    columns = PIPELINE_COLS if manifest['project'] else None
+    
+    existing_years = [source_year for _, _, source_year in manifest['sources']]
+    if year <= max(existing_years):
+        raise ValueError(f"O ano {year} não é posterior aos anos já processados ({max(existing_years)}).")
+        
+    new_sheets = load_sheets(workbook, {sheet_name: year}, cache_dir=CACHE_DIR, columns=columns)
+    if not new_sheets:
+        raise ValueError(f"Aba '{sheet_name}' não encontrada em {workbook}.")
+        
+    manifest = dict(manifest, sources=manifest['sources'] + [[os.path.abspath(workbook), sheet_name, year]])
+    
+    existing_clean = load_table(paths['pedagogy_data_clean'])
+    conflicts = _coerce_to_text(existing_clean, new_sheets[0], _schema_conflicts(existing_clean, new_sheets[0]))
+    if conflicts:
+        print(f"Colunas com tipo diferente na nova aba {conflicts}: reconstrução completa.")
+        rebuild(manifest, processed_dir)
+        return manifest, 'rebuild'
+        
+    # 1. Tabela limpa: novas linhas ao final (a coluna 'aluno_id' continua sendo a última)
+    new_clean = combine_sheets(new_sheets)
+    clean_df = pd.concat([existing_clean, new_clean], ignore_index=True)
+    clean_columns = [col for col in clean_df.columns if col != 'aluno_id'] + (['aluno_id'] if 'aluno_id' in clean_df.columns else [])
+    clean_df = clean_df[clean_columns]
+    save_table(clean_df, paths['pedagogy_data_clean'])
+    
+    # 2. Tabela final: `clean_data` apenas nas novas linhas, com os tipos da tabela gravada
+    new_final = clean_data(apply_schema(new_clean[new_clean.columns.intersection(PIPELINE_COLS)]))
+    existing_final = load_table(paths['pedagogy_data_final'])
+    final_columns = [col for col in clean_columns if col in CORE_COLS] + ['risco_defasagem']
+    new_final = new_final.reindex(columns=final_columns)
+    df_final = pd.concat([existing_final.reindex(columns=final_columns), new_final], ignore_index=True)
+    save_table(df_final, paths['pedagogy_data_final'])
+    build_index(df_final, _index_dir(processed_dir))
+    
+    # 3. Features: lag/delta só para os alunos do novo ano, a partir do histórico deles
+    history = existing_final[existing_final['aluno_id'].isin(new_final['aluno_id'].dropna())]
+    subset = pd.concat([history.reindex(columns=final_columns), new_final], ignore_index=True)
+    # Mesmos tipos que `load_table` entregaria na reconstrução completa (inteiros reduzidos em disco, int64 no cálculo)
+    subset_fe = feature_engineering(widen_numeric(apply_schema(subset)))
+    new_fe = subset_fe[subset_fe.index >= len(history)]
+    
+    existing_fe = load_table(paths['pedagogy_data_fe'])
+    df_fe = pd.concat([existing_fe, new_fe], ignore_index=True)[new_fe.columns]
+    # Encodings recalculados sobre a tabela inteira, pois uma categoria nova
+    # (ex: 'FASE 9') desloca os códigos do LabelEncoder
+    df_fe = add_encoded_features(df_fe, FeatureTransformer.fit(df_final))
+    df_fe = df_fe.sort_values(['aluno_id', 'ano'], kind='stable')
+    save_table(df_fe, paths['pedagogy_data_fe'])
+    
+    return manifest, 'incremental'
+
+def _file_sha256(path):
+    """Hash SHA-256 de um arquivo."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def verify(manifest, processed_dir):
+    """
+    Reconstrói as tabelas num diretório temporário e compara, byte a byte, com as
+    tabelas persistidas. Retorna True se todas forem idênticas.
+    """
+    paths = _paths(processed_dir)
+    identical = True
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        rebuild(manifest, tmp_dir)
+        rebuilt_paths = _paths(tmp_dir)
+        for table in TABLES:
+            same = _file_sha256(paths[table]) == _file_sha256(rebuilt_paths[table])
+            identical = identical and same
+            print(f"{table}: {'idêntica' if same else 'DIFERENTE'} à reconstrução completa")
+    return identical
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-processamento incremental por ano do PEDE.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    rebuild_parser = subparsers.add_parser('rebuild', help="Reconstrói todas as tabelas a partir das abas do manifesto.")
+    rebuild_parser.add_argument('--project', action='store_true', help="Lê apenas PIPELINE_COLS das abas.")
+    
+    append_parser = subparsers.add_parser('append', help="Anexa a aba de um novo ano às tabelas persistidas.")
+    append_parser.add_argument('--sheet', required=True, help="Nome da aba (ex: PEDE2025).")
+    append_parser.add_argument('--year', type=int, required=True, help="Ano da aba (ex: 2025).")
+    append_parser.add_argument('--workbook', help="Workbook da nova aba (padrão: workbook do PEDE).")
+    
+    subparsers.add_parser('verify', help="Confere se as tabelas persistidas são idênticas a uma reconstrução completa.")
+    
+    args = parser.parse_args()
+    base_dir = os.path.join(os.path.dirname(__file__), '..')
+    processed_dir = os.path.join(base_dir, 'data', 'processed')
+    manifest = load_manifest(processed_dir, base_dir)
+    
+    if args.command == 'rebuild':
+        manifest['project'] = args.project
+        rebuild(manifest, processed_dir)
+        save_manifest(processed_dir, manifest)
+        print("\nTabelas reconstruídas com sucesso!")
+    elif args.command == 'append':
+        workbook = args.workbook or manifest['sources'][-1][0]
+        manifest, mode = append_year(manifest, processed_dir, workbook, args.sheet, args.year)
+        save_manifest(processed_dir, manifest)
+        print(f"\nAba '{args.sheet}' ({args.year}) anexada (modo: {mode}).")
+    elif args.command == 'verify':
+        if not verify(manifest, processed_dir):
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
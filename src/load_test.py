@@ -0,0 +1,147 @@
+import numpy as np
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+
+# Teste de carga do serviço de predição (scoring_service.py), apenas com a biblioteca
+# padrão: `concurrency` conexões keep-alive enviam requisições em paralelo e, ao final,
+# são exibidas a vazão e a latência vista pelo cliente e as métricas do próprio serviço.
+
+# Categorias enviadas nas requisições sintéticas
+GENEROS = ['Feminino', 'Masculino']
+FASES = ['ALFA', 'FASE 1', 'FASE 2', 'FASE 3', 'FASE 4', 'FASE 5', 'FASE 6', 'FASE 7', 'FASE 8']
+
+def random_students(n, seed=42):
+    """Alunos sintéticos com indicadores e categorias válidos para o app."""
+    rng = np.random.default_rng(seed)
+    indicators = rng.uniform(0, 10, size=(n, 6)).round(2)
+    generos = rng.choice(GENEROS, size=n)
+    fases = rng.choice(FASES, size=n)
+    anos = rng.choice([2022, 2023, 2024], size=n)
+    return [
+        {
+            'ida': row[0], 'ieg': row[1], 'ips': row[2], 'ipp': row[3], 'iaa': row[4], 'ipv': row[5],
+            'ano': int(ano), 'genero': str(genero), 'fase': str(fase)
+        }
+        for row, genero, fase, ano in zip(indicators.tolist(), generos, fases, anos)
+    ]
+
+def _request(method, path, host, body=b''):
+    """Requisição HTTP/1.1 com keep-alive."""
+    return (
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+    ).encode('latin-1') + body
+
+async def _read_response(reader):
+    """Lê uma resposta HTTP e retorna (status, corpo JSON)."""
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value.strip())
+    return status, json.loads(await reader.readexactly(length))
+
+async def _worker(host, port, payloads, latencies, failures):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for payload in payloads:
+            start = time.perf_counter()
+            writer.write(_request('POST', '/predict', host, payload))
+            await writer.drain()
+            status, _ = await _read_response(reader)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                failures.append(status)
+    finally:
+        writer.close()
+
+async def get_json(host, port, path):
+    """GET simples (usado para /health e /metrics)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(_request('GET', path, host))
+        await writer.drain()
+        return await _read_response(reader)
+    finally:
+        writer.close()
+
+async def run_load_test(host, port, n_requests=2000, concurrency=32, batch_size=1):
+    """Dispara `n_requests` requisições (de `batch_size` alunos) em `concurrency` conexões."""
+    students = random_students(n_requests * batch_size)
+    if batch_size == 1:
+        payloads = [json.dumps(student).encode('utf-8') for student in students]
+    else:
+        payloads = [
+            json.dumps({'instances': students[i:i + batch_size]}).encode('utf-8')
+            for i in range(0, len(students), batch_size)
+        ]
+        
+    latencies, failures = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        _worker(host, port, payloads[i::concurrency], latencies, failures)
+        for i in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+    
+    _, server_metrics = await get_json(host, port, '/metrics')
+    return {
+        'requisicoes': len(latencies),
+        'falhas': len(failures),
+        'alunos_por_requisicao': batch_size,
+        'conexoes': concurrency,
+        'duracao_s': round(elapsed, 3),
+        'requisicoes_por_s': round(len(latencies) / elapsed, 1),
+        'alunos_por_s': round(len(latencies) * batch_size / elapsed, 1),
+        'cliente_p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'cliente_p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'servidor': server_metrics
+    }
+
+async def _wait_until_healthy(host, port, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            status, _ = await get_json(host, port, '/health')
+            if status == 200:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"O serviço não respondeu em http://{host}:{port}/health")
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do serviço de predição.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--requests', type=int, default=2000, help="Total de requisições.")
+    parser.add_argument('--concurrency', type=int, default=32, help="Conexões simultâneas.")
+    parser.add_argument('--batch-size', type=int, default=1, help="Alunos por requisição.")
+    parser.add_argument('--start-server', action='store_true', help="Inicia o serviço localmente durante o teste.")
+    args = parser.parse_args()
+    
+    server = None
+    if args.start_server:
+        service_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scoring_service.py')
+        server = subprocess.Popen([sys.executable, service_path, '--host', args.host, '--port', str(args.port)])
+    try:
+        asyncio.run(_wait_until_healthy(args.host, args.port))
+        results = asyncio.run(run_load_test(args.host, args.port, args.requests, args.concurrency, args.batch_size))
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
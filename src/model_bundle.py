@@ -0,0 +1,165 @@
+import numpy as np
+import os
+import json
+import mmap
+import struct
+from scipy.special import expit
+from tree_compiler import CompiledGradientBoosting, compile_gradient_boosting
+
+# Pacote único do modelo (model bundle), usado pelos apps no lugar dos vários pickles.
+#
+# Um arquivo contém o estimador em arrays sem compressão, os parâmetros do scaler e a
+# lista de features, e é aberto com memory-map: os arrays não são desserializados nem
+# copiados, e os workers do Streamlit que abrem o mesmo arquivo compartilham as páginas
+# do cache do sistema operacional.
+#
+# Layout: MAGIC (8 bytes) | tamanho do cabeçalho (uint64, little-endian) | cabeçalho
+# JSON | arrays, cada um alinhado a ALIGNMENT bytes a partir do início dos dados.
+
+MAGIC = b'PMBUNDLE'
+BUNDLE_VERSION = 2
+ALIGNMENT = 64
+
+# Pacotes gerados em src/ (ao lado dos pickles de origem)
+LOGISTIC_BUNDLE = 'logistic_model.bundle'
+OPTIMIZED_BUNDLE = 'optimized_model.bundle'
+
+class BundledScaler:
+    """Parâmetros de um StandardScaler, com a mesma transformação do scikit-learn."""
+    
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+        self.n_features_in_ = len(mean)
+        
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+class BundledLogisticRegression:
+    """Regressão logística binária a partir dos coeficientes (mesmas saídas do scikit-learn)."""
+    
+    def __init__(self, coef, intercept, classes):
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.classes_ = classes
+        
+    def decision_function(self, X):
+        return (np.asarray(X, dtype=np.float64) @ self.coef_.T + self.intercept_).ravel()
+        
+    def predict_proba(self, X):
+        proba = expit(self.decision_function(X))
+        return np.column_stack([1 - proba, proba])
+        
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+def _scaler_arrays(scaler, n_features):
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+    return {'scaler_mean': np.asarray(mean, dtype=np.float64), 'scaler_scale': np.asarray(scale, dtype=np.float64)}
+
+def write_bundle(path, kind, arrays, params, feature_cols):
+    """Grava o pacote (arquivo temporário + os.replace, pois o anterior pode estar mapeado)."""
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+        
+    header = json.dumps({
+        'format_version': BUNDLE_VERSION, 'kind': kind, 'feature_cols': list(feature_cols),
+        'params': params, 'arrays': layout
+    }).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+    header += b' ' * (data_start - len(MAGIC) - 8 - len(header))
+    
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<Q', len(header)) + header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp_path, path)
+
+def read_bundle(path):
+    """Abre o pacote com memory-map. Retorna (cabeçalho, arrays somente leitura)."""
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} não é um pacote de modelo.")
+    (header_size,) = struct.unpack_from('<Q', buffer, len(MAGIC))
+    data_start = len(MAGIC) + 8 + header_size
+    header = json.loads(bytes(buffer[len(MAGIC) + 8:data_start]))
+    if header.get('format_version') != BUNDLE_VERSION:
+        raise ValueError(f"Versão de pacote não suportada: {header.get('format_version')}")
+        
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + spec['offset']).reshape(spec['shape'])
+    return header, arrays
+
+def save_bundle(path, model, scaler, feature_cols):
+    """
+    Grava modelo + scaler + features em um pacote. Suporta o GradientBoostingClassifier
+    (árvores achatadas, comparadas sobre as features normalizadas) e a LogisticRegression.
+    """
+    n_features = len(feature_cols)
+    arrays = _scaler_arrays(scaler, n_features)
+    if hasattr(model, 'estimators_'):
+        compiled = compile_gradient_boosting(model)
+        tree_arrays = compiled.arrays()
+        tree_arrays.pop('meta')
+        arrays.update({name: array.astype(np.int64) if array.dtype.kind == 'i' else array for name, array in tree_arrays.items()})
+        params = {'init': compiled.init, 'max_depth': compiled.max_depth, 'n_features': compiled.n_features}
+        kind = 'gradient_boosting'
+    elif hasattr(model, 'coef_'):
+        if model.coef_.shape[0] != 1:
+            raise ValueError("Apenas classificação binária é suportada.")
+        arrays.update({'coef': model.coef_, 'intercept': model.intercept_, 'classes': np.asarray(model.classes_, dtype=np.int64)})
+        params = {}
+        kind = 'logistic_regression'
+    else:
+        raise ValueError(f"Modelo não suportado: {type(model).__name__}")
+    write_bundle(path, kind, arrays, params, feature_cols)
+
+def load_bundle(path):
+    """Carrega um pacote gravado por `save_bundle`. Retorna (modelo, scaler, feature_cols)."""
+    header, arrays = read_bundle(path)
+    scaler = BundledScaler(arrays['scaler_mean'], arrays['scaler_scale'])
+    params = header['params']
+    if header['kind'] == 'gradient_boosting':
+        model = CompiledGradientBoosting(
+            arrays['feature'], arrays['threshold'], arrays['left'], arrays['right'], arrays['missing_left'],
+            arrays['value'], arrays['roots'], params['init'], params['max_depth'], params['n_features']
+        )
+    elif header['kind'] == 'logistic_regression':
+        model = BundledLogisticRegression(arrays['coef'], arrays['intercept'], arrays['classes'])
+    else:
+        raise ValueError(f"Tipo de pacote desconhecido: {header['kind']}")
+    return model, scaler, header['feature_cols']
+
+def main():
+    """Gera os pacotes a partir dos pickles atuais de src/."""
+    import joblib
+    
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    sources = [
+        (LOGISTIC_BUNDLE, 'logistic_model.pkl', 'scaler.pkl', None),
+        (OPTIMIZED_BUNDLE, 'optimized_model.pkl', 'scaler_v2.pkl', 'feature_cols.pkl')
+    ]
+    for bundle_name, model_name, scaler_name, feature_cols_name in sources:
+        model = joblib.load(os.path.join(src_dir, model_name))
+        scaler = joblib.load(os.path.join(src_dir, scaler_name))
+        if feature_cols_name is not None:
+            feature_cols = joblib.load(os.path.join(src_dir, feature_cols_name))
+        else:
+            feature_cols = list(scaler.feature_names_in_)
+        bundle_path = os.path.join(src_dir, bundle_name)
+        save_bundle(bundle_path, model, scaler, feature_cols)
+        print(f"Pacote salvo em: {bundle_path} ({os.path.getsize(bundle_path) / 1024:.1f} KB)")
+
+if __name__ == "__main__":
+    main()
@@ -2,62 +2,101 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from sklearn.base import clone
 from sklearn.model_selection import GridSearchCV
 from sklearn.ensemble import GradientBoostingClassifier
-from sklearn.metrics import roc_auc_score, classification_report
+from sklearn.metrics import classification_report
 import os
+import time
+import argparse
 import joblib
+from tree_compiler import compile_gradient_boosting, save_compiled
+from model_bundle import save_bundle, OPTIMIZED_BUNDLE
+from feature_transformer import load_transformer
+from risk_pipeline import RiskPipeline, save_pipeline
+from hyperparameter_search import successive_halving_search
+from hgb_engine import make_hgb_model, HGB_FEATURE_COLS, HGB_PARAM_GRID
+from evaluation import ConfusionCurve, predict_from_scores, METRIC_NAMES
+from bootstrap_metrics import confidence_intervals, format_interval, save_metrics, N_RESAMPLES
+from attribution import permutation_importance
 
-def load_prepared_data(base_dir):
-    """Carrega os dados preparados para modelagem."""
-    X_train = np.load(os.path.join(base_dir, 'data', 'processed', 'X_train.npy'))
-    X_test = np.load(os.path.join(base_dir, 'data', 'processed', 'X_test.npy'))
+def load_prepared_data(base_dir, engine='gb'):
+    """Carrega os dados preparados para modelagem (engine='hgb': dados do motor HGB)."""
+    suffix = '_hgb' if engine == 'hgb' else ''
+    X_train = np.load(os.path.join(base_dir, 'data', 'processed', f'X_train{suffix}.npy'))
+    X_test = np.load(os.path.join(base_dir, 'data', 'processed', f'X_test{suffix}.npy'))
     y_train = np.load(os.path.join(base_dir, 'data', 'processed', 'y_train.npy'))
     y_test = np.load(os.path.join(base_dir, 'data', 'processed', 'y_test.npy'))
-    feature_cols = joblib.load(os.path.join(base_dir, 'src', 'feature_cols.pkl'))
+    feature_cols = list(HGB_FEATURE_COLS) if engine == 'hgb' else joblib.load(os.path.join(base_dir, 'src', 'feature_cols.pkl'))
     
     return X_train, X_test, y_train, y_test, feature_cols
 
-def optimize_model(X_train, y_train):
+# Grid de hiperparâmetros do Gradient Boosting
+PARAM_GRID = {
+    'n_estimators': [100, 200],
+    'max_depth': [3, 5, 7],
+    'learning_rate': [0.01, 0.1, 0.2],
+    'min_samples_split': [2, 5],
+    'min_samples_leaf': [1, 2]
+}
+
+def optimize_model(X_train, y_train, search='halving', param_grid=None, cache_path=None, engine='gb'):
+    """
+    Otimiza o modelo Gradient Boosting.
+    
+    - search='halving': successive halving sobre os estágios de boosting, com warm_start,
+      todos os núcleos e cache de resultados (hyperparameter_search.py)
+    - search='grid': Grid Search exaustivo (todas as combinações x 5 folds)
+    
+    engine='hgb' otimiza o HistGradientBoosting do motor HGB (hgb_engine.py).
+    """
+    print(f"Iniciando otimização do modelo Gradient Boosting (motor: {engine}, busca: {search})...")
+    start = time.perf_counter()
+    
+    if engine == 'hgb':
+        gb_model, resource = make_hgb_model(), 'max_iter'
+        param_grid = param_grid or HGB_PARAM_GRID
+    else:
+        gb_model, resource = GradientBoostingClassifier(random_state=42), 'n_estimators'
+        param_grid = param_grid or PARAM_GRID
+    if search == 'halving':
+        best_params, best_score, _ = successive_halving_search(
+            gb_model, param_grid, X_train, y_train, cv=5, n_jobs=-1, cache_path=cache_path, resource=resource
+        )
+        # Modelo final treinado do zero com os melhores parâmetros, em todo o treino
+        best_model = clone(gb_model).set_params(**best_params).fit(X_train, y_train)
+    else:
+        # Grid Search com validação cruzada
+        grid_search = GridSearchCV(
+            gb_model, 
+            param_grid, 
+            cv=5, 
+            scoring='roc_auc', 
+            n_jobs=-1, 
+            verbose=1
+        )
+        
+        grid_search.fit(X_train, y_train)
+        best_params, best_score, best_model = grid_search.best_params_, grid_search.best_score_, grid_search.best_estimator_
+        
+    print(f"\nMelhores hiperparâmetros: {best_params}")
+    print(f"Melhor ROC-AUC (CV): {best_score:.4f}")
+    print(f"Tempo da busca: {time.perf_counter() - start:.1f}s")
+    
+    return best_model
+
+def plot_feature_importance(model, feature_cols, save_path, X=None, y=None):
     """
-    Otimiza o modelo Gradient Boosting usando Grid Search.
+    Plota a importância das features do modelo. Modelos sem `feature_importances_`
+    (HistGradientBoosting) usam a importância por permutação (ROC-AUC) em (X, y).
     """
-    print("Iniciando otimização do modelo Gradient Boosting...")
-    
-    # Definir grid de hiperparâmetros
-    param_grid = {
-        'n_estimators': [100, 200],
-        'max_depth': [3, 5, 7],
-        'learning_rate': [0.01, 0.1, 0.2],
-        'min_samples_split': [2, 5],
-        'min_samples_leaf': [1, 2]
-    }
-    
-    # Grid Search com validação cruzada
-    gb_model = GradientBoostingClassifier(random_state=42)
-    grid_search = GridSearchCV(
-        gb_model, 
-        param_grid, 
-        cv=5, 
-        scoring='roc_auc', 
-        n_jobs=-1, 
-        verbose=1
-    )
-    
-    grid_search.fit(X_train, y_train)
-    
-    print(f"\nMelhores hiperparâmetros: {grid_search.best_params_}")
-    print(f"Melhor ROC-AUC (CV): {grid_search.best_score_:.4f}")
-    
-    return grid_search.best_estimator_
-
-def plot_feature_importance(model, feature_cols, save_path):
-    """Plota a importância das features do modelo."""
-    feature_importance = model.feature_importances_
-    feature_importance_df = pd.DataFrame({
-        'Feature': feature_cols,
-        'Importance': feature_importance
-    }).sort_values('Importance', ascending=False)
+    if hasattr(model, 'feature_importances_'):
+        feature_importance_df = pd.DataFrame({
+            'Feature': feature_cols,
+            'Importance': model.feature_importances_
+        }).sort_values('Importance', ascending=False)
+    else:
+        feature_importance_df = permutation_importance(model, X, y, feature_cols)[['Feature', 'Importance']]
     
     plt.figure(figsize=(12, 8))
     sns.barplot(data=feature_importance_df.head(15), x='Importance', y='Feature', palette='viridis')
@@ -70,32 +109,70 @@ def plot_feature_importance(model, feature_cols, save_path):
     
     return feature_importance_df
 
-def generate_model_report(model, X_test, y_test, feature_importance_df, save_path):
-    """Gera relatório completo do modelo otimizado."""
-    y_pred = model.predict(X_test)
+def plot_permutation_importance(model, feature_cols, X, y, save_path):
+    """Plota a importância por permutação (queda do ROC-AUC no conjunto de teste, com desvio-padrão)."""
+    permutation_df = permutation_importance(model, X, y, feature_cols)
+    top = permutation_df.head(15)
+    
+    plt.figure(figsize=(12, 8))
+    plt.barh(top['Feature'][::-1], top['Importance'][::-1], xerr=top['Std'][::-1], color='#3b7dd8', capsize=3)
+    plt.title('Top 15 Features - Importância por Permutação (queda do ROC-AUC)', fontweight='bold', fontsize=14)
+    plt.xlabel('Queda média do ROC-AUC', fontsize=12)
+    plt.ylabel('Feature', fontsize=12)
+    plt.tight_layout()
+    plt.savefig(save_path, dpi=300, bbox_inches='tight')
+    print(f"Gráfico de importância por permutação salvo em: {save_path}")
+    
+    return permutation_df
+
+def _permutation_section(permutation_df):
+    if permutation_df is None:
+        return ''
+    return f"""
+### Importância por Permutação (queda do ROC-AUC no teste, 10 repetições):
+{permutation_df.head(10).round(4).to_markdown(index=False)}
+"""
+
+def generate_model_report(model, X_test, y_test, feature_importance_df, save_path, model_name='Gradient Boosting Classifier', permutation_df=None):
+    """Gera relatório completo do modelo otimizado e retorna as métricas (com CI_COLUMNS)."""
     y_pred_proba = model.predict_proba(X_test)[:, 1]
+    y_pred = predict_from_scores(y_pred_proba)
     
-    roc_auc = roc_auc_score(y_test, y_pred_proba)
+    curve = ConfusionCurve(y_test, y_pred_proba)
+    metrics = {**curve.metrics(), **confidence_intervals(y_test, y_pred_proba)}
+    intervals_df = pd.DataFrame([
+        {'Métrica': name, 'Valor': metrics[name], 'IC 95% inferior': metrics[f'{name} CI Low'], 'IC 95% superior': metrics[f'{name} CI High']}
+        for name in METRIC_NAMES
+    ])
     
     report = f"""
 # Relatório do Modelo Preditivo de Risco Educacional - FASE 3
 
-## Modelo Otimizado: Gradient Boosting Classifier
+## Modelo Otimizado: {model_name}
 
 ### Hiperparâmetros Otimizados:
 {model.get_params()}
 
 ### Desempenho no Conjunto de Teste:
-- **ROC-AUC Score**: {roc_auc:.4f}
+- **ROC-AUC Score**: {format_interval(metrics, 'ROC-AUC')}
+- **PR-AUC (Average Precision)**: {format_interval(metrics, 'PR-AUC')}
+
+### Intervalos de Confiança (bootstrap, {N_RESAMPLES} reamostragens do conjunto de teste):
+{intervals_df.round(4).to_markdown(index=False)}
 
 ### Classification Report:
 ```
 {classification_report(y_test, y_pred)}
 ```
 
+### Tabela de Limiares:
+Matriz de confusão e métricas para cada ponto de corte da probabilidade (o padrão é 0.5).
+
+{curve.threshold_table().round(4).to_markdown(index=False)}
+
 ### Top 10 Features Mais Importantes:
 {feature_importance_df.head(10).to_markdown(index=False)}
-
+{_permutation_section(permutation_df)}
 ### Interpretação das Features:
 
 1. **{feature_importance_df.iloc[0]['Feature']}** (Importância: {feature_importance_df.iloc[0]['Importance']:.4f})
@@ -109,7 +186,7 @@ def generate_model_report(model, X_test, y_test, feature_importance_df, save_pat
 
 ### Conclusões:
 
-O modelo Gradient Boosting otimizado alcançou um **ROC-AUC de {roc_auc:.4f}**, representando uma melhoria significativa em relação ao modelo baseline.
+O modelo {model_name} otimizado alcançou um **ROC-AUC de {format_interval(metrics, 'ROC-AUC')}**, representando uma melhoria significativa em relação ao modelo baseline.
 
 As features mais importantes indicam que:
 - Indicadores de desempenho acadêmico e engajamento são cruciais para prever o risco.
@@ -126,33 +203,72 @@ As features mais importantes indicam que:
         f.write(report)
     
     print(f"Relatório do modelo salvo em: {save_path}")
+    return metrics
 
 def main():
+    parser = argparse.ArgumentParser(description="Otimização e interpretação do modelo Gradient Boosting.")
+    parser.add_argument('--search', choices=['halving', 'grid'], default='halving',
+                        help="Successive halving com cache (padrão) ou Grid Search exaustivo.")
+    parser.add_argument('--engine', choices=['gb', 'hgb'], default='gb',
+                        help="Motor de treino: 'gb' (GradientBoosting) ou 'hgb' (HistGradientBoosting com NaNs nativos).")
+    args = parser.parse_args()
+    
     base_dir = os.path.join(os.path.dirname(__file__), '..')
     
     # Carregar dados preparados
-    X_train, X_test, y_train, y_test, feature_cols = load_prepared_data(base_dir)
+    X_train, X_test, y_train, y_test, feature_cols = load_prepared_data(base_dir, engine=args.engine)
+    # Saídas do motor HGB ficam em arquivos próprios
+    suffix = '_hgb' if args.engine == 'hgb' else ''
     
     # Otimizar modelo
-    optimized_model = optimize_model(X_train, y_train)
+    cache_path = os.path.join(base_dir, 'data', 'processed', 'search_cache.json')
+    optimized_model = optimize_model(X_train, y_train, search=args.search, cache_path=cache_path, engine=args.engine)
     
     # Avaliar modelo otimizado
     y_pred_proba = optimized_model.predict_proba(X_test)[:, 1]
-    roc_auc = roc_auc_score(y_test, y_pred_proba)
+    roc_auc = ConfusionCurve(y_test, y_pred_proba).roc_auc()
     print(f"\n🏆 ROC-AUC do modelo otimizado: {roc_auc:.4f}")
     
     # Plotar Feature Importance
-    fi_plot_path = os.path.join(base_dir, 'notebooks', 'feature_importance.png')
-    feature_importance_df = plot_feature_importance(optimized_model, feature_cols, fi_plot_path)
+    fi_plot_path = os.path.join(base_dir, 'notebooks', f'feature_importance{suffix}.png')
+    feature_importance_df = plot_feature_importance(optimized_model, feature_cols, fi_plot_path, X_test, y_test)
+    pi_plot_path = os.path.join(base_dir, 'notebooks', f'permutation_importance{suffix}.png')
+    permutation_df = plot_permutation_importance(optimized_model, feature_cols, X_test, y_test, pi_plot_path)
     
     # Gerar relatório do modelo
-    report_path = os.path.join(base_dir, 'notebooks', 'FASE_3_Modelo_Preditivo.md')
-    generate_model_report(optimized_model, X_test, y_test, feature_importance_df, report_path)
+    report_path = os.path.join(base_dir, 'notebooks', f'FASE_3_Modelo_Preditivo{suffix}.md')
+    model_name = 'HistGradientBoosting Classifier' if args.engine == 'hgb' else 'Gradient Boosting Classifier'
+    metrics = generate_model_report(optimized_model, X_test, y_test, feature_importance_df, report_path, model_name, permutation_df)
+    
+    # Métricas e intervalos de confiança do modelo otimizado (exibidos pelo app Streamlit),
+    # no mesmo formato de model_comparison_results.csv
+    metrics_path = os.path.join(base_dir, 'notebooks', f'optimized_model_metrics{suffix}.csv')
+    save_metrics(metrics_path, model_name, metrics)
+    print(f"Métricas do modelo otimizado salvas em: {metrics_path}")
     
     # Salvar modelo otimizado
-    optimized_model_path = os.path.join(base_dir, 'src', 'optimized_model.pkl')
+    optimized_model_path = os.path.join(base_dir, 'src', f'optimized_model{suffix}.pkl')
     joblib.dump(optimized_model, optimized_model_path)
     print(f"\nModelo otimizado salvo em: {optimized_model_path}")
+    
+    if args.engine == 'hgb':
+        # O compilador de árvores e o pacote do app atendem apenas o GradientBoosting
+        return
+    
+    # Exportar as árvores achatadas, com o scaler incorporado aos limiares
+    scaler = joblib.load(os.path.join(base_dir, 'src', 'scaler_v2.pkl'))
+    compiled_model_path = os.path.join(base_dir, 'src', 'optimized_model_flat.npz')
+    save_compiled(compile_gradient_boosting(optimized_model, scaler), compiled_model_path)
+    print(f"Modelo compilado salvo em: {compiled_model_path}")
+    
+    # Pacote único com memory-map usado pelo app Streamlit
+    bundle_path = os.path.join(base_dir, 'src', OPTIMIZED_BUNDLE)
+    save_bundle(bundle_path, optimized_model, scaler, feature_cols)
+    print(f"Pacote do modelo salvo em: {bundle_path}")
+    
+    # Pipeline único (features + scaler + modelo) usado pela pontuação em lote, apps e serviço HTTP
+    pipeline_path = save_pipeline(RiskPipeline(load_transformer(base_dir), optimized_model, scaler, feature_cols), base_dir)
+    print(f"Pipeline do modelo salvo em: {pipeline_path}")
 
 if __name__ == "__main__":
     main()
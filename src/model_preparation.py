@@ -1,26 +1,41 @@
-import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.preprocessing import StandardScaler
 import os
+from storage import load_table, save_table
+from temporal_features import add_temporal_features
+from student_index import load_index
+
+# Indicadores com lag do ano anterior e, entre eles, os que também recebem delta
+TEMPORAL_COLS = ['ida', 'ieg', 'ips']
+DELTA_COLS = ['ida', 'ieg']
+
+# Features do modelo (na ordem das colunas de X) e variável alvo
+FEATURE_COLS = [
+    'ida', 'ieg', 'ips', 'ipp', 'iaa', 'ipv',
+    'ida_ieg_interaction', 'ipp_ips_interaction', 'ida_ieg_ratio',
+    'mean_indicators', 'ida_lag1', 'ieg_lag1', 'ips_lag1',
+    'ida_delta', 'ieg_delta', 'gnero_encoded', 'fase_encoded', 'ano'
+]
+TARGET_COL = 'risco_defasagem'
+
+# Colunas codificadas com LabelEncoder e a coluna de origem de cada uma
+ENCODED_COLS = {'gnero_encoded': 'gnero', 'fase_encoded': 'fase'}
 
 def load_data(file_path):
     """Carrega o DataFrame processado."""
     try:
-        df = pd.read_csv(file_path)
+        df = load_table(file_path)
         return df
     except FileNotFoundError:
         print(f"Erro: Arquivo não encontrado em {file_path}")
         return None
 
-def feature_engineering(df):
+def add_row_features(df_fe):
     """
-    Realiza feature engineering avançado para melhorar o modelo preditivo.
+    Features calculadas apenas a partir da própria linha (interações, razão e média),
+    compartilhadas entre o feature engineering e a pontuação em lote.
     """
-    print("Iniciando feature engineering...")
-    
-    df_fe = df.copy()
-    
     # 1. Criar features de interação
     # Interação entre IDA e IEG (desempenho e engajamento)
     df_fe['ida_ieg_interaction'] = df_fe['ida'] * df_fe['ieg']
@@ -35,59 +50,74 @@ def feature_engineering(df):
     # 3. Criar features agregadas (média de indicadores)
     df_fe['mean_indicators'] = df_fe[['ida', 'ieg', 'ips', 'ipp', 'iaa', 'ipv']].mean(axis=1, skipna=True)
     
-    # 4. Criar features de defasagem temporal (se houver dados de anos anteriores)
-    # Ordenar por aluno_id e ano
-    df_fe = df_fe.sort_values(['aluno_id', 'ano'])
+    return df_fe
+
+def add_encoded_features(df_fe, transformer):
+    """Códigos de gênero e fase com as categorias do FeatureTransformer (ENCODED_COLS)."""
+    for encoded_col, source_col in ENCODED_COLS.items():
+        codes = transformer.encode(encoded_col, df_fe[source_col])
+        # Inteiros, como os do LabelEncoder, quando todas as categorias são conhecidas
+        df_fe[encoded_col] = codes if np.isnan(codes).any() else codes.astype('int64')
+    return df_fe
+
+def feature_engineering(df, index=None, transformer=None):
+    """
+    Realiza feature engineering avançado para melhorar o modelo preditivo.
     
-    # Criar lag features (valores do ano anterior)
-    df_fe['ida_lag1'] = df_fe.groupby('aluno_id')['ida'].shift(1)
-    df_fe['ieg_lag1'] = df_fe.groupby('aluno_id')['ieg'].shift(1)
-    df_fe['ips_lag1'] = df_fe.groupby('aluno_id')['ips'].shift(1)
+    `index` (student_index) é o índice de histórico da tabela final; quando informado,
+    as features temporais usam a ordenação por aluno e ano já gravada nele.
+    `transformer` (FeatureTransformer ajustado no treino) fornece os códigos das
+    categorias; sem ele, os códigos são ajustados sobre a própria `df`.
+    """
+    print("Iniciando feature engineering...")
     
-    # 5. Criar features de variação (delta entre anos)
-    df_fe['ida_delta'] = df_fe['ida'] - df_fe['ida_lag1']
-    df_fe['ieg_delta'] = df_fe['ieg'] - df_fe['ieg_lag1']
+    df_fe = add_row_features(df.copy())
     
-    # 6. Encoding de variáveis categóricas
-    # Gênero
-    le_genero = LabelEncoder()
-    df_fe['gnero_encoded'] = le_genero.fit_transform(df_fe['gnero'].fillna('NAO_INFORMADO'))
+    # 4. Criar features de defasagem temporal (valores do ano anterior) e
+    # 5. features de variação (delta entre anos), numa única passagem ordenada por aluno_id e ano
+    df_fe = add_temporal_features(df_fe, TEMPORAL_COLS, lags=(1,), deltas=(1,), delta_columns=DELTA_COLS, index=index)
     
-    # Fase
-    le_fase = LabelEncoder()
-    df_fe['fase_encoded'] = le_fase.fit_transform(df_fe['fase'].fillna('NAO_INFORMADO'))
+    # 6. Encoding de variáveis categóricas (gênero e fase)
+    if transformer is None:
+        from feature_transformer import FeatureTransformer
+        transformer = FeatureTransformer.fit(df)
+    df_fe = add_encoded_features(df_fe, transformer)
     
     print(f"Feature engineering concluído. Total de features: {len(df_fe.columns)}")
     
     return df_fe
 
-def prepare_model_data(df):
+def select_model_rows(df):
+    """
+    Linhas usadas na modelagem: target válido e ao menos 4 dos 5 indicadores principais.
+    """
+    # Filtrar apenas linhas com target válido
+    df_model = df[df[TARGET_COL].notna()].copy()
+    
+    # Remover linhas com muitos NaNs nas features principais
+    return df_model.dropna(subset=['ida', 'ieg', 'ipp', 'iaa', 'ipv'], thresh=4)
+
+def prepare_model_data(df, transformer=None):
     """
     Prepara os dados para modelagem, selecionando features e criando train/test split.
+    Os NaNs restantes recebem as medianas do `transformer` (FeatureTransformer com
+    `fit_medians`) ou, sem ele, as medianas das próprias linhas de modelagem.
     """
     print("Preparando dados para modelagem...")
     
-    # Selecionar features para o modelo
-    feature_cols = [
-        'ida', 'ieg', 'ips', 'ipp', 'iaa', 'ipv',
-        'ida_ieg_interaction', 'ipp_ips_interaction', 'ida_ieg_ratio',
-        'mean_indicators', 'ida_lag1', 'ieg_lag1', 'ips_lag1',
-        'ida_delta', 'ieg_delta', 'gnero_encoded', 'fase_encoded', 'ano'
-    ]
+    feature_cols = list(FEATURE_COLS)
     
     # Variável alvo
-    target_col = 'risco_defasagem'
+    target_col = TARGET_COL
     
-    # Filtrar apenas linhas com target válido
-    df_model = df[df[target_col].notna()].copy()
-    
-    # Remover linhas com muitos NaNs nas features principais
-    df_model = df_model.dropna(subset=['ida', 'ieg', 'ipp', 'iaa', 'ipv'], thresh=4)
+    # Filtrar apenas linhas com target válido e remover linhas com muitos NaNs
+    df_model = select_model_rows(df)
     
     # Preencher NaNs restantes com a mediana
     for col in feature_cols:
         if col in df_model.columns:
-            df_model[col] = df_model[col].fillna(df_model[col].median())
+            median = transformer.medians[col] if transformer is not None else df_model[col].median()
+            df_model[col] = df_model[col].fillna(median)
     
     # Separar features e target
     X = df_model[feature_cols]
@@ -113,21 +143,27 @@ def prepare_model_data(df):
 
 def main():
     base_dir = os.path.join(os.path.dirname(__file__), '..')
-    processed_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_final.csv')
+    processed_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_final.arrow')
     
     df = load_data(processed_data_path)
     
     if df is not None:
+        # Códigos das categorias ajustados primeiro, sobre a tabela final; as medianas, sobre
+        # a tabela de features. Compartilhado com a pontuação e os apps (feature_transformer.pkl)
+        from feature_transformer import FeatureTransformer, FEATURE_TRANSFORMER
+        transformer = FeatureTransformer.fit(df)
+        
         # Feature Engineering
-        df_fe = feature_engineering(df)
+        df_fe = feature_engineering(df, index=load_index(), transformer=transformer)
+        transformer.fit_medians(df_fe)
         
         # Salvar DataFrame com features
-        fe_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_fe.csv')
-        df_fe.to_csv(fe_data_path, index=False)
+        fe_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_fe.arrow')
+        save_table(df_fe, fe_data_path)
         print(f"\nDataFrame com feature engineering salvo em: {fe_data_path}")
         
         # Preparar dados para modelagem
-        X_train, X_test, y_train, y_test, scaler, feature_cols = prepare_model_data(df_fe)
+        X_train, X_test, y_train, y_test, scaler, feature_cols = prepare_model_data(df_fe, transformer)
         
         # Salvar dados preparados
         np.save(os.path.join(base_dir, 'data', 'processed', 'X_train.npy'), X_train)
@@ -140,6 +176,21 @@ def main():
         joblib.dump(scaler, os.path.join(base_dir, 'src', 'scaler_v2.pkl'))
         joblib.dump(feature_cols, os.path.join(base_dir, 'src', 'feature_cols.pkl'))
         
+        joblib.dump(transformer, os.path.join(base_dir, 'src', FEATURE_TRANSFORMER))
+        
+        # Dados do motor HGB (NaNs e categóricas nativas), com o mesmo split
+        from hgb_engine import prepare_native_data
+        X_train_hgb, X_test_hgb, _, _, categories = prepare_native_data(df_fe)
+        np.save(os.path.join(base_dir, 'data', 'processed', 'X_train_hgb.npy'), X_train_hgb)
+        np.save(os.path.join(base_dir, 'data', 'processed', 'X_test_hgb.npy'), X_test_hgb)
+        joblib.dump(categories, os.path.join(base_dir, 'src', 'hgb_categories.pkl'))
+        
+        # Shards float32 com memory-map para o treino out-of-core (model_training.py --out-of-core)
+        from shards import write_shards
+        shards_dir = os.path.join(base_dir, 'data', 'processed', 'shards')
+        write_shards(X_train, y_train, os.path.join(shards_dir, 'train'))
+        write_shards(X_test, y_test, os.path.join(shards_dir, 'test'))
+        
         print("\nDados preparados e salvos com sucesso!")
 
 if __name__ == "__main__":
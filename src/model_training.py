@@ -1,82 +1,236 @@
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, classification_report, confusion_matrix
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, ExtraTreesClassifier, HistGradientBoostingClassifier
+from sklearn.metrics import confusion_matrix
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import time
+import argparse
 import joblib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from threadpoolctl import threadpool_limits
+from fit_cache import FitCache, fit_key, array_digest, DEFAULT_MAX_BYTES
+from hgb_engine import CATEGORICAL_INDICES, HGB_PARAMS
+from shards import open_shards
+from evaluation import ConfusionCurve, evaluate_scores, predict_from_scores, METRIC_NAMES
+from bootstrap_metrics import confidence_intervals, format_interval, CI_COLUMNS
 
-def load_prepared_data(base_dir):
-    """Carrega os dados preparados para modelagem."""
-    X_train = np.load(os.path.join(base_dir, 'data', 'processed', 'X_train.npy'))
-    X_test = np.load(os.path.join(base_dir, 'data', 'processed', 'X_test.npy'))
+def load_prepared_data(base_dir, engine='gb'):
+    """
+    Carrega os dados preparados para modelagem. engine='hgb' usa as features do motor
+    HGB (sem imputação, com NaNs e categóricas nativas).
+    """
+    suffix = '_hgb' if engine == 'hgb' else ''
+    # Memory-map: as páginas são lidas sob demanda, sem cópia da matriz para a memória
+    X_train = np.load(os.path.join(base_dir, 'data', 'processed', f'X_train{suffix}.npy'), mmap_mode='r')
+    X_test = np.load(os.path.join(base_dir, 'data', 'processed', f'X_test{suffix}.npy'), mmap_mode='r')
     y_train = np.load(os.path.join(base_dir, 'data', 'processed', 'y_train.npy'))
     y_test = np.load(os.path.join(base_dir, 'data', 'processed', 'y_test.npy'))
     
     return X_train, X_test, y_train, y_test
 
-def train_and_evaluate_models(X_train, X_test, y_train, y_test):
+# Modelos candidatos: nome -> (classe, parâmetros). Novos candidatos entram aqui e são
+# escolhidos com `--models`.
+MODEL_REGISTRY = {
+    'Logistic Regression': (LogisticRegression, {'random_state': 42, 'max_iter': 1000}),
+    'Random Forest': (RandomForestClassifier, {'n_estimators': 100, 'random_state': 42, 'max_depth': 10}),
+    'Gradient Boosting': (GradientBoostingClassifier, {'n_estimators': 100, 'random_state': 42, 'max_depth': 5}),
+    'Extra Trees': (ExtraTreesClassifier, {'n_estimators': 100, 'random_state': 42, 'max_depth': 10}),
+    'Hist Gradient Boosting': (HistGradientBoostingClassifier, {'random_state': 42}),
+    # Motor HGB: recebe os dados de prepare_native_data (--engine hgb)
+    'Hist Gradient Boosting Nativo': (HistGradientBoostingClassifier, {'categorical_features': CATEGORICAL_INDICES, **HGB_PARAMS}),
+    # Regressão logística por SGD: treino incremental (partial_fit), usada no modo --out-of-core
+    'SGD Logistic Regression': (SGDClassifier, {'loss': 'log_loss', 'alpha': 1e-3, 'average': True, 'random_state': 42})
+}
+
+DEFAULT_MODELS = ['Logistic Regression', 'Random Forest', 'Gradient Boosting']
+
+# Modelos de cada motor de treino: 'gb' usa os dados imputados e normalizados de
+# prepare_model_data; 'hgb', os dados com NaNs, que só o motor HGB aceita
+ENGINE_MODELS = {'gb': DEFAULT_MODELS, 'hgb': ['Hist Gradient Boosting Nativo']}
+
+# Modelos com partial_fit, treinados shard a shard no modo --out-of-core
+INCREMENTAL_MODELS = ['SGD Logistic Regression']
+
+def build_models(names=DEFAULT_MODELS, registry=MODEL_REGISTRY):
+    """Instancia os modelos `names` do registro, na ordem dada."""
+    unknown = [name for name in names if name not in registry]
+    if unknown:
+        raise ValueError(f"Modelos não registrados: {unknown}")
+    return {name: registry[name][0](**registry[name][1]) for name in names}
+
+# Modelos que paralelizam o próprio treino (n_jobs ou OpenMP) e recebem os núcleos livres.
+# A LogisticRegression tem n_jobs, mas não o usa em classificação binária.
+THREADED_MODELS = (RandomForestClassifier, ExtraTreesClassifier, HistGradientBoostingClassifier)
+
+def thread_budgets(models, n_workers, n_cores):
+    """
+    Threads por modelo, sem ultrapassar `n_cores` no total. Se todos os modelos rodam ao
+    mesmo tempo, cada um tem 1 núcleo e os núcleos restantes vão para os que usam threads;
+    caso contrário, cada processo recebe a mesma fração dos núcleos.
+    """
+    if len(models) > n_workers:
+        return {name: max(1, n_cores // n_workers) for name in models}
+    budgets = {name: 1 for name in models}
+    threaded = [name for name, model in models.items() if isinstance(model, THREADED_MODELS)]
+    for i in range(max(0, n_cores - len(models)) if threaded else 0):
+        budgets[threaded[i % len(threaded)]] += 1
+    return budgets
+
+def evaluate_model(model, X_test, y_test):
+    """
+    Métricas de classificação do modelo no conjunto de teste (uma chamada de
+    predict_proba), com intervalos de confiança bootstrap (CI_COLUMNS).
+    """
+    y_pred_proba = model.predict_proba(X_test)[:, 1]
+    
+    return _metrics_with_intervals(y_test, y_pred_proba)
+
+def _metrics_with_intervals(y_test, y_pred_proba):
+    # n_jobs=1: a avaliação já roda dentro do limite de threads de cada modelo
+    return {**evaluate_scores(y_test, y_pred_proba), **confidence_intervals(y_test, y_pred_proba, n_jobs=1)}
+
+def _fit_and_evaluate(model, threads, X_train, y_train, X_test, y_test):
+    """Treina e avalia um modelo limitado a `threads` threads. Retorna (modelo, métricas, segundos)."""
+    start = time.perf_counter()
+    params = model.get_params()
+    if 'n_jobs' in params:
+        model.set_params(n_jobs=threads)
+    with threadpool_limits(limits=threads):
+        model.fit(X_train, y_train)
+        metrics = evaluate_model(model, X_test, y_test)
+    if 'n_jobs' in params:
+        # n_jobs não altera o modelo treinado; volta ao valor do registro (chave do cache)
+        model.set_params(n_jobs=params['n_jobs'])
+    return model, metrics, time.perf_counter() - start
+
+def _print_metrics(metrics):
+    print(f"Acurácia: {format_interval(metrics, 'Accuracy')}")
+    print(f"Precisão: {format_interval(metrics, 'Precision')}")
+    print(f"Recall: {format_interval(metrics, 'Recall')}")
+    print(f"F1-Score: {format_interval(metrics, 'F1-Score')}")
+    print(f"ROC-AUC: {format_interval(metrics, 'ROC-AUC')}")
+    print(f"PR-AUC: {format_interval(metrics, 'PR-AUC')}")
+
+def train_and_evaluate_models(X_train, X_test, y_train, y_test, cache=None, refit=False, model_names=DEFAULT_MODELS, n_jobs=1):
     """
     Treina e avalia múltiplos modelos de Machine Learning.
+    
+    Com `cache` (FitCache), modelos já treinados com os mesmos dados e parâmetros são
+    carregados do disco em vez de retreinados; `refit=True` força o treino.
+    
+    Com `n_jobs` > 1 (ou -1 para todos os núcleos), os modelos são treinados ao mesmo
+    tempo em processos separados, cada um com seu limite de threads (`thread_budgets`),
+    e as métricas são exibidas à medida que cada modelo termina.
     """
     print("Iniciando treinamento de modelos...")
     
     # Definir modelos
-    models = {
-        'Logistic Regression': LogisticRegression(random_state=42, max_iter=1000),
-        'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10),
-        'Gradient Boosting': GradientBoostingClassifier(n_estimators=100, random_state=42, max_depth=5)
-    }
+    models = build_models(model_names)
     
-    results = []
+    test_key = array_digest(X_test, y_test)
+    metrics_by_model = {}
+    keys = {}
+    pending = []
     
     for name, model in models.items():
-        print(f"\n--- Treinando {name} ---")
+        keys[name] = fit_key(model, X_train, y_train)
+        cached = cache.get(keys[name]) if cache is not None and not refit else None
+        if cached is None:
+            pending.append(name)
+            continue
+            
+        print(f"\n--- {name}: carregado do cache ({keys[name][:12]}) ---")
+        model, entry = cached
+        models[name] = model
+        metrics = entry['metrics']
+        # Métricas de outro conjunto de teste, ou gravadas antes de alguma métrica existir
+        if entry['metrics_key'] != test_key or set(metrics) != set(METRIC_NAMES + CI_COLUMNS):
+            metrics = evaluate_model(model, X_test, y_test)
+            cache.update_metrics(keys[name], metrics, test_key)
+        _print_metrics(metrics)
+        metrics_by_model[name] = metrics
         
-        # Treinar modelo
-        model.fit(X_train, y_train)
-        
-        # Predições
-        y_pred = model.predict(X_test)
-        y_pred_proba = model.predict_proba(X_test)[:, 1]
-        
-        # Métricas
-        accuracy = accuracy_score(y_test, y_pred)
-        precision = precision_score(y_test, y_pred)
-        recall = recall_score(y_test, y_pred)
-        f1 = f1_score(y_test, y_pred)
-        roc_auc = roc_auc_score(y_test, y_pred_proba)
-        
-        print(f"Acurácia: {accuracy:.4f}")
-        print(f"Precisão: {precision:.4f}")
-        print(f"Recall: {recall:.4f}")
-        print(f"F1-Score: {f1:.4f}")
-        print(f"ROC-AUC: {roc_auc:.4f}")
-        
-        results.append({
-            'Model': name,
-            'Accuracy': accuracy,
-            'Precision': precision,
-            'Recall': recall,
-            'F1-Score': f1,
-            'ROC-AUC': roc_auc
-        })
-    
-    # Criar DataFrame com resultados
-    results_df = pd.DataFrame(results)
+    n_cores = os.cpu_count() or 1
+    n_jobs = n_cores if n_jobs is not None and n_jobs < 0 else (n_jobs or 1)
+    workers = min(n_jobs, len(pending))
+    
+    def finish(name, model, metrics, elapsed):
+        print(f"\n--- {name}: treinado em {elapsed:.2f}s ---")
+        _print_metrics(metrics)
+        models[name] = model
+        metrics_by_model[name] = metrics
+        if cache is not None:
+            cache.put(keys[name], model, name, metrics, test_key)
+            
+    if workers <= 1:
+        # Sequencial: cada modelo pode usar todos os núcleos
+        for name in pending:
+            print(f"\n--- Treinando {name} ---")
+            finish(name, *_fit_and_evaluate(models[name], n_cores, X_train, y_train, X_test, y_test))
+    elif pending:
+        budgets = thread_budgets({name: models[name] for name in pending}, workers, n_cores)
+        print(f"\nTreinando {len(pending)} modelos em {workers} processos (threads: {budgets})")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_fit_and_evaluate, models[name], budgets[name], X_train, y_train, X_test, y_test): name
+                for name in pending
+            }
+            for future in as_completed(futures):
+                finish(futures[future], *future.result())
+                
+    # Criar DataFrame com resultados (na ordem do registro)
+    results_df = pd.DataFrame([{'Model': name, **metrics_by_model[name]} for name in models])
     
     return results_df, models
 
+def predict_streaming(model, dataset):
+    """Probabilidades da classe 1, shard a shard."""
+    return np.concatenate([model.predict_proba(X)[:, 1] for X, _ in dataset])
+
+def fit_out_of_core(model, train, epochs=5, random_state=42):
+    """
+    Treina um modelo com partial_fit percorrendo os shards de treino (memory-map) em
+    `epochs` passagens, com shards e linhas embaralhados a cada passagem. Apenas um
+    shard fica em memória por vez.
+    """
+    classes = np.unique(train.labels())
+    rng = np.random.default_rng(random_state)
+    for _ in range(epochs):
+        for number in rng.permutation(len(train)):
+            X, y = train.shard(number)
+            order = rng.permutation(len(X))
+            model.partial_fit(X[order], y[order], classes=classes)
+    return model
+
+def train_out_of_core_models(train, test, model_names=INCREMENTAL_MODELS, epochs=5):
+    """Treina e avalia, a partir dos shards, os modelos incrementais `model_names`."""
+    print(f"Iniciando treinamento out-of-core ({train.n_rows} linhas em {len(train)} shards)...")
+    
+    models = build_models(model_names)
+    y_test = test.labels()
+    results = []
+    for name, model in models.items():
+        if not hasattr(model, 'partial_fit'):
+            raise ValueError(f"{name} não suporta treino incremental (partial_fit).")
+        print(f"\n--- Treinando {name} ({epochs} épocas) ---")
+        start = time.perf_counter()
+        fit_out_of_core(model, train, epochs=epochs)
+        metrics = _metrics_with_intervals(y_test, predict_streaming(model, test))
+        print(f"Treinado em {time.perf_counter() - start:.2f}s")
+        _print_metrics(metrics)
+        results.append({'Model': name, **metrics})
+        
+    return pd.DataFrame(results), models
+
 def plot_model_comparison(results_df, save_path):
     """Plota comparação de desempenho dos modelos."""
     fig, axes = plt.subplots(2, 3, figsize=(18, 10))
     fig.suptitle('Comparação de Desempenho dos Modelos', fontsize=16, fontweight='bold')
     
-    metrics = ['Accuracy', 'Precision', 'Recall', 'F1-Score', 'ROC-AUC']
-    
-    for idx, metric in enumerate(metrics):
+    for idx, metric in enumerate(METRIC_NAMES):
         row = idx // 3
         col = idx % 3
         ax = axes[row, col]
@@ -91,9 +245,11 @@ def plot_model_comparison(results_df, save_path):
         # Adicionar valores nas barras
         for container in ax.containers:
             ax.bar_label(container, fmt='%.3f')
-    
-    # Remover o último subplot vazio
-    fig.delaxes(axes[1, 2])
+            
+        # Intervalos de confiança bootstrap como barras de erro
+        if f'{metric} CI Low' in results_df.columns:
+            yerr = [results_df[metric] - results_df[f'{metric} CI Low'], results_df[f'{metric} CI High'] - results_df[metric]]
+            ax.errorbar(x=range(len(results_df)), y=results_df[metric], yerr=yerr, fmt='none', ecolor='black', capsize=4)
     
     plt.tight_layout()
     plt.savefig(save_path, dpi=300, bbox_inches='tight')
@@ -113,21 +269,48 @@ def plot_confusion_matrix(y_test, y_pred, model_name, save_path):
     print(f"Matriz de confusão salva em: {save_path}")
 
 def main():
-    base_dir = os.path.join(os.path.dirname(__file__), '..')
+    parser = argparse.ArgumentParser(description="Treina e compara os modelos de risco de defasagem.")
+    parser.add_argument('--refit', action='store_true', help="Retreina todos os modelos, ignorando o cache.")
+    parser.add_argument('--no-cache', action='store_true', help="Não lê nem grava o cache de modelos.")
+    parser.add_argument('--cache-max-mb', type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024,
+                        help="Tamanho máximo do cache de modelos (MB).")
+    parser.add_argument('--engine', choices=list(ENGINE_MODELS), default='gb',
+                        help="Motor de treino: 'gb' (dados imputados) ou 'hgb' (NaNs e categóricas nativas).")
+    parser.add_argument('--models', nargs='+', choices=list(MODEL_REGISTRY), default=None,
+                        help="Modelos candidatos (do MODEL_REGISTRY; padrão: os do motor).")
+    parser.add_argument('--n-jobs', type=int, default=1, help="Processos para treinar os modelos em paralelo (-1 = todos os núcleos).")
+    parser.add_argument('--out-of-core', action='store_true',
+                        help="Treina modelos incrementais lendo os shards float32 (data/processed/shards) um a um.")
+    parser.add_argument('--epochs', type=int, default=5, help="Passagens pelos shards no modo --out-of-core.")
+    args = parser.parse_args()
     
-    # Carregar dados preparados
-    X_train, X_test, y_train, y_test = load_prepared_data(base_dir)
+    base_dir = os.path.join(os.path.dirname(__file__), '..')
     
-    # Treinar e avaliar modelos
-    results_df, models = train_and_evaluate_models(X_train, X_test, y_train, y_test)
+    if args.out_of_core:
+        # Shards com memory-map: a matriz completa nunca é carregada
+        train_shards, test_shards = open_shards(os.path.join(base_dir, 'data', 'processed', 'shards'))
+        results_df, models = train_out_of_core_models(train_shards, test_shards, model_names=args.models or INCREMENTAL_MODELS,
+                                                      epochs=args.epochs)
+        y_test = test_shards.labels()
+        suffix = '_ooc'
+    else:
+        # Carregar dados preparados
+        X_train, X_test, y_train, y_test = load_prepared_data(base_dir, engine=args.engine)
+        # Saídas do motor HGB ficam em arquivos próprios
+        suffix = '_hgb' if args.engine == 'hgb' else ''
+        
+        # Treinar e avaliar modelos (modelos inalterados vêm do cache em data/cache/fit_cache)
+        cache = None if args.no_cache else FitCache(max_bytes=int(args.cache_max_mb * 1024 * 1024))
+        results_df, models = train_and_evaluate_models(X_train, X_test, y_train, y_test, cache=cache, refit=args.refit,
+                                                       model_names=args.models or ENGINE_MODELS[args.engine], n_jobs=args.n_jobs)
     
     # Salvar resultados
-    results_path = os.path.join(base_dir, 'notebooks', 'model_comparison_results.csv')
+    results_path = os.path.join(base_dir, 'notebooks', f'model_comparison_results{suffix}.csv')
     results_df.to_csv(results_path, index=False)
     print(f"\nResultados salvos em: {results_path}")
     
     # Plotar comparação de modelos
-    comparison_plot_path = os.path.join(base_dir, 'notebooks', 'model_comparison.png')
+    comparison_plot_path = os.path.join(base_dir, 'notebooks', f'model_comparison{suffix}.png')
     plot_model_comparison(results_df, comparison_plot_path)
     
     # Identificar o melhor modelo (baseado em ROC-AUC)
@@ -137,12 +320,18 @@ def main():
     print(f"\n🏆 Melhor modelo: {best_model_name} (ROC-AUC: {results_df['ROC-AUC'].max():.4f})")
     
     # Plotar matriz de confusão do melhor modelo
-    y_pred_best = best_model.predict(X_test)
+    y_proba_best = predict_streaming(best_model, test_shards) if args.out_of_core else best_model.predict_proba(X_test)[:, 1]
+    y_pred_best = predict_from_scores(y_proba_best)
     cm_path = os.path.join(base_dir, 'notebooks', f'confusion_matrix_{best_model_name.replace(" ", "_")}.png')
     plot_confusion_matrix(y_test, y_pred_best, best_model_name, cm_path)
     
+    # Tabela de limiares do melhor modelo (matriz de confusão e métricas por ponto de corte)
+    threshold_path = os.path.join(base_dir, 'notebooks', f'threshold_table{suffix}.csv')
+    ConfusionCurve(y_test, y_proba_best).threshold_table().round(4).to_csv(threshold_path, index=False)
+    print(f"Tabela de limiares salva em: {threshold_path}")
+    
     # Salvar o melhor modelo
-    best_model_path = os.path.join(base_dir, 'src', 'best_model.pkl')
+    best_model_path = os.path.join(base_dir, 'src', f'best_model{suffix}.pkl')
     joblib.dump(best_model, best_model_path)
     print(f"\nMelhor modelo salvo em: {best_model_path}")
 
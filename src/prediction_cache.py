@@ -0,0 +1,52 @@
+import numpy as np
+import threading
+from collections import OrderedDict
+
+# Predições memoizadas dos apps Streamlit.
+#
+# Cada interação (mover um slider, trocar uma opção) reexecuta o script inteiro do app;
+# sem cache, a normalização e a chamada ao modelo se repetiriam a cada rerun, mesmo com
+# as mesmas entradas. O PredictionCache guarda o resultado por vetor de entrada em um LRU
+# limitado, compartilhado por todas as sessões (st.cache_resource), e cada predição nova
+# custa uma única chamada de predict_proba (a classe é derivada das probabilidades).
+
+# Vetores de entrada distintos mantidos em memória
+PREDICTION_CACHE_SIZE = 4096
+
+class PredictionCache:
+    """Predições (classe, probabilidades) por vetor de entrada, com LRU de tamanho limitado."""
+    
+    def __init__(self, model, scaler=None, maxsize=PREDICTION_CACHE_SIZE):
+        self.model = model
+        # Mesma normalização do StandardScaler (ou do scaler do pacote), aplicada sobre o array
+        self.mean = scaler.mean_ if scaler is not None and getattr(scaler, 'with_mean', True) else 0.0
+        self.scale = scaler.scale_ if scaler is not None and getattr(scaler, 'with_std', True) else 1.0
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        
+    def predict(self, input_data):
+        """(classe prevista, probabilidades das classes) para um vetor de features."""
+        x = np.asarray(input_data, dtype=np.float64).ravel()
+        key = x.tobytes()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+                
+        proba = self.model.predict_proba(((x - self.mean) / self.scale).reshape(1, -1))[0]
+        # Mesma regra do predict dos classificadores do scikit-learn: classe de maior probabilidade
+        result = (self.model.classes_[int(np.argmax(proba))], proba)
+        
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = result
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return result
+        
+    def __len__(self):
+        return len(self._entries)
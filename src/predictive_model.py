@@ -1,16 +1,19 @@
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import classification_report, roc_auc_score, roc_curve
+from sklearn.metrics import classification_report
 from sklearn.preprocessing import StandardScaler
 import matplotlib.pyplot as plt
 import numpy as np
 import os
+from storage import load_table
+from evaluation import ConfusionCurve, predict_from_scores, METRIC_NAMES
+from bootstrap_metrics import confidence_intervals, format_interval, save_metrics, N_RESAMPLES
 
 def load_data(file_path):
     """Carrega o DataFrame processado."""
     try:
-        df = pd.read_csv(file_path)
+        df = load_table(file_path)
         return df
     except FileNotFoundError:
         print(f"Erro: Arquivo não encontrado em {file_path}")
@@ -57,16 +60,20 @@ def train_and_evaluate_model(X, y, features):
     model.fit(X_train, y_train)
     
     # Previsões
-    y_pred = model.predict(X_test)
     y_proba = model.predict_proba(X_test)[:, 1]
+    y_pred = predict_from_scores(y_proba)
     
     # Avaliação
+    curve = ConfusionCurve(y_test, y_proba)
     report = classification_report(y_test, y_pred, target_names=['Baixo Risco', 'Alto Risco'], output_dict=True)
-    auc_score = roc_auc_score(y_test, y_proba)
+    auc_score = curve.roc_auc()
+    # Métricas com intervalos de confiança bootstrap (95%)
+    metrics = {**curve.metrics(), **confidence_intervals(y_test, y_proba)}
     
     print("\n--- Relatório de Classificação (Regressão Logística) ---")
     print(classification_report(y_test, y_pred, target_names=['Baixo Risco', 'Alto Risco']))
-    print(f"AUC Score: {auc_score:.4f}")
+    print(f"AUC Score: {format_interval(metrics, 'ROC-AUC')}")
+    print(f"PR-AUC: {format_interval(metrics, 'PR-AUC')}")
     
     # Interpretabilidade: Coeficientes
     coefficients = pd.DataFrame({
@@ -78,7 +85,7 @@ def train_and_evaluate_model(X, y, features):
     print(coefficients.to_markdown(index=False))
     
     # Plot da Curva ROC
-    fpr, tpr, _ = roc_curve(y_test, y_proba)
+    fpr, tpr, _ = curve.roc_points()
     plt.figure(figsize=(8, 6))
     plt.plot(fpr, tpr, label=f'AUC = {auc_score:.4f}')
     plt.plot([0, 1], [0, 1], 'r--')
@@ -90,11 +97,11 @@ def train_and_evaluate_model(X, y, features):
     plt.savefig(os.path.join(os.path.dirname(__file__), '..', 'notebooks', 'roc_curve.png'))
     plt.close()
     
-    return model, report, auc_score, coefficients
+    return model, report, auc_score, coefficients, metrics
 
 def main():
     base_dir = os.path.join(os.path.dirname(__file__), '..')
-    processed_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_clean.csv')
+    processed_data_path = os.path.join(base_dir, 'data', 'processed', 'pedagogy_data_clean.arrow')
     
     df = load_data(processed_data_path)
     
@@ -104,7 +111,7 @@ def main():
         print(f"Tamanho do dataset para ML: {X.shape[0]} amostras.")
         print(f"Distribuição da Variável Alvo:\n{y.value_counts(normalize=True).mul(100).round(2)}")
         
-        model, report, auc_score, coefficients = train_and_evaluate_model(X, y, features)
+        model, report, auc_score, coefficients, metrics = train_and_evaluate_model(X, y, features)
         
         # Salvar o modelo e o scaler para uso futuro (Streamlit)
         import joblib
@@ -112,6 +119,14 @@ def main():
         joblib.dump(scaler, os.path.join(base_dir, 'src', 'scaler.pkl'))
         print("\nModelo e Scaler salvos com sucesso.")
         
+        # Pacote único com memory-map usado pelo app (app/app.py)
+        from model_bundle import save_bundle, LOGISTIC_BUNDLE
+        save_bundle(os.path.join(base_dir, 'src', LOGISTIC_BUNDLE), model, scaler, features)
+        
+        # Métricas e intervalos de confiança do modelo (exibidos pelo app/app.py)
+        metrics_path = save_metrics(os.path.join(base_dir, 'notebooks', 'logistic_model_metrics.csv'), 'Logistic Regression', metrics)
+        print(f"Métricas do modelo salvas em: {metrics_path}")
+        
         # Salvar os resultados do modelo em um arquivo de texto
         with open(os.path.join(base_dir, 'notebooks', 'model_results.txt'), 'w', encoding='utf-8') as f:
             f.write("--- Resultados do Modelo Preditivo de Risco de Defasagem ---\n\n")
@@ -122,6 +137,11 @@ def main():
             f.write(pd.DataFrame(report).transpose().to_markdown(numalign="left", stralign="left"))
             f.write(f"\n\nAUC Score: {auc_score:.4f}\n\n")
             
+            f.write(f"Métricas no conjunto de teste com intervalos de confiança bootstrap (IC 95%, {N_RESAMPLES} reamostragens):\n")
+            for name in METRIC_NAMES:
+                f.write(f"- {name}: {format_interval(metrics, name)}\n")
+            f.write("\n")
+            
             f.write("Interpretabilidade: Coeficientes do Modelo (Impacto no Risco):\n")
             f.write(coefficients.to_markdown(index=False))
             f.write("\n\n")
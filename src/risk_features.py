@@ -0,0 +1,31 @@
+from model_preparation import TEMPORAL_COLS
+from temporal_features import lag_name
+
+# Montagem das features do modelo otimizado a partir dos indicadores informados para um
+# ou mais alunos, compartilhada pelo app Streamlit (app_streamlit.py) e pelo serviço HTTP
+# (scoring_service.py). Os códigos das categorias, as features derivadas e a ordem de
+# feature_cols.pkl vêm do FeatureTransformer do treino (src/feature_transformer.pkl).
+
+# Campos de um aluno, como no app e no JSON do serviço
+STUDENT_FIELDS = ['ida', 'ieg', 'ips', 'ipp', 'iaa', 'ipv', 'ano', 'genero', 'fase']
+
+def build_feature_matrix(transformer, students):
+    """
+    Matriz de features (n x f) de uma lista de alunos (dicionários com STUDENT_FIELDS e,
+    opcionalmente, ida_lag1/ieg_lag1/ips_lag1). Sem os valores do ano anterior (novos
+    alunos), os lags repetem os valores atuais.
+    """
+    columns = {field: [student[field] for student in students] for field in STUDENT_FIELDS}
+    columns['gnero'] = columns.pop('genero')
+    for col in TEMPORAL_COLS:
+        lag = lag_name(col, 1)
+        columns[lag] = [student[col] if student.get(lag) is None else student[lag] for student in students]
+    return transformer.transform(columns)
+
+def build_feature_vector(transformer, ida, ieg, ips, ipp, iaa, ipv, ano, genero, fase, ida_lag1=None, ieg_lag1=None, ips_lag1=None):
+    """Vetor de features de um aluno (mesmas regras de `build_feature_matrix`)."""
+    student = {
+        'ida': ida, 'ieg': ieg, 'ips': ips, 'ipp': ipp, 'iaa': iaa, 'ipv': ipv, 'ano': ano,
+        'genero': genero, 'fase': fase, 'ida_lag1': ida_lag1, 'ieg_lag1': ieg_lag1, 'ips_lag1': ips_lag1
+    }
+    return build_feature_matrix(transformer, [student])[0]
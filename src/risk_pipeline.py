@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+import os
+import joblib
+from model_preparation import TEMPORAL_COLS
+from temporal_features import lag_name
+from feature_transformer import load_transformer, INDICATOR_COLS
+from tree_compiler import compile_gradient_boosting
+from model_bundle import BundledScaler, load_bundle, OPTIMIZED_BUNDLE
+from attribution import make_explainer
+
+# Pipeline único do modelo otimizado: derivação das features, normalização e estimador.
+#
+# Substitui o trio optimized_model.pkl + scaler_v2.pkl + feature_cols.pkl (mais o
+# feature_transformer.pkl) por um artefato, src/risk_pipeline.pkl, que recebe os dados
+# brutos dos alunos (um bloco NumPy com RAW_COLS) e retorna as probabilidades. A
+# normalização é aplicada diretamente sobre o array, sem DataFrame nem validação de nomes
+# de colunas. O GradientBoosting também é guardado compilado (tree_compiler), com o
+# scaler incorporado aos limiares: blocos de até FAST_PATH_ROWS linhas (app, serviço
+# HTTP) usam as árvores compiladas; blocos maiores, o estimador do scikit-learn (mesmas
+# probabilidades nos dois caminhos).
+
+RISK_PIPELINE = 'risk_pipeline.pkl'
+
+# Colunas do bloco bruto, na ordem esperada por `RiskPipeline.transform`
+RAW_COLS = INDICATOR_COLS + ['ano', 'gnero', 'fase'] + [lag_name(col, 1) for col in TEMPORAL_COLS]
+
+# As árvores compiladas servem para uma linha e lotes pequenos: sem a validação de
+# entrada do scikit-learn, são mais rápidas até algumas centenas de linhas (cruzamento
+# em torno de 300 em notebooks/inference_benchmark.txt); acima disso a travessia em
+# Cython do predict_proba é mais rápida, por isso o corte (um bloco do tree_compiler).
+FAST_PATH_ROWS = 256
+
+class RiskPipeline:
+    """Features do treino + scaler + estimador, aplicados a dados brutos dos alunos."""
+    
+    def __init__(self, transformer, model, scaler=None, feature_cols=None):
+        self.transformer = transformer
+        self.feature_cols = list(feature_cols or transformer.feature_cols)
+        n_features = getattr(model, 'n_features_in_', getattr(model, 'n_features', len(self.feature_cols)))
+        if n_features != len(self.feature_cols):
+            raise ValueError(f"O modelo espera {n_features} features, mas há {len(self.feature_cols)} em feature_cols.")
+        self.model = model
+        # Árvores achatadas com o scaler incorporado: recebem as features originais
+        self.compiled = compile_gradient_boosting(model, scaler) if hasattr(model, 'estimators_') else None
+        # Apenas os parâmetros do StandardScaler (sem validação de nomes de colunas)
+        if scaler is not None:
+            mean = scaler.mean_ if getattr(scaler, 'with_mean', True) else np.zeros(n_features)
+            scale = scaler.scale_ if getattr(scaler, 'with_std', True) else np.ones(n_features)
+            scaler = BundledScaler(np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64))
+        self.scaler = scaler
+        self.classes_ = np.asarray(model.classes_)
+        self.risk_col = list(self.classes_).index(1)
+        
+    def transform(self, X):
+        """
+        Matriz de features (n x f). `X` é um bloco bruto (n x len(RAW_COLS), ou uma linha)
+        com as colunas de RAW_COLS, ou um DataFrame/dicionário com essas colunas.
+        """
+        if not isinstance(X, (pd.DataFrame, dict)):
+            X = np.asarray(X)
+            if X.ndim == 1:
+                X = X.reshape(1, -1)
+            if X.ndim != 2 or X.shape[1] != len(RAW_COLS):
+                raise ValueError(f"Esperado um bloco com {len(RAW_COLS)} colunas ({', '.join(RAW_COLS)}), recebido {X.shape}.")
+            X = dict(zip(RAW_COLS, X.T))
+        return self.transformer.transform(X, self.feature_cols)
+        
+    def _model_input(self, features):
+        return features if self.scaler is None else self.scaler.transform(features)
+        
+    def predict_proba_features(self, features):
+        """Probabilidades das classes a partir da matriz de features (saída de `transform`)."""
+        if self.compiled is not None and len(features) <= FAST_PATH_ROWS:
+            return self.compiled.predict_proba(features)
+        return self.model.predict_proba(self._model_input(features))
+        
+    def predict_proba(self, X):
+        """Probabilidades das classes para um bloco bruto (ver `transform`)."""
+        return self.predict_proba_features(self.transform(X))
+        
+    def predict(self, X):
+        # Mesmo critério do scikit-learn: classe de maior probabilidade
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+        
+    def contributions(self, features):
+        """(bias, contribuições por feature em log-odds) a partir da matriz de features."""
+        if self.compiled is not None:
+            return self.compiled.contributions(features)
+        return make_explainer(self.model).contributions(self._model_input(features))
+
+def build_pipeline(base_dir):
+    """
+    Monta o pipeline a partir dos artefatos do treino em src/: o pacote do modelo
+    (optimized_model.bundle), se existir, ou os pickles, mais o FeatureTransformer.
+    """
+    src_dir = os.path.join(base_dir, 'src')
+    transformer = load_transformer(base_dir)
+    bundle_path = os.path.join(src_dir, OPTIMIZED_BUNDLE)
+    if os.path.exists(bundle_path):
+        model, scaler, feature_cols = load_bundle(bundle_path)
+    else:
+        model = joblib.load(os.path.join(src_dir, 'optimized_model.pkl'))
+        scaler = joblib.load(os.path.join(src_dir, 'scaler_v2.pkl'))
+        feature_cols = joblib.load(os.path.join(src_dir, 'feature_cols.pkl'))
+    return RiskPipeline(transformer, model, scaler, feature_cols)
+
+def load_pipeline(base_dir):
+    """Carrega src/risk_pipeline.pkl ou, na falta dele, monta o pipeline com `build_pipeline`."""
+    path = os.path.join(base_dir, 'src', RISK_PIPELINE)
+    if os.path.exists(path):
+        return joblib.load(path)
+    return build_pipeline(base_dir)
+
+def save_pipeline(pipeline, base_dir):
+    """Grava o pipeline em src/risk_pipeline.pkl e retorna o caminho."""
+    path = os.path.join(base_dir, 'src', RISK_PIPELINE)
+    joblib.dump(pipeline, path)
+    return path
+
+def main():
+    """Gera src/risk_pipeline.pkl a partir dos artefatos atuais de src/."""
+    base_dir = os.path.join(os.path.dirname(__file__), '..')
+    src_dir = os.path.join(base_dir, 'src')
+    pipeline = RiskPipeline(
+        load_transformer(base_dir),
+        joblib.load(os.path.join(src_dir, 'optimized_model.pkl')),
+        joblib.load(os.path.join(src_dir, 'scaler_v2.pkl')),
+        joblib.load(os.path.join(src_dir, 'feature_cols.pkl'))
+    )
+    path = save_pipeline(pipeline, base_dir)
+    print(f"Pipeline salvo em: {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+
+if __name__ == "__main__":
+    main()
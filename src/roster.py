@@ -0,0 +1,77 @@
+import numpy as np
+import os
+import hashlib
+from functools import lru_cache
+from storage import load_table, stored_path
+from batch_scoring import load_feature_context, score_chunk, INPUT_COLS
+
+# Lista de alunos (roster) ordenada por risco, usada pelo painel do app Streamlit.
+#
+# A base limpa inteira é pontuada uma vez (mesmas transformações de batch_scoring) e a
+# tabela resultante fica em cache no app, associada ao hash do modelo e dos dados. Os
+# filtros por fase, escola e ano e a paginação são feitos sobre essa tabela no servidor:
+# o navegador recebe apenas a página exibida.
+
+ROSTER_TABLE = os.path.join('data', 'processed', 'pedagogy_data_final.arrow')
+
+# Colunas exibidas no painel, além da probabilidade de risco
+ROSTER_COLS = ['aluno_id', 'ano', 'fase', 'escola', 'ida', 'ieg', 'ips', 'ipp', 'iaa', 'ipv']
+
+FILTER_COLS = ['fase', 'escola', 'ano']
+
+MISSING_LABEL = 'Não informado'
+
+@lru_cache(maxsize=16)
+def _content_hash(path, size, mtime_ns):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def file_fingerprint(path):
+    """Hash do conteúdo do arquivo, recalculado apenas quando o tamanho ou a data de modificação mudam."""
+    stat = os.stat(path)
+    return _content_hash(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+def data_version(base_dir):
+    """Hash da base pontuada no arquivo que `load_table` lê (Arrow ou, na falta dele, CSV)."""
+    return file_fingerprint(stored_path(os.path.join(base_dir, ROSTER_TABLE)))
+
+def score_roster(base_dir, pipeline, table_path=None):
+    """
+    Pontua todos os registros da base limpa. Retorna um DataFrame com ROSTER_COLS,
+    prob_risco e risco_previsto, em ordem decrescente de risco, com as colunas de
+    filtro como categorias (valores ausentes como MISSING_LABEL).
+    """
+    table_path = table_path or os.path.join(base_dir, ROSTER_TABLE)
+    df = load_table(table_path)
+    context = {'pipeline': pipeline, **load_feature_context(base_dir)}
+    scored, _ = score_chunk(df[[col for col in INPUT_COLS if col in df.columns]], context, context['history'])
+    
+    roster = df[ROSTER_COLS].reset_index(drop=True)
+    roster['prob_risco'] = scored['prob_risco'].to_numpy()
+    roster['risco_previsto'] = scored['risco_previsto'].to_numpy()
+    for col in ['fase', 'escola']:
+        roster[col] = roster[col].astype(object).fillna(MISSING_LABEL).astype(str).astype('category')
+    roster['ano'] = roster['ano'].astype('Int64').astype('category')
+    return roster.sort_values('prob_risco', ascending=False, kind='stable').reset_index(drop=True)
+
+def filter_options(roster):
+    """Valores disponíveis em cada coluna de filtro (ordenados)."""
+    return {col: sorted(roster[col].cat.categories.tolist(), key=str) for col in FILTER_COLS}
+
+def filter_roster(roster, fase=None, escola=None, ano=None):
+    """Linhas do roster com os valores escolhidos (None = todos), mantendo a ordem por risco."""
+    mask = np.ones(len(roster), dtype=bool)
+    for col, value in (('fase', fase), ('escola', escola), ('ano', ano)):
+        if value is not None:
+            mask &= (roster[col] == value).to_numpy()
+    return roster[mask]
+
+def paginate(df, page, page_size):
+    """Página `page` (a partir de 1) do DataFrame e o número total de páginas."""
+    n_pages = max(1, -(-len(df) // page_size))
+    page = min(max(1, page), n_pages)
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size], n_pages
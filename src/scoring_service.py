@@ -0,0 +1,257 @@
+import numpy as np
+import os
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+from risk_features import build_feature_matrix
+from risk_pipeline import load_pipeline
+
+# Serviço HTTP local de predição de risco (asyncio, sem dependências externas).
+#
+# - POST /predict: um aluno (objeto JSON com os campos do app) ou vários ({"instances": [...]})
+# - GET /metrics: latência p50/p99 das requisições e tamanho médio dos micro-lotes
+# - GET /health: verificação de disponibilidade
+#
+# O modelo fica carregado em memória; requisições simultâneas são agrupadas em
+# micro-lotes (até `max_batch` linhas ou `max_wait_ms` de espera) e pontuadas com uma
+# única chamada de `predict_proba`.
+
+REQUIRED_FIELDS = ['ida', 'ieg', 'ips', 'ipp', 'iaa', 'ipv', 'ano', 'genero', 'fase']
+OPTIONAL_FIELDS = ['ida_lag1', 'ieg_lag1', 'ips_lag1']
+
+# Janela de requisições usada no cálculo dos percentis de latência
+LATENCY_WINDOW = 10000
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+def load_model(base_dir):
+    """Carrega o pipeline do modelo otimizado (features do treino, scaler e estimador), como no app."""
+    return load_pipeline(base_dir)
+
+def make_predict_fn(pipeline):
+    """Função que recebe a matriz de features (n x f) e retorna a probabilidade de risco."""
+    def predict(X):
+        return pipeline.predict_proba_features(X)[:, pipeline.risk_col]
+    return predict
+
+def parse_instance(instance):
+    """
+    Campos de um aluno do JSON de entrada, com indicadores e ano numéricos (ValueError se
+    inválido). Categorias desconhecidas são tratadas pelo FeatureTransformer como no treino.
+    """
+    if not isinstance(instance, dict):
+        raise ValueError("Cada aluno deve ser um objeto JSON.")
+    missing = [field for field in REQUIRED_FIELDS if field not in instance]
+    if missing:
+        raise ValueError(f"Campos obrigatórios ausentes: {missing}")
+    try:
+        values = {field: float(instance[field]) for field in REQUIRED_FIELDS if field not in ('genero', 'fase')}
+        lags = {field: float(instance[field]) for field in OPTIONAL_FIELDS if instance.get(field) is not None}
+    except (TypeError, ValueError):
+        raise ValueError("Os indicadores e o ano devem ser numéricos.")
+    return {'genero': instance['genero'], 'fase': instance['fase'], **values, **lags}
+
+class MicroBatcher:
+    """Agrupa as requisições pendentes e pontua cada grupo com uma única chamada ao modelo."""
+    
+    def __init__(self, predict_fn, max_batch=256, max_wait_ms=2.0):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.batch_rows = deque(maxlen=LATENCY_WINDOW)
+        
+    async def submit(self, rows):
+        """Enfileira uma matriz de features e aguarda as probabilidades correspondentes."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((rows, future))
+        return await future
+        
+    async def _collect(self):
+        """Primeiro item disponível e os que chegarem até encher o lote ou esgotar a espera."""
+        items = [await self.queue.get()]
+        n_rows = len(items[0][0])
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while n_rows < self.max_batch:
+            if self.queue.empty():
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self.queue.get_nowait()
+            items.append(item)
+            n_rows += len(item[0])
+        return items
+        
+    async def run(self):
+        while True:
+            items = await self._collect()
+            X = np.vstack([rows for rows, _ in items])
+            self.batch_rows.append(len(X))
+            try:
+                proba = self.predict_fn(X)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            offset = 0
+            for rows, future in items:
+                if not future.done():
+                    future.set_result(proba[offset:offset + len(rows)])
+                offset += len(rows)
+
+class ScoringService:
+    """Rotas HTTP do serviço e métricas de latência."""
+    
+    def __init__(self, batcher, transformer):
+        self.batcher = batcher
+        self.transformer = transformer
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+        self.started = time.time()
+        
+    def metrics(self):
+        latencies = list(self.latencies_ms)
+        batch_rows = list(self.batcher.batch_rows)
+        return {
+            'requisicoes': self.requests,
+            'erros': self.errors,
+            'latencia_p50_ms': round(float(np.percentile(latencies, 50)), 3) if latencies else None,
+            'latencia_p99_ms': round(float(np.percentile(latencies, 99)), 3) if latencies else None,
+            'linhas_por_lote_media': round(float(np.mean(batch_rows)), 2) if batch_rows else None,
+            'janela': len(latencies),
+            'uptime_s': round(time.time() - self.started, 1)
+        }
+        
+    async def predict(self, body):
+        """Pontua um aluno ou uma lista de alunos ({"instances": [...]})."""
+        payload = json.loads(body)
+        batched = isinstance(payload, dict) and 'instances' in payload
+        instances = payload['instances'] if batched else [payload]
+        if not isinstance(instances, list) or not instances:
+            raise ValueError("'instances' deve ser uma lista não vazia.")
+            
+        # Features de todos os alunos da requisição de uma vez
+        rows = build_feature_matrix(self.transformer, [parse_instance(instance) for instance in instances])
+        proba = await self.batcher.submit(rows)
+        predictions = [{'prob_risco': float(p), 'risco': int(p > 0.5)} for p in proba]
+        return {'predictions': predictions} if batched else predictions[0]
+        
+    async def handle(self, method, path, body):
+        """Retorna (status, objeto de resposta) para uma requisição."""
+        if path == '/health' and method == 'GET':
+            return 200, {'status': 'ok'}
+        if path == '/metrics' and method == 'GET':
+            return 200, self.metrics()
+        if path == '/predict' and method == 'POST':
+            start = time.perf_counter()
+            self.requests += 1
+            try:
+                response = await self.predict(body)
+            except ValueError as e:
+                self.errors += 1
+                return 400, {'erro': str(e)}
+            except Exception as e:
+                # Falha inesperada no cálculo: resposta JSON em vez de derrubar a conexão
+                self.errors += 1
+                print(f"Erro ao processar /predict: {e!r}")
+                return 500, {'erro': "Erro interno ao calcular a predição."}
+            self.latencies_ms.append((time.perf_counter() - start) * 1000)
+            return 200, response
+        return 404, {'erro': f"Rota não encontrada: {method} {path}"}
+        
+    async def serve_connection(self, reader, writer):
+        """Atende as requisições de uma conexão (HTTP/1.1 com keep-alive)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                    
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                    
+                try:
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # Sem um tamanho válido não há como delimitar o corpo: a conexão é encerrada
+                    status, response = 400, {'erro': "Cabeçalho Content-Length inválido."}
+                    keep_alive = False
+                elif length > MAX_BODY_BYTES:
+                    status, response = 413, {'erro': "Corpo da requisição muito grande."}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, response = await self.handle(method, path.split('?')[0], body)
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                    
+                data = json.dumps(response).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(base_dir, host='127.0.0.1', port=8000, max_batch=256, max_wait_ms=2.0):
+    """Carrega o modelo, faz uma predição de aquecimento e atende até ser interrompido."""
+    pipeline = load_model(base_dir)
+    predict_fn = make_predict_fn(pipeline)
+    predict_fn(np.zeros((1, len(pipeline.feature_cols))))
+    
+    batcher = MicroBatcher(predict_fn, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    service = ScoringService(batcher, pipeline.transformer)
+    batcher_task = asyncio.create_task(batcher.run())
+    
+    server = await asyncio.start_server(service.serve_connection, host, port)
+    print(f"Serviço de predição ouvindo em http://{host}:{port} (lote máx. {max_batch}, espera {max_wait_ms} ms)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher_task.cancel()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço HTTP local de predição de risco de defasagem.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch', type=int, default=256, help="Máximo de linhas por micro-lote.")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help="Espera máxima para completar um micro-lote.")
+    args = parser.parse_args()
+    
+    base_dir = os.path.join(os.path.dirname(__file__), '..')
+    try:
+        asyncio.run(serve(base_dir, args.host, args.port, args.max_batch, args.max_wait_ms))
+    except KeyboardInterrupt:
+        print("\nServiço encerrado.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import numpy as np
+import os
+import json
+
+# Matrizes de treino/teste em shards float32 de tamanho fixo, lidas com memory-map.
+#
+# Cada diretório de shards contém X_00000.npy, y_00000.npy, ... (no máximo `shard_rows`
+# linhas por arquivo) e meta.json com o número de linhas e de features. Os shards são
+# abertos com mmap_mode='r', então percorrê-los (ex: partial_fit shard a shard) mantém
+# em memória apenas o shard atual, e não a matriz inteira.
+
+SHARD_ROWS = 65536
+
+SHARDS_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'processed', 'shards')
+
+class ShardWriter:
+    """Grava linhas em shards float32, recebendo os dados em blocos de qualquer tamanho."""
+    
+    def __init__(self, shard_dir, shard_rows=SHARD_ROWS):
+        self.shard_dir = shard_dir
+        self.shard_rows = shard_rows
+        self.shards = []
+        self.n_features = None
+        self._X, self._y, self._buffered = [], [], 0
+        os.makedirs(shard_dir, exist_ok=True)
+        # Shards antigos seriam misturados aos novos
+        for name in os.listdir(shard_dir):
+            if name.endswith('.npy') or name == 'meta.json':
+                os.remove(os.path.join(shard_dir, name))
+                
+    def append(self, X, y):
+        X = np.asarray(X, dtype=np.float32)
+        y = np.asarray(y)
+        if self.n_features is None:
+            self.n_features = X.shape[1]
+        self._X.append(X)
+        self._y.append(y)
+        self._buffered += len(X)
+        while self._buffered >= self.shard_rows:
+            self._flush(self.shard_rows)
+            
+    def _flush(self, n_rows):
+        X = np.concatenate(self._X) if len(self._X) > 1 else self._X[0]
+        y = np.concatenate(self._y) if len(self._y) > 1 else self._y[0]
+        number = len(self.shards)
+        np.save(os.path.join(self.shard_dir, f'X_{number:05d}.npy'), X[:n_rows])
+        np.save(os.path.join(self.shard_dir, f'y_{number:05d}.npy'), y[:n_rows])
+        self.shards.append(n_rows)
+        self._X, self._y = [X[n_rows:]], [y[n_rows:]]
+        self._buffered = len(X) - n_rows
+        
+    def close(self):
+        """Grava o último shard (parcial) e o meta.json."""
+        if self._buffered:
+            self._flush(self._buffered)
+        meta = {'rows': int(sum(self.shards)), 'n_features': self.n_features,
+                'shard_rows': self.shard_rows, 'shards': self.shards, 'dtype': 'float32'}
+        with open(os.path.join(self.shard_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+def write_shards(X, y, shard_dir, shard_rows=SHARD_ROWS):
+    """Grava (X, y) em shards de `shard_rows` linhas."""
+    writer = ShardWriter(shard_dir, shard_rows)
+    for start in range(0, len(X), shard_rows):
+        writer.append(X[start:start + shard_rows], np.asarray(y)[start:start + shard_rows])
+    writer.close()
+
+class ShardedDataset:
+    """Shards de um diretório, abertos com memory-map."""
+    
+    def __init__(self, shard_dir):
+        with open(os.path.join(shard_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.shard_dir = shard_dir
+        self.n_rows = self.meta['rows']
+        self.n_features = self.meta['n_features']
+        
+    def __len__(self):
+        return len(self.meta['shards'])
+        
+    def shard(self, number):
+        """(X, y) do shard `number`, com memory-map."""
+        X = np.load(os.path.join(self.shard_dir, f'X_{number:05d}.npy'), mmap_mode='r')
+        y = np.load(os.path.join(self.shard_dir, f'y_{number:05d}.npy'), mmap_mode='r')
+        return X, y
+        
+    def __iter__(self):
+        for number in range(len(self)):
+            yield self.shard(number)
+            
+    def labels(self):
+        """Todos os rótulos (uma coluna, cabe em memória)."""
+        return np.concatenate([np.asarray(y) for _, y in self])
+
+def open_shards(shard_dir=SHARDS_DIR):
+    """Abre os shards de treino e de teste gravados por model_preparation."""
+    return ShardedDataset(os.path.join(shard_dir, 'train')), ShardedDataset(os.path.join(shard_dir, 'test'))
@@ -0,0 +1,127 @@
+import pandas as pd
+import numpy as np
+import os
+
+# Camada de armazenamento compartilhada entre as etapas do pipeline.
+# As tabelas intermediárias (pedagogy_data_clean, pedagogy_data_final, pedagogy_data_fe)
+# são gravadas no formato Arrow IPC (Feather v2) sem compressão, preservando os tipos
+# das colunas, e relidas com memory-map. Os indicadores e demais colunas de ponto
+# flutuante são gravados em float64 (precisão completa: features e métricas idênticas às
+# do pipeline com CSV); os inteiros reduzidos são apenas o formato em disco e voltam
+# como int64.
+
+# Identificadores dos alunos (texto, ex: 'RA-1')
+ID_COLS = ['aluno_id', 'ra']
+
+# Colunas inteiras que podem ter nulos
+NULLABLE_INT_COLS = ['ano', 'anoingresso']
+
+# Colunas de texto com mais valores distintos do que essa fração das linhas
+# são gravadas como texto simples em vez de categoria (ex: nomes, observações livres)
+MAX_CATEGORY_RATIO = 0.5
+
+TABLE_SUFFIX = '.arrow'
+
+def table_path(path):
+    """Caminho do arquivo Arrow correspondente a uma tabela (aceita o caminho do CSV)."""
+    root, ext = os.path.splitext(path)
+    return path if ext == TABLE_SUFFIX else root + TABLE_SUFFIX
+
+def stored_path(path):
+    """Arquivo lido por `load_table` para a tabela: o Arrow, se existir, senão o CSV equivalente."""
+    arrow_path = table_path(path)
+    if os.path.exists(arrow_path):
+        return arrow_path
+    csv_path = os.path.splitext(arrow_path)[0] + '.csv'
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(arrow_path)
+    return csv_path
+
+def apply_schema(df):
+    """
+    Converte as colunas para tipos compactos.
+    
+    - texto: categoria (ou texto simples quando quase todos os valores são distintos)
+    - indicadores e demais colunas de ponto flutuante: float64 (sem perda de precisão)
+    - 'ano' e 'anoingresso': inteiros anuláveis (Int32)
+    - demais inteiros: menor tipo inteiro que comporta os valores
+    """
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if col in ID_COLS:
+            df[col] = series.astype('string')
+        elif col in NULLABLE_INT_COLS:
+            df[col] = pd.to_numeric(series, errors='coerce').round().astype('Int32')
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            df[col] = series.cat.set_categories(sorted(series.cat.categories))
+        elif pd.api.types.is_float_dtype(series.dtype):
+            df[col] = series.astype('float64')
+        elif pd.api.types.is_bool_dtype(series.dtype):
+            continue
+        elif pd.api.types.is_integer_dtype(series.dtype):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+            values = series.dropna()
+            if not values.map(lambda v: isinstance(v, str)).all():
+                # Colunas mistas (ex: datas e textos) são gravadas como texto
+                series = series.map(lambda v: v if pd.isna(v) else str(v))
+                values = series.dropna()
+            if len(values) and values.nunique() > MAX_CATEGORY_RATIO * len(values):
+                df[col] = series.astype('string')
+            else:
+                # Categorias ordenadas garantem um dicionário determinístico no arquivo
+                df[col] = pd.Categorical(series, categories=sorted(values.unique()))
+    return df
+
+def save_table(df, path):
+    """Grava a tabela tipada em Arrow IPC sem compressão e retorna o caminho gravado."""
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    
+    path = table_path(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Um único lote por arquivo: o conteúdo gravado não depende de como o DataFrame foi montado
+    table = pa.Table.from_pandas(apply_schema(df).reset_index(drop=True), preserve_index=False).combine_chunks()
+    # Grava num arquivo temporário e substitui o original: DataFrames já carregados com
+    # memory-map continuam apontando para o arquivo antigo em vez de lerem um arquivo truncado
+    tmp_path = path + '.tmp'
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+    return path
+
+def widen_numeric(df):
+    """Inteiros reduzidos (formato em disco) e colunas float32 de tabelas antigas em int64/float64, in-place."""
+    for col in df.columns:
+        dtype = df[col].dtype
+        if dtype == 'float32':
+            df[col] = df[col].astype('float64')
+        elif isinstance(dtype, np.dtype) and dtype.kind == 'i' and dtype != np.int64:
+            df[col] = df[col].astype('int64')
+    return df
+
+def load_table(path, columns=None):
+    """
+    Carrega uma tabela intermediária.
+    
+    Usa o arquivo Arrow (memory-map, sem cópia para as colunas de texto e inteiras sem
+    nulos) quando existir; caso contrário lê o CSV equivalente e aplica o mesmo esquema
+    de tipos. As colunas numéricas são devolvidas em float64/int64 (ver `widen_numeric`).
+    """
+    path = stored_path(path)
+    if path.endswith(TABLE_SUFFIX):
+        import pyarrow as pa
+        
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        if columns is not None:
+            # Mantém a ordem das colunas do arquivo, como no `usecols` do CSV
+            wanted = set(columns)
+            table = table.select([col for col in table.column_names if col in wanted])
+        return widen_numeric(table.to_pandas(split_blocks=True))
+        
+    usecols = (lambda col: col in columns) if columns is not None else None
+    return widen_numeric(apply_schema(pd.read_csv(path, usecols=usecols, low_memory=False)))
+
+def memory_usage_mb(df):
+    """Memória ocupada pelo DataFrame (incluindo textos), em MB."""
+    return df.memory_usage(deep=True).sum() / 1e6
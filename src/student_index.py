@@ -0,0 +1,184 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import zlib
+import hashlib
+from functools import lru_cache
+from temporal_features import sort_groups
+
+# Índice persistido do histórico de cada aluno, construído junto com a tabela final
+# (data_cleaning). Para cada aluno guarda, em arquivos .npy abertos com memory-map:
+#
+# - ids.npy:    identificadores distintos, na ordem (aluno_id) da tabela ordenada
+# - starts.npy: início de cada aluno em rows.npy (com um elemento extra ao final)
+# - rows.npy:   posição das linhas na tabela final, ordenadas por aluno e ano
+#               (linhas sem aluno ao final, como na ordenação do pandas)
+# - years.npy:  ano de cada linha de rows.npy
+# - slots.npy:  tabela hash (endereçamento aberto) de crc32(aluno_id) -> posição em ids.npy
+# - meta.json:  número de linhas e impressão digital (aluno_id, ano) da tabela indexada
+#
+# Com ele, o histórico de um aluno é obtido em O(1) (hash + leitura das linhas do aluno),
+# sem ordenar nem carregar a tabela inteira. O índice só é usado para a tabela com a
+# mesma impressão digital; para qualquer outra, volta-se à ordenação.
+
+INDEX_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'processed', 'student_index')
+
+_ARRAYS = ['ids', 'starts', 'rows', 'years', 'slots']
+
+def _hash(aluno_id):
+    """Hash estável do identificador (o `hash` do Python muda a cada execução)."""
+    return zlib.crc32(str(aluno_id).encode('utf-8'))
+
+def table_fingerprint(df, key='aluno_id', time='ano'):
+    """Hash das colunas de aluno e ano, na ordem das linhas (identifica a tabela indexada)."""
+    ids = df[key].astype('string').fillna('').to_numpy(dtype=object)
+    years = pd.to_numeric(df[time], errors='coerce').fillna(-1).to_numpy(dtype='int64')
+    digest = hashlib.sha256('\x1f'.join(ids).encode('utf-8'))
+    digest.update(years.tobytes())
+    return digest.hexdigest()
+
+def _build_slots(ids):
+    """Tabela hash com sondagem linear, com pelo menos o dobro de posições que alunos."""
+    size = 1 << max(4, (2 * len(ids) - 1).bit_length())
+    slots = np.full(size, -1, dtype='int64')
+    mask = size - 1
+    for i, aluno_id in enumerate(ids):
+        slot = _hash(aluno_id) & mask
+        while slots[slot] != -1:
+            slot = (slot + 1) & mask
+        slots[slot] = i
+    return slots
+
+class StudentIndex:
+    """Índice aluno_id -> linhas da tabela final, por ano."""
+    
+    def __init__(self, ids, starts, rows, years, slots, n_rows, fingerprint=None):
+        self.ids = ids
+        self.starts = starts
+        self.rows = rows
+        self.years = years
+        self.slots = slots
+        self.n_rows = n_rows
+        self.fingerprint = fingerprint
+        
+    def matches(self, df, key='aluno_id', time='ano'):
+        """Indica se o índice corresponde à tabela `df` (mesmas linhas de aluno e ano, na mesma ordem)."""
+        if self.fingerprint is None or len(df) != self.n_rows:
+            return False
+        return table_fingerprint(df, key, time) == self.fingerprint
+        
+    def position(self, aluno_id):
+        """Posição do aluno em `ids` (ou None se ele não estiver no índice)."""
+        mask = len(self.slots) - 1
+        slot = _hash(aluno_id) & mask
+        while self.slots[slot] != -1:
+            i = self.slots[slot]
+            if self.ids[i] == aluno_id:
+                return int(i)
+            slot = (slot + 1) & mask
+        return None
+        
+    def history(self, aluno_id):
+        """Anos e linhas da tabela final de um aluno, em ordem de ano."""
+        i = self.position(aluno_id)
+        if i is None:
+            return np.array([], dtype=self.years.dtype), np.array([], dtype=self.rows.dtype)
+        start, end = self.starts[i], self.starts[i + 1]
+        return np.asarray(self.years[start:end]), np.asarray(self.rows[start:end])
+        
+    def row(self, aluno_id, ano):
+        """Linha da tabela final do aluno no ano `ano` (ou None)."""
+        years, rows = self.history(aluno_id)
+        found = np.flatnonzero(years == ano)
+        return int(rows[found[0]]) if len(found) else None
+        
+    def sort_plan(self):
+        """
+        Ordenação por aluno e ano já calculada: (ordem das linhas, posição de cada linha
+        no histórico do aluno, máscara das linhas com aluno), no formato de `sort_groups`.
+        """
+        order = np.asarray(self.rows)
+        lengths = np.diff(self.starts)
+        grouped = np.zeros(len(order), dtype=bool)
+        grouped[:self.starts[-1]] = True
+        position = np.zeros(len(order), dtype='int64')
+        position[:self.starts[-1]] = np.arange(self.starts[-1]) - np.repeat(self.starts[:-1], lengths)
+        return order, position, grouped
+
+def build_index(df, index_dir=INDEX_DIR, key='aluno_id', time='ano'):
+    """Constrói e grava o índice da tabela `df` (posições de linha 0..n-1)."""
+    df_sorted, position, grouped = sort_groups(df.reset_index(drop=True), key=key, time=time)
+    rows = df_sorted.index.to_numpy(dtype='int64')
+    starts = np.flatnonzero(grouped & (position == 0))
+    ids = df_sorted[key].to_numpy()[starts].astype(str)
+    
+    arrays = {
+        'ids': ids,
+        'starts': np.r_[starts, grouped.sum()].astype('int64'),
+        'rows': rows,
+        'years': pd.to_numeric(df_sorted[time], errors='coerce').fillna(-1).to_numpy(dtype='int32'),
+        'slots': _build_slots(ids)
+    }
+    
+    os.makedirs(index_dir, exist_ok=True)
+    for name, values in arrays.items():
+        np.save(os.path.join(index_dir, f'{name}.npy'), values)
+    with open(os.path.join(index_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'rows': len(df), 'alunos': len(ids), 'fingerprint': table_fingerprint(df, key, time)}, f)
+    print(f"Índice de histórico dos alunos salvo em: {index_dir} ({len(ids)} alunos)")
+
+def index_fingerprint(index_dir=INDEX_DIR):
+    """Impressão digital da tabela indexada (meta.json), ou None se o índice não existir."""
+    meta_path = os.path.join(index_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('fingerprint')
+
+def load_index(index_dir=INDEX_DIR):
+    """Abre o índice com memory-map; retorna None se ele não existir."""
+    meta_path = os.path.join(index_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(index_dir, f'{name}.npy'), mmap_mode='r') for name in _ARRAYS}
+    return StudentIndex(n_rows=meta['rows'], fingerprint=meta.get('fingerprint'), **arrays)
+
+@lru_cache(maxsize=8)
+def _file_fingerprint(table_path, size, mtime_ns):
+    """Impressão digital da tabela Arrow, recalculada apenas quando o arquivo muda."""
+    import pyarrow as pa
+    
+    table = pa.ipc.open_file(pa.memory_map(table_path, 'r')).read_all()
+    return table_fingerprint(table.select(['aluno_id', 'ano']).to_pandas())
+
+def _scan_row(table, aluno_id, ano):
+    """Primeira linha do aluno no ano `ano`, procurada diretamente na tabela (sem índice)."""
+    keys = table.select(['aluno_id', 'ano']).to_pandas()
+    found = np.flatnonzero((keys['aluno_id'].astype('string') == str(aluno_id)).fillna(False).to_numpy(dtype=bool)
+                           & (pd.to_numeric(keys['ano'], errors='coerce') == ano).to_numpy())
+    return int(found[0]) if len(found) else None
+
+def previous_year_values(index, table_path, aluno_id, ano, columns):
+    """
+    Valores de `columns` do aluno no ano anterior a `ano`, lidos apenas da linha
+    correspondente da tabela final (Arrow com memory-map). Retorna None se não houver.
+    Se o índice não corresponder ao arquivo (tabela regravada depois do índice), a
+    linha é procurada na própria tabela.
+    """
+    if not os.path.exists(table_path):
+        return None
+    import pyarrow as pa
+    
+    table = pa.ipc.open_file(pa.memory_map(table_path, 'r')).read_all()
+    stat = os.stat(table_path)
+    if index.fingerprint is not None and _file_fingerprint(os.path.abspath(table_path), stat.st_size, stat.st_mtime_ns) == index.fingerprint:
+        row = index.row(aluno_id, ano - 1)
+    else:
+        row = _scan_row(table, aluno_id, ano - 1)
+    if row is None:
+        return None
+    record = table.select(columns).slice(row, 1).to_pylist()[0]
+    return {col: (np.nan if value is None else value) for col, value in record.items()}
@@ -0,0 +1,100 @@
+import pandas as pd
+import numpy as np
+
+# Motor de features temporais por aluno (lag, delta e média móvel entre anos).
+# A tabela é ordenada uma única vez (ordenação estável por aluno e ano) e os limites
+# de cada aluno são calculados a partir dessa ordenação; todas as features de todos
+# os indicadores são então obtidas numa única passagem vetorizada, em tempo linear
+# no número de linhas.
+
+def sort_groups(df, key='aluno_id', time='ano', index=None):
+    """
+    Ordena `df` por aluno e ano (estável, nulos ao final) e calcula os limites dos grupos.
+    
+    Retorna (df ordenado, posição de cada linha dentro do seu grupo, máscara das linhas
+    com aluno informado). Linhas sem aluno não pertencem a nenhum grupo. Com um índice
+    de histórico (student_index) da mesma tabela, a ordenação já gravada é reaproveitada.
+    """
+    if index is not None and index.matches(df, key, time):
+        order, position, grouped = index.sort_plan()
+        return df.iloc[order], position, grouped
+        
+    df_sorted = df.sort_values([key, time], kind='stable')
+    codes = pd.factorize(df_sorted[key])[0]
+    
+    n = len(codes)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    lengths = np.diff(np.r_[starts, n])
+    position = np.arange(n) - np.repeat(starts, lengths)
+    
+    return df_sorted, position, codes >= 0
+
+def lag_name(col, k):
+    """Nome da coluna de lag (ex: 'ida_lag1')."""
+    return f'{col}_lag{k}'
+
+def delta_name(col, k):
+    """Nome da coluna de variação (ex: 'ida_delta' para k=1, 'ida_delta2' para k=2)."""
+    return f'{col}_delta' if k == 1 else f'{col}_delta{k}'
+
+def rolling_name(col, window):
+    """Nome da coluna de média móvel (ex: 'ida_rolling3')."""
+    return f'{col}_rolling{window}'
+
+def _as_float(series):
+    """Valores da coluna como array de ponto flutuante (mantém o tipo de ponto flutuante da coluna)."""
+    if pd.api.types.is_float_dtype(series.dtype):
+        return series.to_numpy(dtype=series.dtype, na_value=np.nan)
+    return series.to_numpy(dtype='float64', na_value=np.nan)
+
+def add_temporal_features(df, columns, lags=(1,), deltas=(1,), rolling=(), delta_columns=None,
+                          key='aluno_id', time='ano', consecutive=False, index=None):
+    """
+    Adiciona features temporais de `columns` calculadas dentro do histórico de cada aluno.
+    
+    - lags: profundidades k de `<col>_lag<k>` (valor k registros antes, no mesmo aluno)
+    - deltas: profundidades k de `<col>_delta<k>` (valor atual menos o lag k)
+    - rolling: janelas w de `<col>_rolling<w>` (média do registro atual e dos w-1 anteriores, ignorando nulos)
+    - delta_columns: subconjunto de `columns` que recebe deltas (padrão: todas)
+    - consecutive: exige que o registro de lag k seja exatamente do ano `ano - k`
+      (sem ele, o lag é simplesmente o registro anterior do aluno)
+    - index: índice de histórico da tabela (evita a ordenação)
+      
+    Retorna o DataFrame ordenado por aluno e ano, com as novas colunas (lags, depois
+    deltas, depois médias móveis, na ordem de `columns`).
+    """
+    df_sorted, position, grouped = sort_groups(df, key=key, time=time, index=index)
+    years = _as_float(df_sorted[time]) if consecutive else None
+    
+    # Máscara, para cada profundidade k, das linhas cujo registro k posições acima é válido
+    depths = set(lags) | set(deltas) | {k for window in rolling for k in range(1, window)}
+    masks = {}
+    for k in sorted(depths):
+        valid = grouped & (position >= k)
+        if consecutive:
+            valid[k:] &= (years[k:] - years[:-k]) == k
+        masks[k] = valid[k:]
+        
+    delta_columns = columns if delta_columns is None else delta_columns
+    lag_cols, delta_cols, rolling_cols = {}, {}, {}
+    for col in columns:
+        values = _as_float(df_sorted[col])
+        shifted = {}
+        for k, valid in masks.items():
+            lagged = np.full_like(values, np.nan)
+            lagged[k:][valid] = values[:-k][valid]
+            shifted[k] = lagged
+            
+        for k in lags:
+            lag_cols[lag_name(col, k)] = shifted[k]
+        if col in delta_columns:
+            for k in deltas:
+                delta_cols[delta_name(col, k)] = values - shifted[k]
+        for window in rolling:
+            window_values = np.vstack([values] + [shifted[k] for k in range(1, window)])
+            count = np.sum(~np.isnan(window_values), axis=0)
+            with np.errstate(invalid='ignore'):
+                rolling_cols[rolling_name(col, window)] = np.nansum(window_values, axis=0) / count
+                
+    new_df = pd.DataFrame({**lag_cols, **delta_cols, **rolling_cols}, index=df_sorted.index)
+    return pd.concat([df_sorted, new_df], axis=1)
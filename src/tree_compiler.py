@@ -0,0 +1,244 @@
+import numpy as np
+from scipy.special import expit
+from scipy.sparse import csr_matrix
+
+# Inferência compilada do GradientBoostingClassifier binário.
+#
+# As árvores do modelo são achatadas em arrays contíguos (feature, limiar, filho
+# esquerdo/direito e valor das folhas, já multiplicado pelo learning rate) e todas as
+# árvores são percorridas ao mesmo tempo, de forma vetorizada, nível a nível. Os nós são
+# renumerados em largura, com os dois filhos de cada nó lado a lado (direito = esquerdo
+# + 1): cada nível da travessia é `esquerdo[nó] + (x > limiar[nó])`.
+#
+# O StandardScaler é incorporado aos limiares: o scikit-learn compara
+# float32((x - média) / escala) <= limiar, o que, por ser monótono em x, equivale a
+# x <= corte para um corte em float64 encontrado por busca binária. Assim a predição
+# sobre as features originais (float64) é idêntica à do modelo com o scaler. Valores
+# ausentes (NaN) seguem `missing_go_to_left` de cada nó, como no scikit-learn.
+#
+# Uso: uma linha e lotes pequenos. Sem a validação de entrada e as conversões do
+# scikit-learn, o compilado é mais rápido até algumas dezenas de linhas; em lotes
+# grandes a travessia em Cython do predict_proba do scikit-learn é mais rápida (ver
+# notebooks/inference_benchmark.txt), e o risk_pipeline escolhe o caminho pelo tamanho
+# do lote (FAST_PATH_ROWS).
+
+_SIGN_BIT = np.int64(-0x8000000000000000)
+_MAGNITUDE = np.int64(0x7FFFFFFFFFFFFFFF)
+
+# Linhas processadas por vez na travessia (os arrays n_linhas x n_árvores de cada
+# bloco cabem no cache)
+BLOCK_ROWS = 256
+
+def _float_to_key(x):
+    """Inteiros com a mesma ordem dos floats (float64 -> int64)."""
+    bits = x.view(np.int64)
+    return np.where(bits >= 0, bits, -(bits & _MAGNITUDE))
+
+def _key_to_float(key):
+    """Inversa de `_float_to_key`."""
+    bits = np.where(key >= 0, key, (-key) | _SIGN_BIT)
+    return bits.view(np.float64)
+
+def _fold_thresholds(thresholds, mean, scale):
+    """
+    Maior x (float64) tal que float32((x - mean) / scale) <= limiar, para cada nó.
+    Busca binária sobre a representação ordenada dos floats (no máximo 64 passos).
+    """
+    def goes_left(x):
+        with np.errstate(over='ignore', invalid='ignore'):
+            return ((x - mean) / scale).astype(np.float32) <= thresholds
+            
+    lo = np.full(len(thresholds), _float_to_key(np.array([-np.inf]))[0])
+    hi = np.full(len(thresholds), _float_to_key(np.array([np.inf]))[0])
+    always_left = goes_left(np.full(len(thresholds), np.inf))
+    while np.any(hi > lo + 1):
+        # Ponto médio sem overflow (lo e hi cobrem quase todo o intervalo do int64)
+        mid = (lo >> 1) + (hi >> 1) + (lo & hi & 1)
+        left = goes_left(_key_to_float(mid))
+        lo = np.where(left, mid, lo)
+        hi = np.where(left, hi, mid)
+    return np.where(always_left, np.inf, _key_to_float(lo))
+
+class CompiledGradientBoosting:
+    """Árvores achatadas de um GradientBoostingClassifier binário, com o scaler incorporado."""
+    
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, init, max_depth, n_features,
+                 sklearn_index=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.init = init
+        self.max_depth = max_depth
+        self.n_features = n_features
+        # Nó compilado de cada nó do scikit-learn (raiz da árvore + id do nó); só existe
+        # logo após a compilação, para mapear as folhas de `apply`
+        self.sklearn_index = sklearn_index
+        self.classes_ = np.array([0, 1])
+        
+    def arrays(self):
+        """Arrays que definem o modelo (para gravação)."""
+        return {
+            'feature': self.feature, 'threshold': self.threshold, 'left': self.left, 'right': self.right,
+            'missing_left': self.missing_left, 'value': self.value, 'roots': self.roots,
+            'meta': np.array([self.init, self.max_depth, self.n_features], dtype=np.float64)
+        }
+        
+    @classmethod
+    def from_arrays(cls, arrays):
+        if 'missing_left' not in arrays:
+            raise ValueError("Modelo compilado em layout antigo; gere-o novamente com compile_gradient_boosting.")
+        init, max_depth, n_features = arrays['meta']
+        return cls(arrays['feature'], arrays['threshold'], arrays['left'], arrays['right'], arrays['missing_left'],
+                   arrays['value'], arrays['roots'], float(init), int(max_depth), int(n_features))
+                   
+    def _leaves(self, X):
+        """Folha alcançada em cada árvore, para cada linha de um bloco (n_linhas x n_árvores)."""
+        X = np.ascontiguousarray(X)
+        flat = X.ravel()
+        row_start = (np.arange(len(X)) * X.shape[1])[:, None]
+        has_nan = bool(np.isnan(flat).any())
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            x = flat[row_start + self.feature[nodes]]
+            # Folhas têm limiar +inf e apontam para si mesmas
+            go_right = x > self.threshold[nodes]
+            if has_nan:
+                go_right |= np.isnan(x) & ~self.missing_left[nodes]
+            nodes = self.left[nodes] + go_right
+        return nodes
+        
+    def decision_function(self, X):
+        """Soma do valor inicial com as folhas de todas as árvores (na ordem do scikit-learn)."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        raw = np.empty(len(X))
+        for start in range(0, len(X), BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            values = self.value[self._leaves(block)]
+            # Soma sequencial (cumsum), como o acúmulo árvore a árvore do scikit-learn
+            terms = np.concatenate([np.full((len(block), 1), self.init), values], axis=1)
+            raw[start:start + len(block)] = np.cumsum(terms, axis=1)[:, -1]
+        return raw
+        
+    def _node_contributions(self):
+        """
+        Contribuições acumuladas da raiz até cada nó (n_nós x n_features): cada divisão
+        soma à sua feature a variação do valor do nó. Calculado uma vez por modelo.
+        """
+        if getattr(self, '_node_contrib', None) is None:
+            node_contrib = np.zeros((len(self.feature), self.n_features))
+            frontier = self.roots
+            for _ in range(self.max_depth):
+                parents = frontier[self.left[frontier] != frontier]
+                for children in (self.left[parents], self.right[parents]):
+                    node_contrib[children] = node_contrib[parents]
+                    node_contrib[children, self.feature[parents]] += self.value[children] - self.value[parents]
+                frontier = np.concatenate([self.left[parents], self.right[parents]])
+            self._node_contrib = node_contrib
+        return self._node_contrib
+        
+    def leaf_contributions(self, leaves):
+        """Contribuições por feature a partir das folhas alcançadas (n_linhas x n_árvores, índices globais)."""
+        leaves = np.asarray(leaves)
+        n_rows, n_trees = leaves.shape
+        # Matriz esparsa linha x nó (um 1 por árvore) vezes as contribuições de cada folha
+        reached = csr_matrix((np.ones(leaves.size), leaves.ravel(), np.arange(0, leaves.size + 1, n_trees)),
+                             shape=(n_rows, len(self.feature)))
+        return reached @ self._node_contributions()
+        
+    def contributions(self, X):
+        """
+        Decomposição de decision_function por feature, pelo caminho de cada linha nas
+        árvores (método de Saabas): cada divisão atribui à sua feature a variação do valor
+        do nó. Retorna (bias, contribuições n_linhas x n_features), em log-odds, com
+        bias + contribuições.sum(axis=1) == decision_function(X).
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        leaves = np.concatenate([self._leaves(X[start:start + BLOCK_ROWS]) for start in range(0, len(X), BLOCK_ROWS)])
+        return np.full(len(X), self.bias()), self.leaf_contributions(leaves)
+        
+    def bias(self):
+        """Parte da predição que não depende das features: valor inicial + raízes das árvores."""
+        return self.init + self.value[self.roots].sum()
+        
+    def predict_proba(self, X):
+        proba = expit(self.decision_function(X))
+        return np.column_stack([1 - proba, proba])
+        
+    def predict(self, X):
+        # Mesmo critério do scikit-learn (argmax das probabilidades, empate -> classe 0)
+        return (expit(self.decision_function(X)) > 0.5).astype(int)
+
+def _breadth_first_order(tree):
+    """Ids dos nós de uma árvore do scikit-learn em largura, com os filhos de cada nó lado a lado."""
+    level = np.array([0])
+    order = [level]
+    while len(level):
+        internal = level[tree.children_left[level] != -1]
+        level = np.column_stack([tree.children_left[internal], tree.children_right[internal]]).ravel()
+        order.append(level)
+    return np.concatenate(order)
+
+def compile_gradient_boosting(model, scaler=None):
+    """
+    Achata um GradientBoostingClassifier binário treinado. Com `scaler` (StandardScaler
+    usado no treino), o modelo compilado recebe as features originais, sem normalização.
+    """
+    if model.estimators_.shape[1] != 1:
+        raise ValueError("Apenas classificação binária é suportada.")
+        
+    n_features = model.n_features_in_
+    mean = scaler.mean_ if scaler is not None and scaler.with_mean else np.zeros(n_features)
+    scale = scaler.scale_ if scaler is not None and scaler.with_std else np.ones(n_features)
+    
+    features, thresholds, lefts, rights, missing_lefts, values, roots, sklearn_ids = [], [], [], [], [], [], [], []
+    offset = 0
+    for estimator in model.estimators_[:, 0]:
+        tree = estimator.tree_
+        order = _breadth_first_order(tree)
+        position = np.empty(tree.node_count, dtype=np.intp)
+        position[order] = np.arange(tree.node_count)
+        is_leaf = tree.children_left[order] == -1
+        # Folhas apontam para si mesmas (limiar +inf), então a travessia pode seguir até max_depth
+        left = np.where(is_leaf, np.arange(tree.node_count), position[tree.children_left[order]]) + offset
+        lefts.append(left)
+        rights.append(left + ~is_leaf)
+        features.append(np.where(is_leaf, 0, tree.feature[order]))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+        # Sem missing_go_to_left (scikit-learn < 1.3), NaN <= limiar é falso: vai à direita
+        missing_go_to_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool))
+        missing_lefts.append(is_leaf | (np.asarray(missing_go_to_left)[order] != 0))
+        values.append(model.learning_rate * tree.value[order, 0, 0])
+        roots.append(offset)
+        sklearn_ids.append(order + offset)
+        offset += tree.node_count
+        
+    feature = np.concatenate(features).astype(np.intp)
+    threshold = _fold_thresholds(np.concatenate(thresholds), mean[feature], scale[feature])
+    sklearn_index = np.empty(offset, dtype=np.intp)
+    sklearn_index[np.concatenate(sklearn_ids)] = np.arange(offset)
+    
+    init = float(model._raw_predict_init(np.zeros((1, n_features)))[0, 0])
+    max_depth = max(estimator.tree_.max_depth for estimator in model.estimators_[:, 0])
+    
+    return CompiledGradientBoosting(
+        feature, threshold, np.concatenate(lefts).astype(np.intp), np.concatenate(rights).astype(np.intp),
+        np.concatenate(missing_lefts), np.concatenate(values), np.array(roots, dtype=np.intp), init, max_depth,
+        n_features, sklearn_index
+    )
+
+def save_compiled(compiled, path):
+    """Grava o modelo compilado (arrays sem compressão, .npz)."""
+    np.savez(path, **compiled.arrays())
+
+def load_compiled(path):
+    """Carrega um modelo compilado gravado por `save_compiled`."""
+    with np.load(path) as arrays:
+        return CompiledGradientBoosting.from_arrays({name: arrays[name] for name in arrays.files})
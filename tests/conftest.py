@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos do pipeline são importados pelo nome, como nos scripts de src/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -0,0 +1,17 @@
+import os
+import pandas as pd
+import pytest
+from data_preparation import read_sheet_streaming, _projection, PIPELINE_COLS
+
+workbook = os.path.join(os.path.dirname(__file__), '..', 'data', 'raw', 'BASE DE DADOS PEDE 2024 - DATATHON.xlsx')
+
+@pytest.mark.skipif(not os.path.exists(workbook), reason="Workbook do PEDE ausente em data/raw.")
+@pytest.mark.parametrize('sheet_name, year', [('PEDE2022', 2022), ('PEDE2023', 2023), ('PEDE2024', 2024)])
+@pytest.mark.parametrize('columns', [None, PIPELINE_COLS], ids=['all_columns', 'pipeline_columns'])
+def test_streaming_reader_matches_read_excel(sheet_name, year, columns):
+    usecols = _projection(columns, year)
+    expected = pd.read_excel(workbook, sheet_name=sheet_name, usecols=usecols)
+    # Blocos pequenos: o tipo de cada coluna não pode depender do bloco
+    for chunk_rows in (5000, 100):
+        pd.testing.assert_frame_equal(read_sheet_streaming(workbook, sheet_name, chunk_rows=chunk_rows, usecols=usecols),
+                                      expected, check_exact=True)
@@ -0,0 +1,22 @@
+import os
+import pytest
+from incremental import _default_manifest, rebuild, append_year, verify
+
+base_dir = os.path.join(os.path.dirname(__file__), '..')
+
+@pytest.mark.parametrize('project', [False, True], ids=['all_columns', 'pipeline_columns'])
+def test_append_year_matches_full_rebuild(project, tmp_path):
+    manifest = _default_manifest(base_dir)
+    workbook, _, _ = manifest['sources'][0]
+    if not os.path.exists(workbook):
+        pytest.skip("Workbook do PEDE ausente em data/raw.")
+        
+    # Tabelas de 2022 e 2023; 2024 entra pelo caminho incremental
+    manifest['sources'] = [source for source in manifest['sources'] if source[2] != 2024]
+    manifest['project'] = project
+    rebuild(manifest, str(tmp_path))
+    
+    manifest, mode = append_year(manifest, str(tmp_path), workbook, 'PEDE2024', 2024)
+    assert mode == 'incremental'
+    assert [source[2] for source in manifest['sources']] == [2022, 2023, 2024]
+    assert verify(manifest, str(tmp_path))
@@ -0,0 +1,126 @@
+import os
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+from tree_compiler import (compile_gradient_boosting, save_compiled, load_compiled,
+                           _float_to_key, _key_to_float, _fold_thresholds)
+
+base_dir = os.path.join(os.path.dirname(__file__), '..')
+processed_dir = os.path.join(base_dir, 'data', 'processed')
+
+@pytest.fixture(scope='module')
+def scaler():
+    with warnings.catch_warnings():
+        # Pickle gerado por outra versão do scikit-learn (apenas média e escala são usadas)
+        warnings.simplefilter('ignore')
+        return joblib.load(os.path.join(base_dir, 'src', 'scaler_v2.pkl'))
+
+@pytest.fixture(scope='module')
+def X_raw(scaler):
+    """Features originais (antes da normalização) do conjunto de teste."""
+    return scaler.inverse_transform(np.load(os.path.join(processed_dir, 'X_test.npy')))
+    
+def scaled(scaler, X):
+    """Normalização do app: scaler_v2.transform sobre o DataFrame com os nomes das colunas."""
+    return scaler.transform(pd.DataFrame(X, columns=scaler.feature_names_in_))
+
+# Árvores de profundidade fixa (construção em profundidade) e com número máximo de
+# folhas (construção best-first: folhas em profundidades diferentes)
+@pytest.fixture(scope='module', params=[{'max_depth': 3}, {'max_depth': None, 'max_leaf_nodes': 8}],
+                ids=['depth', 'best_first'])
+def model(request):
+    X_train = np.load(os.path.join(processed_dir, 'X_train.npy'))
+    y_train = np.load(os.path.join(processed_dir, 'y_train.npy'))
+    return GradientBoostingClassifier(n_estimators=100, learning_rate=0.1, random_state=42, **request.param).fit(X_train, y_train)
+
+def sklearn_reference(model, scaler, X):
+    """
+    Probabilidade pela travessia das árvores do próprio scikit-learn (Tree.predict sobre
+    float32), que aceita NaN e ±inf, ao contrário da validação de predict_proba.
+    """
+    X_scaled = np.ascontiguousarray(((X - scaler.mean_) / scaler.scale_).astype(np.float32))
+    raw = model._raw_predict_init(np.zeros((len(X), model.n_features_in_)))[:, 0].copy()
+    for estimator in model.estimators_[:, 0]:
+        raw += model.learning_rate * estimator.tree_.predict(X_scaled)[:, 0]
+    return 1 / (1 + np.exp(-raw))
+
+def test_predict_proba_matches_sklearn_on_test_set(model, scaler, X_raw):
+    compiled = compile_gradient_boosting(model, scaler)
+    expected = model.predict_proba(scaled(scaler, X_raw))
+    np.testing.assert_array_equal(compiled.predict_proba(X_raw), expected)
+    np.testing.assert_array_equal(compiled.predict(X_raw), model.predict(scaled(scaler, X_raw)))
+    
+def test_single_row_matches_batch(model, scaler, X_raw):
+    compiled = compile_gradient_boosting(model, scaler)
+    batch = compiled.predict_proba(X_raw)
+    for i in range(0, len(X_raw), 50):
+        np.testing.assert_array_equal(compiled.predict_proba(X_raw[i]), batch[i:i + 1])
+        
+def test_reference_matches_predict_proba(model, scaler, X_raw):
+    expected = model.predict_proba(scaled(scaler, X_raw))[:, 1]
+    np.testing.assert_allclose(sklearn_reference(model, scaler, X_raw), expected, rtol=0, atol=1e-15)
+    
+def test_edge_values_match_sklearn(model, scaler, X_raw):
+    compiled = compile_gradient_boosting(model, scaler)
+    internal = compiled.left != np.arange(len(compiled.left))
+    rows = []
+    # Exatamente no corte incorporado e nos floats vizinhos, para cada divisão
+    for feature, cut in zip(compiled.feature[internal], compiled.threshold[internal]):
+        for value in (np.nextafter(cut, -np.inf), cut, np.nextafter(cut, np.inf)):
+            row = X_raw[0].copy()
+            row[feature] = value
+            rows.append(row)
+    # ±inf e NaN em cada feature, isolados e todos juntos
+    for value in (np.inf, -np.inf, np.nan):
+        for feature in range(X_raw.shape[1]):
+            row = X_raw[feature % len(X_raw)].copy()
+            row[feature] = value
+            rows.append(row)
+        rows.append(np.full(X_raw.shape[1], value))
+    X = np.array(rows)
+    
+    expected = sklearn_reference(model, scaler, X)
+    np.testing.assert_allclose(compiled.predict_proba(X)[:, 1], expected, rtol=0, atol=1e-15)
+    
+def test_nan_follows_missing_go_to_left(model, scaler, X_raw):
+    missing = np.concatenate([estimator.tree_.missing_go_to_left[estimator.tree_.children_left != -1]
+                              for estimator in model.estimators_[:, 0]])
+    # Os dois sentidos aparecem no modelo, então o teste de NaN cobre ambos
+    assert missing.any() and not missing.all()
+    compiled = compile_gradient_boosting(model, scaler)
+    X = np.where(np.arange(X_raw.shape[1]) % 2 == 0, np.nan, X_raw)
+    np.testing.assert_allclose(compiled.predict_proba(X)[:, 1], sklearn_reference(model, scaler, X), rtol=0, atol=1e-15)
+    
+def test_leaves_point_to_themselves(model, scaler):
+    compiled = compile_gradient_boosting(model, scaler)
+    nodes = np.arange(len(compiled.left))
+    leaves = compiled.left == nodes
+    assert (compiled.right[leaves] == nodes[leaves]).all()
+    assert np.isposinf(compiled.threshold[leaves]).all()
+    # Filhos lado a lado: direito = esquerdo + 1
+    assert (compiled.right[~leaves] == compiled.left[~leaves] + 1).all()
+    
+def test_float_keys_preserve_order():
+    values = np.array([-np.inf, -1e308, -1.0, -5e-324, -0.0, 0.0, 5e-324, 1e-300, 1.0, 1e308, np.inf])
+    keys = _float_to_key(values)
+    assert (np.diff(keys) >= 0).all()
+    np.testing.assert_array_equal(_key_to_float(keys), values)
+    
+def test_fold_thresholds_is_largest_cut():
+    rng = np.random.default_rng(0)
+    thresholds = rng.normal(size=1000).astype(np.float32).astype(np.float64)
+    mean = rng.normal(size=1000) * 10
+    scale = rng.uniform(0.01, 100, size=1000)
+    cuts = _fold_thresholds(thresholds, mean, scale)
+    goes_left = lambda x: ((x - mean) / scale).astype(np.float32) <= thresholds
+    assert goes_left(cuts).all()
+    assert not goes_left(np.nextafter(cuts, np.inf)).any()
+    
+def test_save_and_load_compiled(model, scaler, X_raw, tmp_path):
+    compiled = compile_gradient_boosting(model, scaler)
+    path = tmp_path / 'compiled.npz'
+    save_compiled(compiled, path)
+    np.testing.assert_array_equal(load_compiled(path).predict_proba(X_raw), compiled.predict_proba(X_raw))